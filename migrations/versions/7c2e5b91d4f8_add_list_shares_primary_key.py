@@ -0,0 +1,47 @@
+"""Add a composite primary key and user index to list_shares
+
+Revision ID: 7c2e5b91d4f8
+Revises: 2af3670cc9ae
+Create Date: 2026-10-18 19:02:41.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e5b91d4f8'
+down_revision = '2af3670cc9ae'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table had no key, so drop duplicate and incomplete shares first.
+    list_shares = sa.table(
+        'list_shares', sa.column('list_id', sa.Integer), sa.column('user_id', sa.Integer)
+    )
+    shares = op.get_bind().execute(
+        sa.select(list_shares.c.list_id, list_shares.c.user_id)
+        .where(list_shares.c.list_id.is_not(None), list_shares.c.user_id.is_not(None))
+        .distinct()
+    ).all()
+    op.execute(list_shares.delete())
+
+    with op.batch_alter_table('list_shares', schema=None) as batch_op:
+        batch_op.alter_column('list_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_primary_key('list_shares_pkey', ['list_id', 'user_id'])
+        batch_op.create_index(batch_op.f('ix_list_shares_user_id'), ['user_id'], unique=False)
+
+    op.bulk_insert(
+        list_shares, [{'list_id': list_id, 'user_id': user_id} for list_id, user_id in shares]
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('list_shares', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_list_shares_user_id'))
+        batch_op.drop_constraint('list_shares_pkey', type_='primary')
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('list_id', existing_type=sa.Integer(), nullable=True)
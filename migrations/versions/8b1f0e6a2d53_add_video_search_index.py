@@ -0,0 +1,71 @@
+"""Add full-text search index on video title and description
+
+Revision ID: 8b1f0e6a2d53
+Revises: c3e81a4f9d27
+Create Date: 2026-10-18 13:02:44.160357
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1f0e6a2d53'
+down_revision = 'c3e81a4f9d27'
+branch_labels = None
+depends_on = None
+
+
+def _search_rowid(video_id):
+    # Must match project.library.search.search_rowid.
+    digest = hashlib.blake2b(video_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS video_fts USING fts5("
+            "video_id UNINDEXED, title, description, tokenize='porter unicode61')"
+        )
+        rows = bind.execute(sa.text("SELECT id, title, description FROM video"))
+        params = [
+            {
+                'rowid': _search_rowid(row.id),
+                'video_id': row.id,
+                'title': row.title,
+                'description': row.description or '',
+            }
+            for row in rows
+        ]
+        if params:
+            bind.execute(
+                sa.text(
+                    "INSERT INTO video_fts (rowid, video_id, title, description) "
+                    "VALUES (:rowid, :video_id, :title, :description)"
+                ),
+                params,
+            )
+    elif bind.dialect.name == 'postgresql':
+        op.execute(
+            "ALTER TABLE video ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+            ") STORED"
+        )
+        op.execute(
+            "CREATE INDEX ix_video_search_vector ON video USING GIN (search_vector)"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS video_fts")
+    elif bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_video_search_vector")
+        op.execute("ALTER TABLE video DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,60 @@
+"""Space out list item and category orderings
+
+Revision ID: b3d81f06a2c7
+Revises: 7c2e5b91d4f8
+Create Date: 2026-10-18 20:14:09.552731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d81f06a2c7'
+down_revision = '7c2e5b91d4f8'
+branch_labels = None
+depends_on = None
+
+# Matches project.lists.ordering.ORDERING_GAP at the time of writing.
+ORDERING_GAP = 1024
+
+list_item = sa.table(
+    'list_item',
+    sa.column('id', sa.Integer),
+    sa.column('ordering', sa.Integer),
+    sa.column('category_id', sa.Integer),
+)
+list_category = sa.table(
+    'list_category',
+    sa.column('id', sa.Integer),
+    sa.column('ordering', sa.Integer),
+    sa.column('custom_list_id', sa.Integer),
+)
+
+
+def _space_out(table, scope_column):
+    ranked = sa.select(
+        table.c.id,
+        (
+            sa.func.row_number().over(
+                partition_by=scope_column, order_by=(table.c.ordering, table.c.id)
+            )
+            * ORDERING_GAP
+        ).label('ordering'),
+    ).subquery()
+    op.execute(
+        table.update()
+        .where(table.c.id == ranked.c.id)
+        .values(ordering=ranked.c.ordering)
+    )
+
+
+def upgrade():
+    # Moves take the midpoint between neighbours, so leave room between them.
+    _space_out(list_item, list_item.c.category_id)
+    _space_out(list_category, list_category.c.custom_list_id)
+
+
+def downgrade():
+    # The spaced-out orderings keep the same order, so there is nothing to undo.
+    pass
@@ -27,7 +27,21 @@ from project.lists.views import lists_blueprint
 from project.oauth.views import oauth_blueprint
 from project.wishlist.views import wishlist_blueprint
 
-from .commands import create_user, reset_db, reset_password, sync_yt_subs
+from .commands import (
+    bench_ordering,
+    bench_reorder,
+    bench_sync,
+    bench_upsert,
+    bench_watched,
+    catalog_report,
+    create_user,
+    export_subscriptions,
+    purge_removed_videos_command,
+    reset_db,
+    reset_password,
+    sync_runs,
+    sync_yt_subs,
+)
 from .csp import csp
 from .database import db
 from .extensions import login_manager, migrate, scheduler, talisman
@@ -124,6 +138,15 @@ def register_commands(app):
     app.cli.add_command(reset_password)
     app.cli.add_command(reset_db)
     app.cli.add_command(sync_yt_subs)
+    app.cli.add_command(export_subscriptions)
+    app.cli.add_command(purge_removed_videos_command)
+    app.cli.add_command(bench_ordering)
+    app.cli.add_command(bench_reorder)
+    app.cli.add_command(bench_sync)
+    app.cli.add_command(bench_upsert)
+    app.cli.add_command(bench_watched)
+    app.cli.add_command(catalog_report)
+    app.cli.add_command(sync_runs)
 
 
 def register_jinja_env(app):
@@ -12,3 +12,9 @@ SQLALCHEMY_DATABASE_URI = db_uri
 SQLALCHEMY_TRACK_MODIFICATIONS = True
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
+
+YOUTUBE_SYNC_WORKERS = int(os.getenv("YOUTUBE_SYNC_WORKERS", "8"))
+YOUTUBE_SYNC_CHUNK_SIZE = int(os.getenv("YOUTUBE_SYNC_CHUNK_SIZE", "500"))
+
+THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR")
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", "104857600"))
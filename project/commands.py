@@ -1,11 +1,32 @@
+import time
+from datetime import timedelta
+
 import click
 from flask.cli import with_appcontext
 from flask_migrate import upgrade
+from sqlalchemy import select
 
-from project.library.jobs import sync_playlists_and_videos
+from project.library.benchmarks import (
+    SYNC_BENCHMARK_SIZES,
+    benchmark_export,
+    benchmark_sync,
+    benchmark_video_writes,
+    benchmark_watched_updates,
+)
+from project.library.catalog import build_catalog, catalog_memory_report
+from project.library.jobs import (
+    SUBSCRIPTIONS_EXPORT_FILE,
+    SUBSCRIPTIONS_EXPORT_FORMATS,
+    SyncAlreadyRunning,
+    export_subscriptions_to_json,
+    purge_removed_videos,
+    sync_playlists_and_videos,
+    sync_subscriptions,
+)
+from project.lists.benchmarks import benchmark_ordering, benchmark_reorder
 
 from .database import db
-from .models import User
+from .models import SyncRun, User
 
 
 @click.command(name="create-user")
@@ -60,8 +81,275 @@ def reset_db():
 
 
 @click.command(name="sync-yt-subs")
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Fetch the videos of every playlist, even ones that look unchanged",
+)
 @with_appcontext
-def sync_yt_subs():
+def sync_yt_subs(full):
     """Sync YouTube subscriptions and playlists"""
-    sync_playlists_and_videos()
+    try:
+        stats = sync_playlists_and_videos(force=full)
+    except SyncAlreadyRunning as e:
+        click.echo(f"Error: {e}", err=True)
+        return
+    subscriptions = sync_subscriptions()
     click.echo("YouTube playlists and subs synced successfully.")
+    click.echo(
+        f"Subscriptions fetched: {subscriptions['fetched']}, "
+        f"written: {subscriptions['written']}, "
+        f"removed: {subscriptions['removed']}"
+    )
+    click.echo(
+        f"Playlists fetched: {stats.playlists_fetched}, "
+        f"skipped: {stats.playlists_skipped}, "
+        f"rows changed: {stats.rows_changed}, "
+        f"API calls: {stats.api_calls}, "
+        f"quota units saved: {stats.quota_saved}"
+    )
+    click.echo(
+        "Stage seconds: "
+        + ", ".join(
+            f"{stage} {seconds:.2f}" for stage, seconds in stats.stage_seconds.items()
+        )
+    )
+
+
+@click.command(name="purge-removed-videos")
+@click.option(
+    "--days",
+    default=30,
+    show_default=True,
+    help="Keep videos removed from YouTube for this many days",
+)
+@with_appcontext
+def purge_removed_videos_command(days):
+    """Delete videos removed from their YouTube playlist more than --days ago"""
+    purged = purge_removed_videos(timedelta(days=days))
+    click.echo(f"Deleted {purged} videos removed more than {days} days ago.")
+
+
+@click.command(name="export-subscriptions")
+@click.option(
+    "--output",
+    default=SUBSCRIPTIONS_EXPORT_FILE,
+    show_default=True,
+    help="The file to write; .ndjson files are written as NDJSON",
+)
+@click.option(
+    "--format",
+    "export_format",
+    type=click.Choice(SUBSCRIPTIONS_EXPORT_FORMATS),
+    default=None,
+    help="Override the format implied by --output",
+)
+@click.option(
+    "--delta",
+    is_flag=True,
+    help="Also log the subscriptions added or removed since the last export",
+)
+@with_appcontext
+def export_subscriptions(output, export_format, delta):
+    """Export YouTube channel subscriptions to a JSON or NDJSON file"""
+    result = export_subscriptions_to_json(
+        output_path=output, export_format=export_format, delta=delta
+    )
+    if delta:
+        click.echo(
+            f"{result['added']} added and {result['removed']} removed, "
+            f"logged to {result['changes_path']}"
+        )
+
+
+@click.command(name="catalog-report")
+@with_appcontext
+def catalog_report():
+    """Build the in-memory library catalog and report its memory footprint"""
+    start = time.perf_counter()
+    catalog = build_catalog()
+    seconds = time.perf_counter() - start
+    report = catalog_memory_report(catalog)
+    click.echo(
+        f"{report['playlists']} playlists and {report['videos']} videos "
+        f"built in {seconds:.2f}s"
+    )
+    for part in ("video_records", "playlist_records", "indexes", "total"):
+        click.echo(f"  {part:>16}: {report[part] / 2**20:8.1f} MB")
+    if report["videos"]:
+        click.echo(f"  {'per video':>16}: {report['total'] / report['videos']:8.0f} B")
+
+
+@click.command(name="sync-runs")
+@click.option("--limit", default=10, show_default=True, help="Runs to show")
+@with_appcontext
+def sync_runs(limit):
+    """Show the most recent YouTube sync runs"""
+    runs = db.session.scalars(
+        select(SyncRun).order_by(SyncRun.started_at.desc()).limit(limit)
+    ).all()
+    if not runs:
+        click.echo("No sync runs recorded yet.")
+        return
+
+    for run in runs:
+        click.echo(
+            f"{run.started_at:%Y-%m-%d %H:%M} {run.status:<8} "
+            f"{run.total_seconds:7.1f}s total "
+            f"(fetch {run.fetch_seconds:.1f}s, transform {run.transform_seconds:.1f}s, "
+            f"diff {run.diff_seconds:.1f}s, commit {run.commit_seconds:.1f}s) "
+            f"{run.playlists_fetched}/{run.playlists_total} playlists, "
+            f"{run.rows_changed} rows, {run.api_calls} API calls"
+        )
+
+
+@click.command(name="bench-upsert")
+@click.option("--playlists", default=20, show_default=True, help="Playlists to write")
+@click.option(
+    "--videos", default=500, show_default=True, help="Videos in each playlist"
+)
+def bench_upsert(playlists, videos):
+    """Benchmark per-row vs bulk video writes on in-memory SQLite"""
+    results = benchmark_video_writes(playlists, videos)
+    click.echo(f"{playlists * videos} videos across {playlists} playlists")
+    for strategy, passes in results.items():
+        for pass_name, result in passes.items():
+            click.echo(
+                f"{strategy:>8} {pass_name:>7}: {result['seconds']:.3f}s "
+                f"({result['rows_per_sec']:,.0f} rows/sec)"
+            )
+
+
+@click.command(name="bench-watched")
+@click.option(
+    "--videos", default=10_000, show_default=True, help="Videos in the playlist"
+)
+def bench_watched(videos):
+    """Benchmark per-object vs set-based watched updates on in-memory SQLite"""
+    results = benchmark_watched_updates(videos)
+    click.echo(f"{videos} videos in one playlist")
+    for strategy, passes in results.items():
+        for pass_name, result in passes.items():
+            click.echo(
+                f"{strategy:>9} {pass_name:>9}: {result['seconds']:.3f}s, "
+                f"{result['queries']} queries, peak {result['peak_mb']:.1f} MB"
+            )
+
+
+@click.command(name="bench-reorder")
+@click.option("--items", default=200, show_default=True, help="Items in the list")
+@click.option(
+    "--categories", default=10, show_default=True, help="Categories in the list"
+)
+def bench_reorder(items, categories):
+    """Benchmark per-row vs set-based list reordering on in-memory SQLite"""
+    results = benchmark_reorder(items, categories)
+    click.echo(f"{items} items in {categories} categories")
+    for strategy, passes in results.items():
+        for pass_name, result in passes.items():
+            click.echo(
+                f"{strategy:>9} {pass_name:>10}: {result['seconds']:.3f}s, "
+                f"{result['queries']} queries"
+            )
+
+
+@click.command(name="bench-ordering")
+@click.option(
+    "--items", default=10000, show_default=True, help="Items in the category"
+)
+@click.option(
+    "--operations", default=100, show_default=True, help="Appends and moves per pass"
+)
+def bench_ordering(items, operations):
+    """Benchmark dense vs gap-based list ordering on in-memory SQLite"""
+    results = benchmark_ordering(items, operations)
+    click.echo(f"{items} items in one category, averaged over {operations} operations")
+    for strategy, passes in results.items():
+        for pass_name, result in passes.items():
+            line = (
+                f"{strategy:>5} {pass_name:>12}: {result['seconds'] * 1000:.2f}ms, "
+                f"{result['queries']:.1f} queries, {result['rows']:.1f} rows written"
+            )
+            if "rebalances" in result:
+                line += f", {result['rebalances']} rebalances"
+            click.echo(line)
+
+
+@click.command(name="bench-sync")
+@click.option(
+    "--size",
+    "sizes",
+    type=int,
+    multiple=True,
+    default=SYNC_BENCHMARK_SIZES,
+    show_default=True,
+    help="Library size in videos (repeatable)",
+)
+@click.option(
+    "--videos-per-playlist", default=500, show_default=True, help="Playlist size"
+)
+@click.option(
+    "--subscriptions", default=1000, show_default=True, help="Subscriptions to export"
+)
+@click.option(
+    "--export-format",
+    type=click.Choice(SUBSCRIPTIONS_EXPORT_FORMATS),
+    default="json",
+    show_default=True,
+    help="Subscription export format",
+)
+@click.option(
+    "--latency", default=0.0, show_default=True, help="Seconds per fake API request"
+)
+@click.option(
+    "--memory/--no-memory",
+    default=True,
+    show_default=True,
+    help="Measure peak memory (slows the run down)",
+)
+@click.option(
+    "--database", default=None, help="Database URI to use instead of in-memory SQLite"
+)
+def bench_sync(
+    sizes, videos_per_playlist, subscriptions, export_format, latency, memory, database
+):
+    """Benchmark the YouTube sync and export against a fake API"""
+
+    def describe(result):
+        peak = f", peak {result['peak_mb']:.1f} MB" if memory else ""
+        return (
+            f"{result['seconds']:8.3f}s, {result['queries']:6d} queries, "
+            f"{result['api_calls']:5d} API calls{peak}"
+        )
+
+    results = benchmark_sync(
+        sizes,
+        videos_per_playlist=videos_per_playlist,
+        trace_memory=memory,
+        latency=latency,
+        database_uri=database,
+    )
+    for videos, passes in results.items():
+        searches = passes.pop("search")
+        click.echo(f"sync, {videos} videos in playlists of {videos_per_playlist}")
+        for pass_name, result in passes.items():
+            click.echo(
+                f"  {pass_name:>9}: {describe(result)}, "
+                f"{result['rows_changed']} rows changed"
+            )
+        for query, seconds in searches.items():
+            click.echo(f"  {'search':>9}: {seconds * 1000:8.1f}ms for {query!r}")
+
+    results = benchmark_export(
+        subscriptions, trace_memory=memory, export_format=export_format
+    )
+    click.echo(f"export, {subscriptions} subscriptions as {export_format}")
+    for pass_name, result in results.items():
+        changes = (
+            f", {result['added']} added, {result['removed']} removed"
+            if "added" in result
+            else ""
+        )
+        click.echo(
+            f"  {pass_name:>9}: {describe(result)}, {result['bytes']} bytes{changes}"
+        )
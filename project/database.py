@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -11,3 +12,45 @@ class Base(DeclarativeBase):
 
 
 db = SQLAlchemy(model_class=Base)
+
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def bulk_upsert(model, rows, update_columns, index_elements=("id",)):
+    """
+    Insert rows into a model's table, updating any rows whose key already exists.
+
+    Uses a single ``INSERT ... ON CONFLICT DO UPDATE`` statement executed with
+    all rows as parameters on SQLite and Postgres. Other dialects fall back to
+    merging the rows one at a time through the session.
+
+    Args:
+        model: The mapped model class to write to.
+        rows (list[dict]): Column values for each row. Every row must have the
+            same keys.
+        update_columns (Iterable[str]): Columns overwritten when a row already
+            exists. Columns not listed (e.g. ``created_at``) keep their value.
+        index_elements (Iterable[str]): Columns forming the conflict target.
+
+    Returns:
+        int: The number of rows written.
+    """
+    if not rows:
+        return 0
+
+    insert = UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if insert is None:
+        for row in rows:
+            db.session.merge(model(**row))
+        return len(rows)
+
+    stmt = insert(model.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(index_elements),
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
+    db.session.execute(stmt, rows)
+    return len(rows)
@@ -3,7 +3,24 @@ from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_talisman import Talisman
 
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """
+    Hides the full-text search objects from autogenerate.
+
+    They are created outside the models (see `project.library.search`), so
+    autogenerate would otherwise offer to drop them.
+    """
+    if type_ == "table" and reflected and name.startswith("video_fts"):
+        return False
+    if type_ == "column" and reflected and name == "search_vector":
+        return False
+    if type_ == "index" and reflected and name == "ix_video_search_vector":
+        return False
+    return True
+
+
 login_manager = LoginManager()
-migrate = Migrate()
+migrate = Migrate(include_object=include_object)
 scheduler = APScheduler()
 talisman = Talisman()
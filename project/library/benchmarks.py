@@ -0,0 +1,449 @@
+"""
+Benchmarks for the YouTube sync.
+
+Benchmarks run against a throwaway in-memory SQLite database built from
+synthetic rows, so they never touch the configured database or the YouTube API.
+Full syncs and subscription exports are served by a `FakeYouTubeService`.
+"""
+
+import contextlib
+import functools
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, select
+
+from project.database import bulk_upsert, db
+from project.library.fakes import FakeYouTubeService
+from project.library.jobs import (
+    PLAYLIST_FIELDS,
+    VIDEO_FIELDS,
+    diff_rows,
+    export_subscriptions_to_json,
+    load_existing_rows,
+    sync_playlists_and_videos,
+)
+from project.library.search import search_videos
+from project.library.watched import set_watched
+from project.models import Playlist, Video
+
+BENCHMARK_CONFIG = {
+    "SQLALCHEMY_DATABASE_URI": "sqlite://",
+    "SECRET_KEY": "benchmark",
+    "TESTING": True,
+}
+
+
+# Library sizes, in videos, measured by `benchmark_sync`.
+SYNC_BENCHMARK_SIZES = (1_000, 10_000, 100_000)
+# Searches timed against each synced library. The first few are selective; the
+# last matches every generated video.
+SEARCH_BENCHMARK_QUERIES = ("video 42", "playlist 7", "v00001x00042", "generated")
+
+
+def create_benchmark_app(database_uri=None):
+    """
+    Creates an app bound to a throwaway database.
+
+    Args:
+        database_uri (str, optional): The database to use instead of an
+            in-memory SQLite database. Its tables are dropped and recreated.
+
+    Returns:
+        Flask: The app.
+    """
+    from project import create_app
+
+    config = dict(BENCHMARK_CONFIG)
+    if database_uri:
+        config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    return create_app(config)
+
+
+def synthetic_video_rows(playlist_id, count):
+    """
+    Builds ``Video`` column values shaped like the output of ``video_to_row``.
+
+    Args:
+        playlist_id (str): The playlist the videos belong to.
+        count (int): The number of rows to build.
+
+    Returns:
+        list[dict]: The rows.
+    """
+    published_at = datetime(2020, 1, 1)
+    rows = []
+    for i in range(count):
+        video_url_id = f"{playlist_id}-v{i:06d}"
+        rows.append(
+            {
+                "id": f"{playlist_id}-item{i:06d}",
+                "playlist_id": playlist_id,
+                "video_url_id": video_url_id,
+                "title": f"Video {i}",
+                "description": f"Description for video {i}",
+                "published_at": published_at + timedelta(minutes=i),
+                "thumbnail_url": f"https://i.ytimg.com/vi/{video_url_id}/default.jpg",
+                "embed_url": f"https://www.youtube.com/embed/{video_url_id}",
+                "removed_at": None,
+            }
+        )
+    return rows
+
+
+def write_videos_per_row(playlist_id, rows):
+    """Writes rows the way the sync used to: one SELECT per row through the ORM."""
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        existing = db.session.get(Video, row["id"])
+        if existing is None:
+            db.session.add(Video(**row, created_at=now, updated_at=now))
+        elif any(getattr(existing, field) != row[field] for field in VIDEO_FIELDS):
+            for field in VIDEO_FIELDS:
+                setattr(existing, field, row[field])
+            existing.updated_at = now
+    db.session.commit()
+
+
+def write_videos_bulk(playlist_id, rows):
+    """Writes rows the way the sync does now: one SELECT and one bulk upsert."""
+    now = datetime.now(timezone.utc)
+    existing = load_existing_rows(Video, VIDEO_FIELDS, Video.playlist_id == playlist_id)
+    inserts, updates = diff_rows(rows, existing, VIDEO_FIELDS)
+    changed = [
+        {**row, "created_at": now, "updated_at": now} for row in inserts + updates
+    ]
+    bulk_upsert(Video, changed, update_columns=(*VIDEO_FIELDS, "updated_at"))
+    db.session.commit()
+
+
+def set_watched_per_row(playlist_id, watched):
+    """Sets watched state by loading and saving each ORM object."""
+    videos = db.session.scalars(
+        select(Video).where(Video.playlist_id == playlist_id)
+    ).all()
+    for video in videos:
+        video.watched = watched
+    db.session.commit()
+
+
+def _timed_pass(writer, batches):
+    start = time.perf_counter()
+    for playlist_id, rows in batches.items():
+        writer(playlist_id, rows)
+    elapsed = time.perf_counter() - start
+    db.session.remove()
+    return elapsed
+
+
+def benchmark_video_writes(playlists=20, videos_per_playlist=500, changed_ratio=0.1):
+    """
+    Compares per-row and bulk video writes on an in-memory SQLite database.
+
+    Each strategy runs two passes over the same playlists: an initial pass that
+    inserts every row, then a re-sync where ``changed_ratio`` of the rows have a
+    new title and the rest are unchanged.
+
+    Args:
+        playlists (int): The number of playlists to write.
+        videos_per_playlist (int): The number of videos in each playlist.
+        changed_ratio (float): The share of rows modified before the re-sync.
+
+    Returns:
+        dict: For each strategy (``"per_row"`` and ``"bulk"``), a mapping of pass
+        name (``"insert"`` and ``"resync"``) to ``{"seconds", "rows_per_sec"}``.
+    """
+    batches = {
+        f"PL{i:04d}": synthetic_video_rows(f"PL{i:04d}", videos_per_playlist)
+        for i in range(playlists)
+    }
+    changed_every = max(1, round(1 / changed_ratio)) if changed_ratio else None
+    resync_batches = {
+        playlist_id: [
+            {**row, "title": f"{row['title']} (renamed)"}
+            if changed_every and i % changed_every == 0
+            else row
+            for i, row in enumerate(rows)
+        ]
+        for playlist_id, rows in batches.items()
+    }
+    total_rows = playlists * videos_per_playlist
+
+    results = {}
+    app = create_benchmark_app()
+    with app.app_context():
+        for name, writer in (
+            ("per_row", write_videos_per_row),
+            ("bulk", write_videos_bulk),
+        ):
+            db.drop_all()
+            db.create_all()
+            playlist_rows = [
+                {
+                    "id": playlist_id,
+                    "title": playlist_id,
+                    "description": None,
+                    "published_at": datetime(2020, 1, 1),
+                    "thumbnail_url": None,
+                    "updated_at": datetime.now(timezone.utc),
+                }
+                for playlist_id in batches
+            ]
+            bulk_upsert(
+                Playlist, playlist_rows, update_columns=(*PLAYLIST_FIELDS, "updated_at")
+            )
+            db.session.commit()
+
+            results[name] = {}
+            for pass_name, pass_batches in (
+                ("insert", batches),
+                ("resync", resync_batches),
+            ):
+                seconds = _timed_pass(writer, pass_batches)
+                results[name][pass_name] = {
+                    "seconds": seconds,
+                    "rows_per_sec": total_rows / seconds if seconds else float("inf"),
+                }
+        db.drop_all()
+
+    return results
+
+
+@contextlib.contextmanager
+def count_queries(engine):
+    """
+    Counts the statements sent to the database inside the block.
+
+    An ``executemany`` counts once, since it is one round trip from the
+    caller's point of view.
+
+    Yields:
+        list[int]: A one-item list holding the running count.
+    """
+    count = [0]
+
+    def before_cursor_execute(*args):  # pylint: disable=unused-argument
+        count[0] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield count
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _measure(run, trace_memory):
+    """
+    Runs ``run`` and measures its wall time, query count and peak memory.
+
+    Returns:
+        tuple[dict, object]: ``{"seconds", "queries", "peak_mb"}`` and the
+        value ``run`` returned.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with count_queries(db.engine) as queries:
+            start = time.perf_counter()
+            value = run()
+            seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    db.session.remove()
+    return {
+        "seconds": seconds,
+        "queries": queries[0],
+        "peak_mb": peak / 2**20 if peak is not None else None,
+    }, value
+
+
+def benchmark_sync(
+    sizes=SYNC_BENCHMARK_SIZES,
+    videos_per_playlist=500,
+    trace_memory=True,
+    latency=0.0,
+    database_uri=None,
+):
+    """
+    Measures `sync_playlists_and_videos` against generated libraries.
+
+    For each library size, the database starts empty and the sync runs four
+    times: an initial import, an unchanged re-sync (every playlist skipped on
+    its ETag), a forced re-sync that fetches and diffs every video without
+    writing, and a re-sync after every video was renamed.
+
+    Each synced library is then searched with ``SEARCH_BENCHMARK_QUERIES``.
+
+    Peak memory is measured with ``tracemalloc``, which slows Python code down,
+    so wall times are only comparable between runs with the same setting.
+
+    Args:
+        sizes (Iterable[int]): The library sizes to measure, in videos.
+        videos_per_playlist (int): How many videos each playlist holds.
+        trace_memory (bool): Measure peak memory.
+        latency (float): Seconds each fake API request takes.
+        database_uri (str, optional): Passed to `create_benchmark_app`.
+
+    Returns:
+        dict: For each size, a mapping of pass name (``"initial"``,
+        ``"unchanged"``, ``"forced"`` and ``"changed"``) to ``{"seconds",
+        "queries", "peak_mb", "api_calls", "rows_changed"}``, plus
+        ``"search"``, a mapping of each search to its seconds.
+    """
+    results = {}
+    app = create_benchmark_app(database_uri)
+    with app.app_context():
+        for videos in sizes:
+            db.drop_all()
+            db.create_all()
+            service = FakeYouTubeService(
+                playlists=max(1, -(-videos // videos_per_playlist)),
+                videos=videos,
+                latency=latency,
+            )
+
+            results[videos] = {}
+            for pass_name, force, revision in (
+                ("initial", False, 0),
+                ("unchanged", False, 0),
+                ("forced", True, 0),
+                ("changed", False, 1),
+            ):
+                service.revision = revision
+                result, stats = _measure(
+                    functools.partial(
+                        sync_playlists_and_videos,
+                        force=force,
+                        youtube_service=service,
+                        saved_playlist_ids=[],
+                    ),
+                    trace_memory,
+                )
+                result["api_calls"] = stats.api_calls
+                result["rows_changed"] = stats.rows_changed
+                results[videos][pass_name] = result
+
+            results[videos]["search"] = {}
+            for query in SEARCH_BENCHMARK_QUERIES:
+                start = time.perf_counter()
+                search_videos(query)
+                results[videos]["search"][query] = time.perf_counter() - start
+        db.drop_all()
+
+    return results
+
+
+def benchmark_export(subscriptions=1000, trace_memory=True, export_format="json"):
+    """
+    Measures `export_subscriptions_to_json` against generated subscriptions.
+
+    A full export is followed by a delta export after 1% more subscriptions
+    were added. The exports are written to a temporary directory, and their
+    progress output is discarded.
+
+    Args:
+        subscriptions (int): The number of subscriptions to export.
+        trace_memory (bool): Measure peak memory.
+        export_format (str): ``"json"`` or ``"ndjson"``.
+
+    Returns:
+        dict: For each pass (``"export"`` and ``"delta"``), ``{"seconds",
+        "queries", "peak_mb", "api_calls", "bytes"}``. The delta pass also has
+        ``"added"`` and ``"removed"``.
+    """
+    passes = {
+        "export": subscriptions,
+        "delta": subscriptions + max(subscriptions // 100, 1),
+    }
+    results = {}
+    app = create_benchmark_app()
+    with app.app_context(), tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, f"youtube-subscriptions.{export_format}")
+        for pass_name, count in passes.items():
+            service = FakeYouTubeService(playlists=1, videos=0, subscriptions=count)
+            with open(os.devnull, "w", encoding="utf-8") as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    result, export = _measure(
+                        functools.partial(
+                            export_subscriptions_to_json,
+                            youtube_service=service,
+                            output_path=output_path,
+                            export_format=export_format,
+                            delta=pass_name == "delta",
+                        ),
+                        trace_memory,
+                    )
+            result["api_calls"] = service.requests_made
+            result["bytes"] = os.path.getsize(output_path)
+            if pass_name == "delta":
+                result.update(added=export["added"], removed=export["removed"])
+            results[pass_name] = result
+    return results
+
+
+def benchmark_watched_updates(videos=10_000, trace_memory=True):
+    """
+    Compares per-object and set-based watched updates on one large playlist.
+
+    Each strategy marks the whole playlist watched, then unwatched.
+
+    Args:
+        videos (int): The number of videos in the playlist.
+        trace_memory (bool): Measure peak memory.
+
+    Returns:
+        dict: For each strategy (``"per_row"`` and ``"set_based"``), a mapping
+        of ``"watched"`` and ``"unwatched"`` to ``{"seconds", "queries",
+        "peak_mb"}``.
+    """
+    playlist_id = "PLwatched"
+    results = {}
+    app = create_benchmark_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        now = datetime.now(timezone.utc)
+        bulk_upsert(
+            Playlist,
+            [
+                {
+                    "id": playlist_id,
+                    "title": playlist_id,
+                    "published_at": datetime(2020, 1, 1),
+                    "updated_at": now,
+                }
+            ],
+            update_columns=("title",),
+        )
+        bulk_upsert(
+            Video,
+            [
+                {**row, "watched": False, "created_at": now, "updated_at": now}
+                for row in synthetic_video_rows(playlist_id, videos)
+            ],
+            update_columns=VIDEO_FIELDS,
+        )
+        db.session.commit()
+
+        for name, writer in (
+            ("per_row", set_watched_per_row),
+            (
+                "set_based",
+                lambda playlist_id, watched: set_watched(
+                    watched, playlist_id=playlist_id
+                ),
+            ),
+        ):
+            results[name] = {}
+            for pass_name, watched in (("watched", True), ("unwatched", False)):
+                results[name][pass_name], _ = _measure(
+                    functools.partial(writer, playlist_id, watched), trace_memory
+                )
+        db.drop_all()
+
+    return results
@@ -0,0 +1,529 @@
+"""
+An immutable in-process snapshot of the YouTube library for read-heavy views.
+
+The library is written by the sync once a day but read on every page view, so
+the index, playlist and video pages read from a snapshot of every playlist and
+video held in memory as compact tuple-backed records. Each playlist's video
+order and every sort order of the index are computed when the snapshot is
+built.
+
+A snapshot is never modified. A new one is built after each background sync,
+or derived from the current one after a watched-state update, sharing every
+record that did not change, and swapped in with a single assignment, so
+readers never see a half-built catalog and never wait for one. Writes made by
+other processes are picked up by comparing the library version with the
+database at most every ``CATALOG_RECHECK_SECONDS``.
+"""
+
+import bisect
+import logging
+import sys
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import select
+
+from project.database import db
+from project.library.pagination import (
+    DEFAULT_PAGE_SIZE,
+    InvalidCursor,
+    KeysetPage,
+    decode_cursor,
+    encode_cursor,
+)
+from project.library.summaries import (
+    PLAYLIST_SORTS,
+    library_version,
+    sort_playlist_summaries,
+)
+from project.models import Playlist, Video
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_RECHECK_SECONDS = 10
+# A video index folds its overlay into a new base once the overlay holds this
+# share of the base, so a watched update copies a few records, not the library.
+VIDEO_OVERLAY_RATIO = 1 / 8
+# The sort columns of a playlist's videos, as used by its page cursors.
+PLAYLIST_VIDEO_ORDER = (Video.published_at, Video.id)
+
+
+class VideoRecord(NamedTuple):
+    """A video as held by the catalog."""
+
+    id: str
+    playlist_id: str
+    video_url_id: str
+    title: str
+    description: Optional[str]
+    published_at: datetime
+    thumbnail_url: Optional[str]
+    embed_url: str
+    watched: bool
+    updated_at: datetime
+    removed: bool
+
+
+class PlaylistRecord(NamedTuple):
+    """A playlist and the totals of its current videos, as held by the catalog."""
+
+    id: str
+    title: str
+    description: Optional[str]
+    thumbnail_url: Optional[str]
+    published_at: datetime
+    updated_at: datetime
+    item_count: Optional[int]
+    video_count: int
+    watched_count: int
+    latest_video_at: Optional[datetime]
+
+
+class VideoIndex(Mapping):
+    """
+    A read-only mapping of video IDs to records: a shared base dict with an
+    overlay of the records replaced since it was built.
+
+    Args:
+        base (dict[str, VideoRecord]): The records, shared between indexes.
+        overlay (dict[str, VideoRecord], optional): Replacements for records
+            of ``base``.
+    """
+
+    __slots__ = ("base", "overlay")
+
+    def __init__(self, base, overlay=None):
+        self.base = base
+        self.overlay = overlay or {}
+
+    def __getitem__(self, video_id):
+        try:
+            return self.overlay[video_id]
+        except KeyError:
+            return self.base[video_id]
+
+    def __iter__(self):
+        return iter(self.base)
+
+    def __len__(self):
+        return len(self.base)
+
+    def replace(self, records):
+        """
+        Returns an index with some records replaced.
+
+        Copies the overlay, or the whole index once the overlay has grown to
+        ``VIDEO_OVERLAY_RATIO`` of the base.
+
+        Args:
+            records (dict[str, VideoRecord]): Replacements for existing
+                records.
+
+        Returns:
+            VideoIndex: The new index.
+        """
+        overlay = {**self.overlay, **records}
+        if len(overlay) > len(self.base) * VIDEO_OVERLAY_RATIO:
+            return VideoIndex({**self.base, **overlay})
+        return VideoIndex(self.base, overlay)
+
+
+def _video_key(video):
+    return (video.published_at, video.id)
+
+
+def _naive_utc(value):
+    """Returns a datetime as naive UTC, the way the database returns them."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class Catalog:
+    """
+    A snapshot of every playlist and video. Build one with `build_catalog`.
+
+    Attributes:
+        version: The `library_version` the snapshot was built from.
+        playlists (dict[str, PlaylistRecord]): Every playlist by ID.
+        videos (VideoIndex): Every video by ID, including videos removed from
+            their playlist.
+        playlist_videos (dict[str, tuple[VideoRecord, ...]]): The current
+            videos of each playlist, in ``(published_at, id)`` order.
+        removed_video_ids (dict[str, tuple[str, ...]]): The IDs of the videos
+            removed from each playlist that has any.
+    """
+
+    __slots__ = (
+        "version",
+        "playlists",
+        "videos",
+        "playlist_videos",
+        "removed_video_ids",
+        "_sorted",
+    )
+
+    def __init__(self, version, playlists, videos, playlist_videos, removed_video_ids):
+        self.version = version
+        self.playlists = playlists
+        self.videos = videos
+        self.playlist_videos = playlist_videos
+        self.removed_video_ids = removed_video_ids
+        self._sorted = {
+            (sort, descending): tuple(
+                sort_playlist_summaries(playlists.values(), sort, descending)
+            )
+            for sort in PLAYLIST_SORTS
+            for descending in (False, True)
+        }
+
+    def playlist_summaries(self, sort, descending=False):
+        """
+        Returns every playlist sorted by a key of ``PLAYLIST_SORTS``.
+
+        Returns:
+            tuple[PlaylistRecord, ...]: The playlists, in the order of
+            `sort_playlist_summaries`.
+        """
+        return self._sorted[(sort, descending)]
+
+    def playlist_page(self, playlist_id, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+        """
+        Returns one page of a playlist's current videos, oldest first.
+
+        Cursors are interchangeable with the ones `paginate` makes for
+        ``PLAYLIST_VIDEO_ORDER``.
+
+        Args:
+            playlist_id (str): The playlist.
+            cursor (str, optional): The cursor of the page to return. Defaults
+                to the first page.
+            per_page (int): The maximum number of videos on the page.
+
+        Returns:
+            KeysetPage: The videos on the page.
+
+        Raises:
+            InvalidCursor: If ``cursor`` cannot be decoded.
+        """
+        videos = self.playlist_videos.get(playlist_id, ())
+        start = 0
+        if cursor:
+            after = tuple(decode_cursor(cursor, PLAYLIST_VIDEO_ORDER))
+            try:
+                start = bisect.bisect_right(videos, after, key=_video_key)
+            except TypeError as e:
+                raise InvalidCursor(cursor) from e
+
+        page = KeysetPage(items=list(videos[start : start + per_page]))
+        if start + per_page < len(videos):
+            page.next_cursor = encode_cursor(_video_key(page.items[-1]))
+        return page
+
+    def with_watched(
+        self, version, watched, updated_at, video_ids=None, playlist_id=None
+    ):
+        """
+        Returns a copy of the catalog with the watched state of videos changed.
+
+        Mirrors `set_watched`: only videos whose state changes are replaced,
+        and their playlists get ``updated_at`` as their update time. Records
+        that did not change are shared with this catalog, and the cost is that
+        of the changed videos and their playlists rather than the library.
+
+        Args:
+            version: The library version after the update.
+            watched (bool): The new state.
+            updated_at (datetime): The time the update was written.
+            video_ids (Iterable[str], optional): The videos updated.
+            playlist_id (str, optional): The playlist whose videos were all
+                updated.
+
+        Returns:
+            Catalog: The new catalog.
+        """
+        updated_at = _naive_utc(updated_at)
+        if playlist_id is not None:
+            video_ids = [
+                video.id for video in self.playlist_videos.get(playlist_id, ())
+            ]
+            video_ids.extend(self.removed_video_ids.get(playlist_id, ()))
+
+        changed = {}
+        watched_delta = {}
+        for video_id in video_ids:
+            video = self.videos.get(video_id)
+            if video is None or video.watched == watched or video_id in changed:
+                continue
+            changed[video_id] = video._replace(watched=watched, updated_at=updated_at)
+            if not video.removed:
+                watched_delta[video.playlist_id] = (
+                    watched_delta.get(video.playlist_id, 0) + (1 if watched else -1)
+                )
+            else:
+                watched_delta.setdefault(video.playlist_id, 0)
+
+        playlists = dict(self.playlists)
+        playlist_videos = dict(self.playlist_videos)
+        for changed_id, delta in watched_delta.items():
+            playlist = playlists.get(changed_id)
+            if playlist is None:
+                continue
+            playlists[changed_id] = playlist._replace(
+                updated_at=updated_at, watched_count=playlist.watched_count + delta
+            )
+            playlist_videos[changed_id] = tuple(
+                changed.get(video.id, video)
+                for video in self.playlist_videos.get(changed_id, ())
+            )
+        return Catalog(
+            version,
+            playlists,
+            self.videos.replace(changed),
+            playlist_videos,
+            self.removed_video_ids,
+        )
+
+
+def build_catalog(version=None):
+    """
+    Loads every playlist and video into a new `Catalog` with two queries.
+
+    Rows are read as plain tuples rather than ORM objects, and each video's
+    ``playlist_id`` shares the string object of its playlist's ID.
+
+    Args:
+        version (optional): The library version to record. Defaults to the
+            current one, read before the rows.
+
+    Returns:
+        Catalog: The snapshot.
+    """
+    if version is None:
+        version = library_version()
+
+    playlist_rows = db.session.execute(
+        select(
+            Playlist.id,
+            Playlist.title,
+            Playlist.description,
+            Playlist.thumbnail_url,
+            Playlist.published_at,
+            Playlist.updated_at,
+            Playlist.item_count,
+        )
+    ).all()
+    playlist_ids = {sys.intern(row.id): row for row in playlist_rows}
+
+    videos = {}
+    current = {playlist_id: [] for playlist_id in playlist_ids}
+    removed = {}
+    video_rows = db.session.execute(
+        select(
+            Video.id,
+            Video.playlist_id,
+            Video.video_url_id,
+            Video.title,
+            Video.description,
+            Video.published_at,
+            Video.thumbnail_url,
+            Video.embed_url,
+            Video.watched,
+            Video.updated_at,
+            Video.removed_at.is_not(None),
+        )
+    )
+    for row in video_rows:
+        video = VideoRecord(row[0], sys.intern(row[1]), *row[2:])
+        videos[video.id] = video
+        if video.removed:
+            removed.setdefault(video.playlist_id, []).append(video.id)
+        elif video.playlist_id in current:
+            current[video.playlist_id].append(video)
+
+    playlists = {}
+    playlist_videos = {}
+    for playlist_id, row in playlist_ids.items():
+        ordered = tuple(sorted(current[playlist_id], key=_video_key))
+        playlist_videos[playlist_id] = ordered
+        playlists[playlist_id] = PlaylistRecord(
+            playlist_id,
+            *row[1:],
+            video_count=len(ordered),
+            watched_count=sum(video.watched for video in ordered),
+            latest_video_at=max(
+                (video.published_at for video in ordered), default=None
+            ),
+        )
+
+    return Catalog(
+        version,
+        playlists,
+        VideoIndex(videos),
+        playlist_videos,
+        {playlist_id: tuple(ids) for playlist_id, ids in removed.items()},
+    )
+
+
+class _CatalogHolder:
+    """The current catalog of an app, and the state of its freshness checks."""
+
+    def __init__(self):
+        self.catalog = None
+        self.checked_at = 0.0
+        # Set by writes that could not patch the catalog while it was being
+        # rebuilt, so the next read checks the version again.
+        self.stale = False
+        self.lock = threading.Lock()
+
+    def rebuild(self):
+        """Builds a catalog and swaps it in. Must be called holding ``lock``."""
+        self.stale = False
+        start = time.perf_counter()
+        self.catalog = build_catalog()
+        self.checked_at = time.monotonic()
+        logger.info(
+            "Built library catalog of %d playlists and %d videos in %.2fs",
+            len(self.catalog.playlists),
+            len(self.catalog.videos),
+            time.perf_counter() - start,
+        )
+
+
+def _get_holder():
+    holder = current_app.extensions.get("library_catalog")
+    if holder is None:
+        holder = current_app.extensions.setdefault(
+            "library_catalog", _CatalogHolder()
+        )
+    return holder
+
+
+def get_catalog():
+    """
+    Returns the current app's catalog, building it on first use.
+
+    At most every ``CATALOG_RECHECK_SECONDS`` (config, default
+    ``DEFAULT_CATALOG_RECHECK_SECONDS``) one request compares the catalog's
+    version with the database and rebuilds it if another process changed the
+    library. Requests arriving while it does keep reading the current catalog.
+
+    Returns:
+        Catalog: The snapshot.
+    """
+    holder = _get_holder()
+    catalog = holder.catalog
+    recheck = current_app.config.get(
+        "CATALOG_RECHECK_SECONDS", DEFAULT_CATALOG_RECHECK_SECONDS
+    )
+    if catalog is not None:
+        if not holder.stale and time.monotonic() - holder.checked_at < recheck:
+            return catalog
+        if not holder.lock.acquire(blocking=False):
+            return catalog
+    else:
+        holder.lock.acquire()
+
+    try:
+        if holder.catalog is not catalog and holder.catalog is not None:
+            return holder.catalog
+        if holder.catalog is None or holder.catalog.version != library_version():
+            holder.rebuild()
+        else:
+            holder.checked_at = time.monotonic()
+        return holder.catalog
+    finally:
+        holder.lock.release()
+
+
+def refresh_catalog():
+    """Rebuilds the current app's catalog, e.g. after a sync finished."""
+    holder = _get_holder()
+    with holder.lock:
+        holder.rebuild()
+
+
+def apply_watched(
+    previous_version, watched, updated_at, video_ids=None, playlist_id=None
+):
+    """
+    Patches the current app's catalog after `set_watched` wrote a change.
+
+    The catalog is only patched if it was up to date with the database before
+    the write; otherwise, or while it is being rebuilt, it is marked stale so
+    the next read compares versions and rebuilds it.
+
+    Args:
+        previous_version: The library version read before the write.
+        watched (bool): The new state.
+        updated_at (datetime): The time the update was written.
+        video_ids (Iterable[str], optional): The videos updated.
+        playlist_id (str, optional): The playlist whose videos were updated.
+    """
+    holder = _get_holder()
+    if not holder.lock.acquire(blocking=False):
+        holder.stale = True
+        return
+    try:
+        catalog = holder.catalog
+        if catalog is None:
+            return
+        if catalog.version != previous_version:
+            holder.stale = True
+            return
+        holder.catalog = catalog.with_watched(
+            library_version(),
+            watched,
+            updated_at,
+            video_ids=video_ids,
+            playlist_id=playlist_id,
+        )
+    finally:
+        holder.lock.release()
+
+
+def catalog_memory_report(catalog):
+    """
+    Measures the memory a catalog holds, following every object it references
+    once.
+
+    Returns:
+        dict: ``playlists`` and ``videos`` (counts), and the bytes held by
+        ``video_records``, ``playlist_records`` and ``indexes`` (the dicts
+        and tuples that hold and order the records), plus ``total``.
+    """
+    seen = set()
+
+    def size(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        total = sys.getsizeof(obj)
+        if isinstance(obj, tuple):
+            total += sum(size(item) for item in obj)
+        return total
+
+    video_records = sum(size(video) for video in catalog.videos.values())
+    playlist_records = sum(size(playlist) for playlist in catalog.playlists.values())
+    indexes = (
+        size(catalog.videos.base)
+        + size(catalog.videos.overlay)
+        + size(catalog.playlists)
+        + size(catalog.playlist_videos)
+        + sum(size(videos) for videos in catalog.playlist_videos.values())
+        + sum(size(ordering) for ordering in catalog._sorted.values())
+        + size(catalog.removed_video_ids)
+        + sum(size(ids) for ids in catalog.removed_video_ids.values())
+    )
+    return {
+        "playlists": len(catalog.playlists),
+        "videos": len(catalog.videos),
+        "video_records": video_records,
+        "playlist_records": playlist_records,
+        "indexes": indexes,
+        "total": video_records + playlist_records + indexes,
+    }
@@ -0,0 +1,88 @@
+"""
+Conditional GET support for library pages.
+
+Library pages only change when a sync writes to the database, so each page
+derives an ETag and Last-Modified date from ``updated_at`` columns with one
+indexed query before doing any other work. A repeat visit whose validators
+still match gets an empty 304 without the page being queried or rendered.
+"""
+
+import functools
+import hashlib
+from datetime import timezone
+
+from flask import make_response, request
+
+# The responses are per user, and must be revalidated on every visit.
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts):
+    """Returns a weak ETag for the given parts and the negotiated mimetype."""
+    key = repr((parts, request.accept_mimetypes.best))
+    return hashlib.sha1(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def _http_date(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def is_not_modified(etag, last_modified):
+    """
+    Returns True if the request's validators match the current ones.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since``.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return request.if_modified_since >= last_modified
+    return False
+
+
+def conditional(validators):
+    """
+    Answers GET requests with a 304 when the page has not changed.
+
+    Args:
+        validators (callable): Called with the view's arguments. Returns a
+            tuple of the page's last modification time (a datetime, or None)
+            and any values that should change the ETag, or None if the page
+            does not exist, in which case the view runs unconditionally.
+
+    Returns:
+        callable: The decorator.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            current = validators(*args, **kwargs)
+            if current is None:
+                return view(*args, **kwargs)
+
+            # The ETag keeps the full timestamp; Last-Modified only has seconds.
+            etag = make_etag(*current)
+            last_modified = _http_date(current[0])
+
+            if is_not_modified(etag, last_modified):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers["Cache-Control"] = CACHE_CONTROL
+            response.vary.add("Accept")
+            return response
+
+        return wrapper
+
+    return decorator
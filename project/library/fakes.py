@@ -0,0 +1,239 @@
+"""
+An offline stand-in for the YouTube Data API service object.
+
+`FakeYouTubeService` answers the ``list``/``list_next`` calls the sync and the
+subscription export make with a deterministic, generated library, so both can
+be run and benchmarked without credentials, network access or quota. Pages are
+generated on request and nothing is stored per video, so a library of 100k
+videos costs no more memory than a small one.
+"""
+
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+MAX_RESULTS = 50
+LIBRARY_EPOCH = datetime(2015, 1, 1)
+
+
+def _timestamp(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _thumbnails(url):
+    return {"default": {"url": url, "width": 120, "height": 90}}
+
+
+class FakeRequest:
+    """A pending ``list`` call, executed like a googleapiclient ``HttpRequest``."""
+
+    def __init__(self, service, resource, params):
+        self.service = service
+        self.resource = resource
+        self.params = params
+
+    def execute(self, http=None, num_retries=0):  # pylint: disable=unused-argument
+        return self.service.respond(self.resource, self.params)
+
+
+class FakeCollection:
+    """The ``playlists()``, ``playlistItems()`` or ``subscriptions()`` collection."""
+
+    def __init__(self, service, resource):
+        self.service = service
+        self.resource = resource
+
+    def list(self, **params):
+        return FakeRequest(self.service, self.resource, params)
+
+    def list_next(self, previous_request, previous_response):
+        page_token = previous_response.get("nextPageToken")
+        if not page_token:
+            return None
+        return FakeRequest(
+            self.service,
+            self.resource,
+            {**previous_request.params, "pageToken": page_token},
+        )
+
+
+class FakeYouTubeService:
+    """
+    A generated YouTube library served through the API's request interface.
+
+    Videos are spread as evenly as possible over the playlists. Every response
+    is derived from ``revision``, so bumping it changes every playlist's ETag
+    and every video's title, the way an edit on YouTube would.
+
+    The service holds no per-request state and can be shared between threads.
+
+    Args:
+        playlists (int): The number of playlists the user owns.
+        videos (int): The total number of videos across all playlists.
+        subscriptions (int): The number of channel subscriptions.
+        private_every (int): Mark every n-th video of a playlist private, so
+            the sync filters it out. 0 keeps every video public.
+        latency (float): Seconds each request sleeps before responding, to
+            simulate network round trips.
+        revision (int): The version of the library to serve.
+    """
+
+    def __init__(
+        self,
+        playlists=20,
+        videos=1000,
+        subscriptions=0,
+        private_every=0,
+        latency=0.0,
+        revision=0,
+    ):
+        self.playlist_ids = [f"PLfake{i:06d}" for i in range(playlists)]
+        self._playlist_index = {
+            playlist_id: i for i, playlist_id in enumerate(self.playlist_ids)
+        }
+        self.videos = videos
+        self.subscription_count = subscriptions
+        self.private_every = private_every
+        self.latency = latency
+        self.revision = revision
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def playlists(self):
+        return FakeCollection(self, "playlists")
+
+    def playlistItems(self):  # pylint: disable=invalid-name
+        return FakeCollection(self, "playlistItems")
+
+    def subscriptions(self):
+        return FakeCollection(self, "subscriptions")
+
+    @property
+    def requests_made(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def respond(self, resource, params):
+        """Builds the response to one executed request."""
+        with self._lock:
+            self.calls[resource] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if resource == "playlists":
+            return self._list_playlists(params)
+        if resource == "playlistItems":
+            return self._list_playlist_items(params)
+        return self._list_subscriptions(params)
+
+    def item_count(self, playlist_id):
+        """Returns the number of videos in one of the generated playlists."""
+        base, remainder = divmod(self.videos, len(self.playlist_ids))
+        return base + (1 if self._playlist_index[playlist_id] < remainder else 0)
+
+    def _page(self, params, total, build):
+        offset = int(params.get("pageToken") or 0)
+        max_results = min(int(params.get("maxResults", 5)), MAX_RESULTS)
+        end = min(offset + max_results, total)
+        response = {
+            "kind": "youtube#listResponse",
+            "pageInfo": {"totalResults": total, "resultsPerPage": max_results},
+            "items": [build(i) for i in range(offset, end)],
+        }
+        if end < total:
+            response["nextPageToken"] = str(end)
+        return response
+
+    def _list_playlists(self, params):
+        if "id" in params:
+            playlist_ids = [
+                playlist_id
+                for playlist_id in params["id"].split(",")
+                if playlist_id in self._playlist_index
+            ]
+        else:
+            playlist_ids = self.playlist_ids
+
+        return self._page(
+            params,
+            len(playlist_ids),
+            lambda i: self._playlist(playlist_ids[i]),
+        )
+
+    def _playlist(self, playlist_id):
+        index = self._playlist_index[playlist_id]
+        return {
+            "kind": "youtube#playlist",
+            "etag": f"{playlist_id}-r{self.revision}",
+            "id": playlist_id,
+            "snippet": {
+                "publishedAt": _timestamp(LIBRARY_EPOCH + timedelta(days=index)),
+                "title": f"Playlist {index}",
+                "description": f"Generated playlist {index}",
+                "thumbnails": _thumbnails(
+                    f"https://i.ytimg.com/vi/{playlist_id}/default.jpg"
+                ),
+            },
+            "contentDetails": {"itemCount": self.item_count(playlist_id)},
+        }
+
+    def _list_playlist_items(self, params):
+        playlist_id = params["playlistId"]
+        if playlist_id not in self._playlist_index:
+            return {"kind": "youtube#listResponse", "items": []}
+
+        return self._page(
+            params,
+            self.item_count(playlist_id),
+            lambda i: self._playlist_item(playlist_id, i),
+        )
+
+    def _playlist_item(self, playlist_id, position):
+        index = self._playlist_index[playlist_id]
+        video_id = f"v{index:05d}x{position:05d}"
+        private = self.private_every and (position + 1) % self.private_every == 0
+        return {
+            "kind": "youtube#playlistItem",
+            "etag": f"{video_id}-r{self.revision}",
+            "id": f"{playlist_id}-{position:06d}",
+            "snippet": {
+                "publishedAt": _timestamp(
+                    LIBRARY_EPOCH + timedelta(days=index, minutes=position)
+                ),
+                "title": f"Video {position} of playlist {index} (r{self.revision})",
+                "description": f"Generated video {video_id}",
+                "thumbnails": _thumbnails(
+                    f"https://i.ytimg.com/vi/{video_id}/default.jpg"
+                ),
+                "playlistId": playlist_id,
+                "position": position,
+                "resourceId": {"kind": "youtube#video", "videoId": video_id},
+            },
+            "contentDetails": {"videoId": video_id},
+            "status": {"privacyStatus": "private" if private else "public"},
+        }
+
+    def _list_subscriptions(self, params):
+        return self._page(params, self.subscription_count, self._subscription)
+
+    def _subscription(self, index):
+        channel_id = f"UCfake{index:016d}"
+        return {
+            "kind": "youtube#subscription",
+            "etag": f"{channel_id}-r{self.revision}",
+            "id": f"sub-{index:06d}",
+            "snippet": {
+                "publishedAt": _timestamp(LIBRARY_EPOCH + timedelta(hours=index)),
+                "title": f"Channel {index}",
+                "description": f"Generated channel {index}",
+                "resourceId": {"kind": "youtube#channel", "channelId": channel_id},
+                "channelId": "UCfakeuser",
+                "thumbnails": _thumbnails(f"https://yt3.ggpht.com/{channel_id}"),
+            },
+            "contentDetails": {
+                "totalItemCount": index % 500,
+                "newItemCount": 0,
+                "activityType": "all",
+            },
+        }
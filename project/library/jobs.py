@@ -1,33 +1,115 @@
+import functools
 import json
 import logging
 import os
-from datetime import datetime, timezone
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, closing, contextmanager
+from datetime import datetime, timedelta, timezone
 
 import flask
 import google.oauth2.credentials
-from flask import has_request_context
+import httplib2
+import requests
+from flask import current_app, has_request_context
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-
-from project.database import db
-from project.models import Playlist, Video
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from project.database import bulk_upsert, db
+from project.library.search import index_videos, unindex_videos
+from project.library.stats import (
+    PLAYLIST_ITEMS_LIST_COST,
+    PLAYLISTS_LIST_COST,
+    SyncStats,
+)
+from project.models import Playlist, Subscription, SyncRun, Video
 
 logger = logging.getLogger(__name__)
 
 CLIENT_SECRETS_FILE = "client_secret.json"
 TOKEN_FILE = "project/data/youtube_token.json"
+SAVED_PLAYLIST_IDS_FILE = "project/data/jsonfiles/youtube-ids.json"
+SUBSCRIPTIONS_EXPORT_FILE = "project/data/jsonfiles/youtube-subscriptions.json"
+SUBSCRIPTIONS_EXPORT_FORMATS = ("json", "ndjson")
 SCOPES = ["https://www.googleapis.com/auth/youtube.readonly"]
 GOOGLE_CLIENT_API_SERVICE_NAME = "youtube"
 GOOGLE_CLIENT_API_SERVICE_VERSION = "v3"
+DISCOVERY_DOCUMENT_URL = "https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest"
+DEFAULT_SYNC_WORKERS = 8
+DEFAULT_SYNC_CHUNK_SIZE = 500
+PLAYLISTS_LIST_MAX_IDS = 50
+# The most IDs bound into one IN (...) clause.
+MAX_IDS_PER_STATEMENT = 1000
+
+CREDENTIALS_REFRESH_MARGIN = timedelta(minutes=5)
+# A run still marked running after this long is taken to belong to a process
+# that died, and no longer blocks new syncs.
+SYNC_RUN_TIMEOUT = timedelta(hours=2)
+
+_thread_local = threading.local()
+# Service objects shared by every thread, keyed by credential identity.
+_services = {}
+_services_lock = threading.Lock()
+# Guards the token file and the credentials cached from it.
+_credentials_lock = threading.RLock()
+_cached_credentials = None
+_saved_token = None
+_token_file_stamp = None
+
+
+class SharedCredentials(google.oauth2.credentials.Credentials):
+    """
+    OAuth2 credentials whose token refresh is shared by concurrent callers.
+
+    A thread that needs a refresh while another thread is already refreshing
+    waits for that refresh and reuses its token instead of requesting a new one.
+    """
+
+    def __init__(self, *args, on_refresh=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._refresh_lock = threading.Lock()
+        self._on_refresh = on_refresh
+
+    def refresh(self, request):
+        token = self.token
+        with self._refresh_lock:
+            if self.token != token and self.valid:
+                return
+            logger.info("YouTube token expiring, refreshing")
+            super().refresh(request)
+            if self._on_refresh is not None:
+                self._on_refresh(self)
+
+
+def needs_refresh(credentials):
+    """Returns True if the token is missing or expires within the refresh margin."""
+    if not credentials.token:
+        return True
+    if credentials.expiry is None:
+        return False
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return credentials.expiry - CREDENTIALS_REFRESH_MARGIN <= now
 
 
 def save_credentials_to_file(credentials):
     """
     Save OAuth credentials to a JSON file for use by CLI commands.
 
+    The file is written to a temporary path and moved into place, so readers
+    never see a partially written file.
+
     Args:
         credentials: Google OAuth2 credentials object or dict.
     """
+    global _saved_token, _token_file_stamp
+
     if isinstance(credentials, dict):
         creds_dict = credentials
     else:
@@ -39,67 +121,102 @@ def save_credentials_to_file(credentials):
             "client_secret": credentials.client_secret,
             "scopes": credentials.scopes,
         }
+        if credentials.expiry is not None:
+            creds_dict["expiry"] = credentials.expiry.isoformat()
 
     os.makedirs(os.path.dirname(TOKEN_FILE), exist_ok=True)
-    with open(TOKEN_FILE, "w", encoding="utf-8") as f:
-        json.dump(creds_dict, f, indent=2)
-    print(f"Credentials saved to {TOKEN_FILE}")
+    with _credentials_lock:
+        tmp_path = f"{TOKEN_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(creds_dict, f, indent=2)
+        os.replace(tmp_path, TOKEN_FILE)
+        _saved_token = creds_dict.get("token")
+        if credentials is _cached_credentials:
+            _token_file_stamp = _stat_token_file()
+        else:
+            # Credentials saved from elsewhere replace the cached ones.
+            _token_file_stamp = None
+    logger.info("Credentials saved to %s", TOKEN_FILE)
+
+
+def _stat_token_file():
+    try:
+        stat = os.stat(TOKEN_FILE)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _save_refreshed_credentials(credentials):
+    if credentials.token != _saved_token:
+        save_credentials_to_file(credentials)
 
 
 def load_credentials_from_file():
     """
     Load OAuth credentials from a JSON file.
 
+    The parsed credentials are cached for the whole process, and the file is
+    only read again when it changes on disk. Credentials that expire within
+    ``CREDENTIALS_REFRESH_MARGIN`` are refreshed before they are returned.
+    Concurrent callers share a single refresh, and the file is only rewritten
+    when a refresh actually produced a new token.
+
     Returns:
         Google OAuth2 credentials object, or None if file doesn't exist.
     """
-    if not os.path.exists(TOKEN_FILE):
-        return None
-
-    with open(TOKEN_FILE, "r", encoding="utf-8") as f:
-        creds_dict = json.load(f)
+    global _cached_credentials, _saved_token, _token_file_stamp
+
+    with _credentials_lock:
+        stamp = _stat_token_file()
+        if stamp is None:
+            return None
+
+        if _cached_credentials is None or stamp != _token_file_stamp:
+            with open(TOKEN_FILE, "r", encoding="utf-8") as f:
+                creds_dict = json.load(f)
+
+            expiry = creds_dict.pop("expiry", None)
+            if expiry is not None:
+                expiry = datetime.fromisoformat(expiry).replace(tzinfo=None)
+            _cached_credentials = SharedCredentials(
+                **creds_dict, expiry=expiry, on_refresh=_save_refreshed_credentials
+            )
+            _saved_token = _cached_credentials.token
+            _token_file_stamp = stamp
 
-    credentials = google.oauth2.credentials.Credentials(**creds_dict)
+        credentials = _cached_credentials
 
-    # Refresh the token if it's expired
-    if credentials.expired and credentials.refresh_token:
-        print("Token expired, refreshing...")
+    # Refresh the token before it expires
+    if needs_refresh(credentials) and credentials.refresh_token:
         credentials.refresh(Request())
-        save_credentials_to_file(credentials)
 
     return credentials
 
 
-def get_youtube_service():
+def get_youtube_credentials():
     """
-    Returns a YouTube service object authenticated with the user's credentials.
-
-    This function uses the Google OAuth2 library to authenticate the user and obtain
-    the necessary credentials to access the YouTube API. It then creates and returns
-    a YouTube service object that can be used to interact with the YouTube API.
+    Returns the OAuth credentials used to access the YouTube API.
 
     When called from a web request context, credentials are loaded from the session.
     When called from a CLI command (outside request context), credentials are loaded
     from a token file.
 
     Returns:
-        A YouTube service object.
+        Google OAuth2 credentials object.
 
     Raises:
         ValueError: If credentials are not found in session or token file.
-        Any exceptions that may occur during the authentication process.
     """
-    print('Building YouTube service object')
-
     credentials = None
 
     # Try to get credentials from session if in request context
     if has_request_context() and "credentials" in flask.session:
-        print("Loading credentials from session")
-        credentials = google.oauth2.credentials.Credentials(**flask.session["credentials"])
+        logger.debug("Loading credentials from session")
+        credentials = SharedCredentials(**flask.session["credentials"])
     else:
         # Try to load from token file (for CLI commands)
-        print("Loading credentials from token file")
+        logger.debug("Loading credentials from token file")
         credentials = load_credentials_from_file()
 
     if credentials is None:
@@ -107,106 +224,323 @@ def get_youtube_service():
             "YouTube credentials not found. "
             "Please authorize the app first by visiting /oauth/authorize in your browser."
         )
-        print(f"ERROR: {error_msg}")
+        logger.error(error_msg)
         raise ValueError(error_msg)
 
-    return build(
-        GOOGLE_CLIENT_API_SERVICE_NAME,
-        GOOGLE_CLIENT_API_SERVICE_VERSION,
-        credentials=credentials,
+    return credentials
+
+
+@functools.cache
+def get_discovery_document():
+    """
+    Returns the parsed YouTube API discovery document.
+
+    The copy bundled with google-api-python-client is read and parsed once per
+    process. If the installed client does not bundle it, it is downloaded once
+    instead.
+
+    Returns:
+        dict: The discovery document.
+    """
+    document = discovery_cache.get_static_doc(
+        GOOGLE_CLIENT_API_SERVICE_NAME, GOOGLE_CLIENT_API_SERVICE_VERSION
+    )
+    if document is None:
+        response = requests.get(DISCOVERY_DOCUMENT_URL, timeout=10)
+        response.raise_for_status()
+        document = response.text
+    return json.loads(document)
+
+
+class ThreadHttp:
+    """
+    A transport that sends each request through the calling thread's
+    `get_thread_http` transport.
+
+    Shared service objects are built with it, so they hold no transport or
+    credentials of their own and can be used from any thread.
+    """
+
+    def request(self, *args, **kwargs):
+        return self._http().request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._http(), name)
+
+    @staticmethod
+    def _http():
+        http = getattr(_thread_local, "http", None)
+        if http is None:
+            raise RuntimeError(
+                "No YouTube credentials are bound to this thread; "
+                "call build_youtube_service or get_thread_http first"
+            )
+        return http
+
+
+def build_youtube_service(credentials):
+    """
+    Returns a YouTube service object authenticated with the given credentials.
+
+    Service objects are built once per process from the cached discovery
+    document, keyed by the credentials' client ID and refresh token only, so a
+    token refresh never rebuilds them. They execute requests through
+    `ThreadHttp`, and this call binds ``credentials`` to the calling thread's
+    transport, so the same service is safe to share between threads.
+
+    Args:
+        credentials: Google OAuth2 credentials object.
+
+    Returns:
+        A YouTube service object.
+    """
+    key = (
+        getattr(credentials, "client_id", None),
+        getattr(credentials, "refresh_token", None),
     )
+    get_thread_http(credentials)
+
+    service = _services.get(key)
+    if service is None:
+        with _services_lock:
+            service = _services.get(key)
+            if service is None:
+                logger.debug("Building YouTube service object")
+                service = build_from_document(
+                    get_discovery_document(), http=ThreadHttp()
+                )
+                _services[key] = service
+    return service
+
+
+def get_youtube_service():
+    """
+    Returns a YouTube service object authenticated with the user's credentials.
+
+    This function uses the Google OAuth2 library to authenticate the user and obtain
+    the necessary credentials to access the YouTube API. It then creates and returns
+    a YouTube service object that can be used to interact with the YouTube API.
+
+    Credentials are resolved by `get_youtube_credentials`.
+
+    Returns:
+        A YouTube service object.
+
+    Raises:
+        ValueError: If credentials are not found in session or token file.
+        Any exceptions that may occur during the authentication process.
+    """
+    return build_youtube_service(get_youtube_credentials())
 
 
-def fetch_playlists(youtube_service):
+def get_thread_http(credentials):
+    """
+    Returns an authorized HTTP transport owned by the calling thread.
+
+    httplib2 transports are not thread-safe, so each thread executes requests
+    with its own. The transport is created on first use and reused for later
+    calls from the same thread with the same credentials. Service objects from
+    `build_youtube_service` send their requests through it.
+
+    Args:
+        credentials: Google OAuth2 credentials object.
+
+    Returns:
+        google_auth_httplib2.AuthorizedHttp: The calling thread's transport.
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None or http.credentials is not credentials:
+        http = AuthorizedHttp(credentials, http=httplib2.Http())
+        _thread_local.http = http
+    return http
+
+
+def load_saved_playlist_ids():
+    """
+    Loads the IDs of saved (not created) playlists to sync.
+
+    Returns:
+        list[str]: The playlist IDs listed in ``SAVED_PLAYLIST_IDS_FILE``.
+    """
+    with open(SAVED_PLAYLIST_IDS_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fetch_playlists_by_id(youtube_service, playlist_ids, stats=None):
+    """
+    Looks up playlists by ID, up to 50 IDs per API call.
+
+    ``playlists().list`` accepts a comma-separated list of up to
+    ``PLAYLISTS_LIST_MAX_IDS`` IDs, so a few hundred saved playlists cost a
+    handful of requests instead of one request each.
+
+    Args:
+        youtube_service: The YouTube service object.
+        playlist_ids (Iterable[str]): The IDs of the playlists to look up.
+        stats (SyncStats, optional): Counts the API calls made.
+
+    Returns:
+        tuple[list, list[str]]: The playlist resources that were found, and the
+        IDs that no longer resolve (deleted or made private).
+    """
+    playlist_ids = list(dict.fromkeys(playlist_ids))
+    playlists = []
+
+    for start in range(0, len(playlist_ids), PLAYLISTS_LIST_MAX_IDS):
+        chunk = playlist_ids[start : start + PLAYLISTS_LIST_MAX_IDS]
+        request = youtube_service.playlists().list(  # pylint: disable=no-member
+            part="snippet,contentDetails",
+            id=",".join(chunk),
+            maxResults=PLAYLISTS_LIST_MAX_IDS,
+        )
+        response = request.execute()
+        if stats is not None:
+            stats.record_api_call(PLAYLISTS_LIST_COST)
+        playlists.extend(response.get("items", []))
+
+    found_ids = {playlist["id"] for playlist in playlists}
+    missing_ids = [
+        playlist_id for playlist_id in playlist_ids if playlist_id not in found_ids
+    ]
+    if missing_ids:
+        logger.warning(
+            "%d saved playlists no longer resolve: %s",
+            len(missing_ids),
+            ", ".join(missing_ids),
+        )
+
+    return playlists, missing_ids
+
+
+def fetch_playlists(youtube_service, stats=None, saved_playlist_ids=None):
     """
     Fetches playlists from YouTube using the YouTube Data API.
 
+    Args:
+        youtube_service: The YouTube service object.
+        stats (SyncStats, optional): Counts the API calls made.
+        saved_playlist_ids (Iterable[str], optional): The saved playlists to
+            fetch alongside the created ones. Defaults to the IDs returned by
+            `load_saved_playlist_ids`.
+
     Returns:
         A list of playlists retrieved from YouTube.
     """
     playlists = []
 
-    with open("project/data/jsonfiles/youtube-ids.json", "r", encoding="utf-8") as f:
-        playlist_ids = json.load(f)
-
-    print("""
-    ##########################
-    Fetching created playlists
-    ##########################
-    """)
+    logger.info("Fetching created playlists")
 
     request = youtube_service.playlists().list(  # pylint: disable=no-member
         part="snippet,contentDetails", mine=True, maxResults=50
     )
     while request is not None:
         response = request.execute()
+        if stats is not None:
+            stats.record_api_call(PLAYLISTS_LIST_COST)
         playlists.extend(response.get("items", []))
         request = youtube_service.playlists().list_next(  # pylint: disable=no-member
             request, response
         )
 
-    print("""
-    ##########################
-    Fetching saved playlists
-    ##########################
-    """)
+    logger.info("Fetching saved playlists")
 
-    for playlist_id in playlist_ids:
-        request = youtube_service.playlists().list(  # pylint: disable=no-member
-            part="snippet,contentDetails", id=playlist_id
-        )
-        response = request.execute()
-        playlists.extend(response.get("items", []))
+    if saved_playlist_ids is None:
+        saved_playlist_ids = load_saved_playlist_ids()
+    saved_playlists, _ = fetch_playlists_by_id(
+        youtube_service, saved_playlist_ids, stats=stats
+    )
+    playlists.extend(saved_playlists)
 
     return playlists
 
 
-def fetch_videos(playlist_id, youtube_service):
+def iter_video_pages(playlist_id, youtube_service, http=None):
     """
-    Fetches videos from a YouTube playlist.
+    Yields the videos of a YouTube playlist one API page at a time.
 
     Args:
         playlist_id (str): The ID of the YouTube playlist.
+        youtube_service: The YouTube service object used to build requests.
+        http (optional): The HTTP transport used to execute requests. Defaults
+            to the service's own transport, which for services from
+            `build_youtube_service` is the calling thread's.
 
-    Returns:
-        list: A list of video items from the playlist.
+    Yields:
+        list: The video items on each page, up to 50 per page.
     """
-    videos = []
-
-    print(f'Fetching videos for Playlist {playlist_id}')
+    logger.debug("Fetching videos for playlist %s", playlist_id)
     request = youtube_service.playlistItems().list(  # pylint: disable=no-member
         part="snippet,contentDetails,status", playlistId=playlist_id, maxResults=50
     )
     while request is not None:
-        response = request.execute()
-        videos.extend(response.get("items", []))
+        response = request.execute(http=http)
+        yield response.get("items", [])
         request = youtube_service.playlistItems().list_next(  # pylint: disable=no-member
             request, response
         )
 
-    return videos
+
+def fetch_videos(playlist_id, youtube_service, http=None):
+    """
+    Fetches videos from a YouTube playlist.
+
+    Args:
+        playlist_id (str): The ID of the YouTube playlist.
+        youtube_service: The YouTube service object used to build requests.
+        http (optional): The HTTP transport used to execute requests.
+
+    Returns:
+        list: A list of video items from the playlist.
+    """
+    return [
+        video
+        for page in iter_video_pages(playlist_id, youtube_service, http=http)
+        for video in page
+    ]
+
 
 def check_video_availability(video):
     if video['snippet']['title'] == 'Deleted video' or video['snippet']['description'] == 'This video is unavailable':
-        print(f'Video {video['id']} is unavailable or has been deleted.')
+        logger.debug("Video %s is unavailable or has been deleted.", video["id"])
         return False
 
     video_status = video['status']
 
     if video_status.get('uploadStatus') == 'rejected':
-        print(f"Video {video['id']} was rejected.")
+        logger.debug("Video %s was rejected.", video["id"])
         return False
     if video_status.get('privacyStatus') == 'private':
-        print(f"Video {video['id']} is private.")
+        logger.debug("Video %s is private.", video["id"])
         return False
     if video_status.get('license') == 'youtube' and video_status.get('uploadStatus') == 'deleted':
-        print(f"Video {video['id']} has been deleted.")
+        logger.debug("Video %s has been deleted.", video["id"])
         return False
 
-    print(f"Video {video['id']} is available.")
+    logger.debug("Video %s is available.", video["id"])
     return True
 
 
+def iter_subscription_pages(youtube_service):
+    """
+    Yields the authenticated user's channel subscriptions one API page at a time.
+
+    Args:
+        youtube_service: Authenticated YouTube API service object.
+
+    Yields:
+        list: The subscription items on each page, up to 50 per page.
+    """
+    request = youtube_service.subscriptions().list(  # pylint: disable=no-member
+        part="snippet,contentDetails", mine=True, maxResults=50
+    )
+    while request is not None:
+        response = request.execute()
+        yield response.get("items", [])
+        request = youtube_service.subscriptions().list_next(  # pylint: disable=no-member
+            request, response
+        )
+
+
 def fetch_subscriptions(youtube_service):
     """
     Fetches all YouTube channel subscriptions for the authenticated user.
@@ -219,41 +553,141 @@ def fetch_subscriptions(youtube_service):
     """
     subscriptions = []
 
-    print("""
-    ##########################
-    Fetching subscriptions
-    ##########################
-    """)
+    logger.info("Fetching subscriptions")
 
     try:
-        request = youtube_service.subscriptions().list(  # pylint: disable=no-member
-            part="snippet,contentDetails", mine=True, maxResults=50
-        )
-        
-        while request is not None:
-            print(f"Making API request... (currently have {len(subscriptions)} subscriptions)")
-            response = request.execute()
-            items = response.get("items", [])
-            print(f"Received {len(items)} items in this batch")
+        for items in iter_subscription_pages(youtube_service):
+            logger.debug("Received %d subscriptions in this page", len(items))
             subscriptions.extend(items)
-            request = youtube_service.subscriptions().list_next(  # pylint: disable=no-member
-                request, response
-            )
-        
-        print(f"Fetched {len(subscriptions)} total subscriptions")
+
+        logger.info("Fetched %d subscriptions", len(subscriptions))
         return subscriptions
-    except Exception as e:
-        print(f"ERROR fetching subscriptions: {str(e)}")
-        logger.error(f"Error fetching subscriptions: {str(e)}")
+    except Exception:
+        logger.exception("Error fetching subscriptions")
         raise
 
 
-def export_subscriptions_to_json():
+def subscription_to_record(subscription):
+    """
+    Maps a subscription resource from the YouTube API to an export record.
+
+    Args:
+        subscription (dict): A subscription resource.
+
+    Returns:
+        dict: The channel's ``channel_id``, ``channel_title``,
+        ``description``, ``thumbnail_url``, ``subscribed_at`` and
+        ``total_item_count``.
+    """
+    snippet = subscription["snippet"]
+    return {
+        "channel_id": snippet["resourceId"]["channelId"],
+        "channel_title": snippet["title"],
+        "description": snippet.get("description", ""),
+        "thumbnail_url": snippet.get("thumbnails", {}).get("default", {}).get("url"),
+        "subscribed_at": snippet["publishedAt"],
+        "total_item_count": subscription["contentDetails"].get("totalItemCount", 0),
+    }
+
+
+def subscriptions_export_format(path):
+    """Returns the export format of a file from its extension."""
+    return "ndjson" if path.endswith(".ndjson") else "json"
+
+
+def subscriptions_changes_path(output_path):
+    """Returns the file that delta exports of ``output_path`` append to."""
+    return f"{os.path.splitext(output_path)[0]}-changes.ndjson"
+
+
+def load_exported_channels(path):
+    """
+    Reads the channels of a previous subscription export.
+
+    Args:
+        path (str): A file written by `export_subscriptions_to_json`, in
+            either format.
+
+    Returns:
+        dict: Channel titles keyed by channel ID. Empty if there is no file.
+    """
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return {}
+
+    with f:
+        if subscriptions_export_format(path) == "ndjson":
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = json.load(f).get("subscriptions", [])
+        return {record["channel_id"]: record["channel_title"] for record in records}
+
+
+@contextmanager
+def _replace_on_success(path, mode="w"):
+    """Writes to a temporary file that only replaces ``path`` if no error is raised."""
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, mode, encoding="utf-8") as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class SubscriptionExportWriter:
+    """
+    Writes subscription records to an open file as they arrive.
+
+    In ``json`` format the file is a single object with ``fetched_at``,
+    ``subscriptions`` (one record per line) and ``total_subscriptions``. In
+    ``ndjson`` format each line is one record.
+
+    Args:
+        f: The text file to write to.
+        export_format (str): ``"json"`` or ``"ndjson"``.
+        fetched_at (str): When the export started, as an ISO 8601 timestamp.
+    """
+
+    def __init__(self, f, export_format, fetched_at):
+        if export_format not in SUBSCRIPTIONS_EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        self.f = f
+        self.export_format = export_format
+        self.count = 0
+        if export_format == "json":
+            f.write(f'{{"fetched_at": {json.dumps(fetched_at)}, "subscriptions": [')
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        if self.export_format == "ndjson":
+            self.f.write(f"{line}\n")
+        else:
+            self.f.write(f"{',' if self.count else ''}\n  {line}")
+        self.count += 1
+
+    def close(self):
+        if self.export_format == "json":
+            self.f.write(f'\n], "total_subscriptions": {self.count}}}\n')
+
+
+def export_subscriptions_to_json(
+    youtube_service=None,
+    output_path=SUBSCRIPTIONS_EXPORT_FILE,
+    export_format=None,
+    delta=False,
+    changes_path=None,
+):
     """
     Fetches YouTube channel subscriptions and exports them to a JSON file.
 
     This function retrieves all channels the authenticated user is subscribed to
-    and saves the data to 'project/data/jsonfiles/youtube-subscriptions.json'.
+    and saves the data to ``output_path``. Each page of subscriptions is written
+    as soon as it is fetched, to a temporary file that replaces ``output_path``
+    once the export succeeds, so memory use does not grow with the number of
+    subscriptions.
 
     The exported data includes:
     - Channel ID
@@ -263,188 +697,824 @@ def export_subscriptions_to_json():
     - Published date (when subscription was created)
     - Total upload count
 
+    In delta mode the channels are also compared by ID with the previous export
+    at ``output_path``, and only the subscriptions added or removed since are
+    appended to ``changes_path`` as NDJSON records with a ``change`` of
+    ``"added"`` or ``"removed"`` and an ``exported_at`` timestamp. Only the
+    channel IDs and titles of the previous export are held in memory.
+
+    Args:
+        youtube_service (optional): The YouTube service object. Defaults to the
+            one returned by `get_youtube_service`.
+        output_path (str): The file to write. Defaults to
+            ``SUBSCRIPTIONS_EXPORT_FILE``.
+        export_format (str, optional): ``"json"`` or ``"ndjson"``. Defaults to
+            ``"ndjson"`` for ``.ndjson`` files and ``"json"`` otherwise.
+        delta (bool): Record the subscriptions added or removed since the
+            previous export.
+        changes_path (str, optional): The file delta records are appended to.
+            Defaults to ``output_path`` with a ``-changes.ndjson`` suffix.
+
     Returns:
-        dict: A dictionary containing the subscription data and metadata.
+        dict: The export's ``fetched_at``, ``total_subscriptions``,
+        ``output_path`` and ``format``. Delta exports also have ``added``,
+        ``removed`` and ``changes_path``.
 
     Raises:
+        ValueError: If ``export_format`` is not a known format.
         Any exceptions that may occur during the API call or file write.
     """
     try:
-        print("Getting YouTube service...")
-        service = get_youtube_service()
-        
-        print("Fetching subscriptions...")
-        subscriptions = fetch_subscriptions(service)
-        
-        print(f"Processing {len(subscriptions)} subscriptions...")
-        # Format the data for export
-        formatted_subscriptions = []
-        for i, sub in enumerate(subscriptions):
+        if export_format is None:
+            export_format = subscriptions_export_format(output_path)
+        if youtube_service is None:
+            logger.debug("Getting YouTube service")
+            youtube_service = get_youtube_service()
+
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        result = {
+            "fetched_at": fetched_at,
+            "output_path": output_path,
+            "format": export_format,
+        }
+        if delta:
+            previous = load_exported_channels(output_path)
+            seen = set()
+            changes_path = changes_path or subscriptions_changes_path(output_path)
+            result.update(added=0, removed=0, changes_path=changes_path)
+
+        logger.info("Fetching subscriptions and writing to %s", output_path)
+        with ExitStack() as stack:
+            if delta:
+                # Changes are appended to the log once the export has succeeded.
+                changes = stack.enter_context(
+                    tempfile.TemporaryFile("w+", encoding="utf-8")
+                )
+
+            with _replace_on_success(output_path) as f:
+                writer = SubscriptionExportWriter(f, export_format, fetched_at)
+                for items in iter_subscription_pages(youtube_service):
+                    for i, sub in enumerate(items):
+                        try:
+                            record = subscription_to_record(sub)
+                        except Exception:
+                            logger.exception("Error processing subscription %d", i)
+                            continue
+                        writer.write(record)
+
+                        if delta and record["channel_id"] not in seen:
+                            seen.add(record["channel_id"])
+                            if record["channel_id"] not in previous:
+                                change = {"change": "added", "exported_at": fetched_at}
+                                line = json.dumps(change | record, ensure_ascii=False)
+                                changes.write(f"{line}\n")
+                                result["added"] += 1
+                    logger.debug("Wrote %d subscriptions so far", writer.count)
+                writer.close()
+
+            if delta:
+                for channel_id, channel_title in previous.items():
+                    if channel_id not in seen:
+                        change = {
+                            "change": "removed",
+                            "exported_at": fetched_at,
+                            "channel_id": channel_id,
+                            "channel_title": channel_title,
+                        }
+                        changes.write(f"{json.dumps(change, ensure_ascii=False)}\n")
+                        result["removed"] += 1
+                changes.seek(0)
+                with open(changes_path, "a", encoding="utf-8") as log:
+                    shutil.copyfileobj(changes, log)
+
+        result["total_subscriptions"] = writer.count
+        logger.info(
+            "Exported %d YouTube subscriptions to %s", writer.count, output_path
+        )
+        if delta:
+            logger.info(
+                "%d subscriptions added and %d removed since the previous export",
+                result["added"],
+                result["removed"],
+            )
+
+        return result
+    except Exception:
+        logger.exception("Error exporting subscriptions to %s", output_path)
+        raise
+
+
+SUBSCRIPTION_FIELDS = (
+    "title",
+    "description",
+    "thumbnail_url",
+    "subscribed_at",
+    "total_item_count",
+    "etag",
+    "updated_at",
+)
+PLAYLIST_FIELDS = ("title", "description", "published_at", "thumbnail_url")
+PLAYLIST_SYNC_STATE_FIELDS = ("etag", "item_count")
+VIDEO_FIELDS = (
+    "playlist_id",
+    "video_url_id",
+    "title",
+    "description",
+    "published_at",
+    "thumbnail_url",
+    "embed_url",
+    "removed_at",
+)
+
+
+def parse_published_at(value):
+    """Converts a YouTube ``publishedAt`` timestamp to a naive UTC datetime."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def playlist_to_row(playlist):
+    """
+    Maps a playlist resource from the YouTube API to ``Playlist`` column values.
+
+    Args:
+        playlist (dict): A playlist resource.
+
+    Returns:
+        dict: The column values, keyed by ``PLAYLIST_FIELDS``,
+        ``PLAYLIST_SYNC_STATE_FIELDS`` and ``id``.
+    """
+    snippet = playlist["snippet"]
+    return {
+        "id": playlist["id"],
+        "title": snippet["title"],
+        "description": snippet.get("description"),
+        "published_at": parse_published_at(snippet["publishedAt"]),
+        "thumbnail_url": snippet.get("thumbnails", {}).get("default", {}).get("url"),
+        "etag": playlist.get("etag"),
+        "item_count": playlist.get("contentDetails", {}).get("itemCount"),
+    }
+
+
+def video_to_row(video, playlist_id):
+    """
+    Maps a playlist item resource from the YouTube API to ``Video`` column values.
+
+    Args:
+        video (dict): A playlistItem resource.
+        playlist_id (str): The ID of the playlist the item belongs to.
+
+    Returns:
+        dict: The column values, keyed by ``VIDEO_FIELDS`` plus ``id``. A
+        fetched video is never removed, so ``removed_at`` is always None.
+    """
+    snippet = video["snippet"]
+    video_url_id = video["contentDetails"]["videoId"]
+    return {
+        "id": video["id"],
+        "playlist_id": playlist_id,
+        "video_url_id": video_url_id,
+        "title": snippet["title"],
+        "description": snippet.get("description"),
+        "published_at": parse_published_at(snippet["publishedAt"]),
+        "thumbnail_url": snippet.get("thumbnails", {}).get("default", {}).get("url"),
+        "embed_url": f"https://www.youtube.com/embed/{video_url_id}",
+        "removed_at": None,
+    }
+
+
+def load_existing_rows(model, fields, *criteria):
+    """
+    Loads the stored values of ``fields`` for every matching row in one query.
+
+    Args:
+        model: The mapped model class to read from.
+        fields (Iterable[str]): The column names to load.
+        *criteria: Optional filter expressions.
+
+    Returns:
+        dict: A mapping of primary key to a tuple of the stored field values.
+    """
+    columns = [getattr(model, field) for field in fields]
+    stmt = select(model.id, *columns).where(*criteria)
+    return {row[0]: tuple(row[1:]) for row in db.session.execute(stmt)}
+
+
+def diff_rows(rows, existing, fields):
+    """
+    Splits fetched rows into inserts and updates against the stored values.
+
+    Rows whose stored values all match are dropped.
+
+    Args:
+        rows (Iterable[dict]): Fetched column values, each including ``id``.
+        existing (dict): Stored values as returned by ``load_existing_rows``.
+        fields (Iterable[str]): The columns to compare.
+
+    Returns:
+        tuple[list[dict], list[dict]]: The rows to insert and the rows to update.
+    """
+    inserts, updates = [], []
+    for row in rows:
+        stored = existing.get(row["id"])
+        if stored is None:
+            inserts.append(row)
+        elif stored != tuple(row[field] for field in fields):
+            updates.append(row)
+    return inserts, updates
+
+
+def remove_missing_videos(playlist_id, fetched_ids, removed_at):
+    """
+    Soft-deletes the stored videos of a playlist that were not fetched.
+
+    The playlist's current video IDs are loaded in one query and compared
+    with the fetched ones in memory. The leftovers, videos removed from the
+    playlist on YouTube or no longer available, are marked removed in bulk
+    UPDATEs of up to ``MAX_IDS_PER_STATEMENT`` IDs, and dropped from the search
+    index. A removed video that shows up again is restored by the next upsert.
+
+    Args:
+        playlist_id (str): The playlist that was fetched in full.
+        fetched_ids (set[str]): The IDs of every available video fetched.
+        removed_at (datetime): The time to record as the removal time.
+
+    Returns:
+        int: The number of videos marked removed.
+    """
+    stored_ids = db.session.scalars(
+        select(Video.id).where(
+            Video.playlist_id == playlist_id, Video.removed_at.is_(None)
+        )
+    )
+    missing_ids = [video_id for video_id in stored_ids if video_id not in fetched_ids]
+
+    for start in range(0, len(missing_ids), MAX_IDS_PER_STATEMENT):
+        db.session.execute(
+            update(Video)
+            .where(Video.id.in_(missing_ids[start : start + MAX_IDS_PER_STATEMENT]))
+            .values(removed_at=removed_at)
+            .execution_options(synchronize_session=False)
+        )
+    unindex_videos(missing_ids)
+    return len(missing_ids)
+
+
+def purge_removed_videos(older_than):
+    """
+    Deletes videos that were marked removed more than ``older_than`` ago.
+
+    Args:
+        older_than (timedelta): How long removed videos are kept.
+
+    Returns:
+        int: The number of videos deleted.
+    """
+    cutoff = datetime.now(timezone.utc) - older_than
+    expired = Video.removed_at < cutoff
+    unindex_videos(db.session.scalars(select(Video.id).where(expired)))
+    purged = db.session.execute(
+        delete(Video).where(expired).execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    logger.info("Purged %d removed videos", purged)
+    return purged
+
+
+def subscription_to_row(subscription, updated_at):
+    """
+    Maps a subscription resource from the YouTube API to ``Subscription``
+    column values.
+
+    Args:
+        subscription (dict): A subscription resource.
+        updated_at (datetime): The time to record as the row's update time.
+
+    Returns:
+        dict: The column values, keyed by ``SUBSCRIPTION_FIELDS`` and
+        ``channel_id``.
+    """
+    record = subscription_to_record(subscription)
+    return {
+        "channel_id": record["channel_id"],
+        "title": record["channel_title"],
+        "description": record["description"],
+        "thumbnail_url": record["thumbnail_url"],
+        "subscribed_at": parse_published_at(record["subscribed_at"]),
+        "total_item_count": record["total_item_count"],
+        "etag": subscription.get("etag"),
+        "updated_at": updated_at,
+    }
+
+
+def sync_subscriptions(youtube_service=None):
+    """
+    Stores the authenticated user's channel subscriptions in the database.
+
+    The stored ETags are loaded in one query. Each page fetched is then
+    written with one bulk upsert of the subscriptions that are new or whose
+    ETag changed. Once every page was fetched, subscriptions that no longer
+    exist on YouTube are deleted in batches of up to
+    ``MAX_IDS_PER_STATEMENT`` IDs.
+
+    Args:
+        youtube_service (optional): The YouTube service object. Defaults to the
+            one returned by `get_youtube_service`.
+
+    Returns:
+        dict: The numbers of subscriptions ``fetched``, ``written`` and
+        ``removed``.
+    """
+    if youtube_service is None:
+        youtube_service = get_youtube_service()
+
+    stored_etags = dict(
+        db.session.execute(select(Subscription.channel_id, Subscription.etag)).all()
+    )
+    now = datetime.now(timezone.utc)
+    fetched_ids = set()
+    written = 0
+
+    for items in iter_subscription_pages(youtube_service):
+        rows = {}
+        for subscription in items:
             try:
-                channel_info = {
-                    "channel_id": sub["snippet"]["resourceId"]["channelId"],
-                    "channel_title": sub["snippet"]["title"],
-                    "description": sub["snippet"].get("description", ""),
-                    "thumbnail_url": sub["snippet"].get("thumbnails", {}).get("default", {}).get("url"),
-                    "subscribed_at": sub["snippet"]["publishedAt"],
-                    "total_item_count": sub["contentDetails"].get("totalItemCount", 0),
-                }
-                formatted_subscriptions.append(channel_info)
-            except Exception as e:
-                print(f"Error processing subscription {i}: {str(e)}")
-                logger.error(f"Error processing subscription {i}: {str(e)}")
+                row = subscription_to_row(subscription, now)
+            except (KeyError, ValueError) as e:
+                logger.error("Error processing subscription: %s", e)
                 continue
+            rows[row["channel_id"]] = row
+        fetched_ids.update(rows)
+        written += bulk_upsert(
+            Subscription,
+            [
+                row
+                for channel_id, row in rows.items()
+                if row["etag"] is None or stored_etags.get(channel_id) != row["etag"]
+            ],
+            SUBSCRIPTION_FIELDS,
+            index_elements=("channel_id",),
+        )
 
-        # Create output dictionary with metadata
-        output_data = {
-            "fetched_at": datetime.now(timezone.utc).isoformat(),
-            "total_subscriptions": len(formatted_subscriptions),
-            "subscriptions": formatted_subscriptions,
-        }
+    removed_ids = [
+        channel_id for channel_id in stored_etags if channel_id not in fetched_ids
+    ]
+    for start in range(0, len(removed_ids), MAX_IDS_PER_STATEMENT):
+        db.session.execute(
+            delete(Subscription)
+            .where(
+                Subscription.channel_id.in_(
+                    removed_ids[start : start + MAX_IDS_PER_STATEMENT]
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+
+    result = {
+        "fetched": len(fetched_ids),
+        "written": written,
+        "removed": len(removed_ids),
+    }
+    logger.info(
+        "Synced %(fetched)d subscriptions: %(written)d written, %(removed)d removed",
+        result,
+    )
+    return result
 
-        # Write to JSON file
-        output_path = "project/data/jsonfiles/youtube-subscriptions.json"
-        print(f"Writing to {output_path}...")
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
 
-        print(f"Successfully exported {len(formatted_subscriptions)} subscriptions to {output_path}")
-        logger.info(f"Exported {len(formatted_subscriptions)} YouTube subscriptions to {output_path}")
-        
-        return output_data
-    except Exception as e:
-        print(f"ERROR in export_subscriptions_to_json: {str(e)}")
-        logger.error(f"Error in export_subscriptions_to_json: {str(e)}")
-        raise
+def _put_until_stopped(pages, item, stop):
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def iter_video_pages_concurrently(
+    playlist_ids, youtube_service, credentials, max_workers
+):
+    """
+    Fetches the videos of many playlists on a bounded pool of worker threads.
+
+    Each worker binds its own authorized transport from `get_thread_http`, so
+    the shared service object is only used to build requests. Without
+    credentials, requests are executed with the service's own transport, which
+    is only safe for thread-safe stand-ins such as `FakeYouTubeService`.
+
+    Pages are handed to the calling thread through a queue holding at most two
+    pages per worker, so database writes stay on a single thread and memory
+    stays bounded however large the playlists are.
+
+    Args:
+        playlist_ids (Iterable[str]): The IDs of the playlists to fetch.
+        youtube_service: The YouTube service object used to build requests.
+        credentials: The credentials each worker's transport authorizes with,
+            or None to use the service's own transport.
+        max_workers (int): The maximum number of concurrent fetches.
+
+    Yields:
+        tuple[str, list | None]: A playlist ID and a page of its video items,
+        as pages arrive. Each playlist ends with a ``None`` page once all of
+        its pages have been yielded.
 
+    Raises:
+        Any exception raised while fetching a playlist.
+    """
+    pages = queue.Queue(maxsize=max_workers * 2)
+    stop = threading.Event()
+
+    def fetch(playlist_id):
+        try:
+            http = get_thread_http(credentials) if credentials is not None else None
+            for page in iter_video_pages(playlist_id, youtube_service, http=http):
+                if not _put_until_stopped(pages, (playlist_id, page), stop):
+                    return
+            _put_until_stopped(pages, (playlist_id, None), stop)
+        except Exception as e:  # pylint: disable=broad-except
+            _put_until_stopped(pages, (playlist_id, e), stop)
+
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="youtube-fetch"
+    )
+    try:
+        remaining = 0
+        for playlist_id in playlist_ids:
+            executor.submit(fetch, playlist_id)
+            remaining += 1
+
+        while remaining:
+            playlist_id, page = pages.get()
+            if isinstance(page, Exception):
+                raise page
+            if page is None:
+                remaining -= 1
+            yield playlist_id, page
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class SyncAlreadyRunning(Exception):
+    """
+    Raised when a sync is started while another one is running, whether in
+    this process, another web worker or the ``sync-yt-subs`` command.
+    """
+
+    def __init__(self, run):
+        super().__init__(
+            f"A sync started at {run.started_at:%Y-%m-%d %H:%M:%S} is already running"
+        )
+        self.run = run
+
+
+def claim_sync_run(started_at=None):
+    """
+    Saves a `SyncRun` row marked running, unless another run already is.
 
-def sync_playlists_and_videos():
+    The ``sync_run`` table allows only one running row, so of two syncs that
+    start at once the second one's INSERT fails, whichever process it runs in.
+    Runs left running for longer than `SYNC_RUN_TIMEOUT` are marked abandoned
+    first.
+
+    Args:
+        started_at (datetime, optional): When the run started. Defaults to now.
+
+    Returns:
+        int: The ID of the claimed run, to pass to `sync_playlists_and_videos`.
+
+    Raises:
+        SyncAlreadyRunning: If another run is still running.
+    """
+    now = datetime.now(timezone.utc)
+    while True:
+        db.session.execute(
+            update(SyncRun)
+            .where(
+                SyncRun.status == "running",
+                SyncRun.started_at < now - SYNC_RUN_TIMEOUT,
+            )
+            .values(status="abandoned", finished_at=now)
+        )
+        run = SyncRun(started_at=started_at or now, status="running")
+        db.session.add(run)
+        try:
+            db.session.commit()
+            return run.id
+        except IntegrityError:
+            db.session.rollback()
+        running = db.session.scalar(select(SyncRun).where(SyncRun.status == "running"))
+        # Otherwise the other run finished in between, so try again.
+        if running is not None:
+            raise SyncAlreadyRunning(running)
+
+
+def sync_playlists_and_videos(
+    max_workers=None,
+    force=False,
+    credentials=None,
+    on_progress=None,
+    chunk_size=None,
+    youtube_service=None,
+    saved_playlist_ids=None,
+    run_id=None,
+):
     """
     Synchronizes playlists and videos from YouTube.
 
+    Only one sync runs at a time across every process sharing the database:
+    the run is claimed by `claim_sync_run` before anything is fetched.
+
     This function fetches playlists from YouTube and updates the corresponding
-    records in the database. For each playlist, it checks if the playlist
-    already exists in the database. If it does, it compares the playlist
-    details (title, description, published date, thumbnail URL) with the
-    fetched data and updates the database record if there are any changes. If
-    the playlist doesn't exist in the database, a new record is created.
-
-    After updating or creating the playlist record, the function fetches the
-    videos for that playlist and performs a similar check and update process
-    for each video. If a video already exists in the database, it compares the
-    video details (title, description, published date, thumbnail URL, embed
-    URL) with the fetched data and updates the database record if there are any
-    changes. If the video doesn't exist in the database, a new record is
-    created.
-
-    Finally, if any changes were made to the playlist or its videos, the
-    `updated_at` field of the playlist record is updated and the changes are
-    committed to the database.
+    records in the database. The stored values of every playlist are loaded in
+    a single query up front, and new or changed playlists are written before
+    any videos are fetched.
+
+    Each playlist's ETag and ``contentDetails.itemCount`` are stored once all
+    of its videos are committed. When both are unchanged on the next run the
+    playlist's videos are not fetched at all, which saves one API call (and
+    quota unit) per page of videos. Changes that keep the item count and ETag
+    the same, such as swapping one video for another, are only picked up when
+    ``force`` is set.
+
+    The videos of the remaining playlists are streamed page by page from
+    `iter_video_pages_concurrently`, so the fetch stage takes roughly as long
+    as the slowest playlist rather than the sum of all of them. Database work
+    stays on the calling thread. For each page the stored values of its videos
+    are loaded in one query and compared in memory; new and changed rows are
+    buffered and written with a bulk ``INSERT ... ON CONFLICT DO UPDATE`` and
+    committed every ``chunk_size`` rows and at the end of each playlist,
+    leaving columns the sync does not own (``watched``, ``created_at``)
+    untouched. Writes go through Core statements rather than ORM objects, and
+    the session is cleared after every commit, so memory stays flat however
+    many videos there are, and a failure only loses the uncommitted chunk.
+    Written videos are added to the search index in the same transaction.
+
+    Once every page of a playlist is in, stored videos that were not fetched
+    are marked removed by `remove_missing_videos`.
+
+    If a playlist or any of its videos is new, has changed or was removed, the
+    playlist's `updated_at` field is set to the time of the sync.
+
+    Time spent fetching, transforming, diffing and committing is recorded per
+    stage along with row counts, API calls and quota units. The totals are
+    logged as a run summary and saved to the run's `SyncRun` row, whether the
+    run finishes or fails.
+
+    Args:
+        max_workers (int, optional): The maximum number of playlists fetched at
+            once. Defaults to the ``YOUTUBE_SYNC_WORKERS`` config value.
+        force (bool): Fetch the videos of every playlist, even unchanged ones.
+        credentials (optional): The credentials to sync with. Defaults to the
+            ones returned by `get_youtube_credentials`, which must be resolved
+            up front when the sync runs outside the request that started it.
+        on_progress (callable, optional): Called with the run's `SyncStats`
+            after each playlist is processed.
+        chunk_size (int, optional): The number of changed video rows written
+            per commit. Defaults to the ``YOUTUBE_SYNC_CHUNK_SIZE`` config value.
+        youtube_service (optional): A service object to sync from instead of
+            one built from ``credentials``, such as a `FakeYouTubeService`. It
+            is shared by the fetch workers, so it must be thread-safe.
+        saved_playlist_ids (Iterable[str], optional): Passed to
+            `fetch_playlists`.
+        run_id (int, optional): A run already claimed with `claim_sync_run`,
+            such as by a caller that runs the sync on another thread. Defaults
+            to claiming one.
 
     Returns:
-        None
+        SyncStats: The counters and stage timings of the run.
 
     Raises:
-        None
-    """
-    service = get_youtube_service()
-    playlists = fetch_playlists(service)
-
-    for playlist in playlists:
-        print(f"Processing playlist {playlist["id"]}")
-        playlist_id = playlist["id"]
-        title = playlist["snippet"]["title"]
-        description = playlist["snippet"].get("description")
-        published_at = datetime.fromisoformat(
-            playlist["snippet"]["publishedAt"].replace("Z", "+00:00")
-        ).replace(tzinfo=None)
-        thumbnail_url = playlist["snippet"].get("thumbnails", {}).get("default", {}).get("url")
-
-        existing_playlist = Playlist.query.get(playlist_id)
-        playlist_updated = False
-        if existing_playlist:
+        SyncAlreadyRunning: If no run is given and another one is running.
+    """
+    if max_workers is None:
+        max_workers = current_app.config.get(
+            "YOUTUBE_SYNC_WORKERS", DEFAULT_SYNC_WORKERS
+        )
+    if chunk_size is None:
+        chunk_size = current_app.config.get(
+            "YOUTUBE_SYNC_CHUNK_SIZE", DEFAULT_SYNC_CHUNK_SIZE
+        )
+
+    stats = SyncStats()
+    if run_id is None:
+        run_id = claim_sync_run(stats.started_at)
+    try:
+        _sync_playlists_and_videos(
+            stats,
+            max_workers,
+            force,
+            credentials,
+            on_progress,
+            chunk_size,
+            youtube_service,
+            saved_playlist_ids,
+        )
+    except Exception as e:
+        db.session.rollback()
+        record_sync_run(stats, run_id, "failed", error=str(e))
+        raise
+
+    record_sync_run(stats, run_id, "finished")
+    return stats
+
+
+def record_sync_run(stats, run_id, status, error=None):
+    """
+    Logs a run summary and saves it to the run's `SyncRun` row.
+
+    Args:
+        stats (SyncStats): The counters of the run.
+        run_id (int): The run claimed by `claim_sync_run`.
+        status (str): How the run ended, ``"finished"`` or ``"failed"``.
+        error (str, optional): The error that ended a failed run.
+    """
+    summary = stats.as_dict()
+    log = logger.info if status == "finished" else logger.error
+    log(
+        "YouTube sync %s in %.2fs: %d/%d playlists fetched, %d skipped, "
+        "%d videos fetched, %d rows changed, %d API calls (%d quota units, "
+        "%d saved), stages %s",
+        status,
+        summary["elapsed_seconds"],
+        stats.playlists_fetched,
+        stats.playlists_total,
+        stats.playlists_skipped,
+        stats.videos_fetched,
+        stats.rows_changed,
+        stats.api_calls,
+        stats.quota_used,
+        stats.quota_saved,
+        summary["stage_seconds"],
+    )
+
+    try:
+        db.session.execute(
+            update(SyncRun)
+            .where(SyncRun.id == run_id)
+            .values(**stats.run_values(status, error=error))
+        )
+        db.session.commit()
+    except Exception:  # pylint: disable=broad-except
+        db.session.rollback()
+        logger.exception("Could not save the YouTube sync run")
+
+
+def _sync_playlists_and_videos(
+    stats,
+    max_workers,
+    force,
+    credentials,
+    on_progress,
+    chunk_size,
+    service,
+    saved_playlist_ids,
+):
+    with stats.stage("fetch"):
+        if service is None:
+            if credentials is None:
+                credentials = get_youtube_credentials()
+            service = build_youtube_service(credentials)
+        playlists = fetch_playlists(
+            service, stats=stats, saved_playlist_ids=saved_playlist_ids
+        )
+
+    with stats.stage("diff"):
+        existing_playlists = load_existing_rows(Playlist, PLAYLIST_FIELDS)
+        sync_state = load_existing_rows(Playlist, PLAYLIST_SYNC_STATE_FIELDS)
+
+    with stats.stage("transform"):
+        playlist_rows = {}
+        for playlist in playlists:
+            playlist_row = playlist_to_row(playlist)
+            playlist_id = playlist_row["id"]
+            if playlist_id in playlist_rows:
+                continue
+            stats.playlists_total += 1
+            state = tuple(
+                playlist_row[field] for field in PLAYLIST_SYNC_STATE_FIELDS
+            )
             if (
-                existing_playlist.title != title
-                or existing_playlist.description != description
-                or existing_playlist.published_at != published_at
-                or existing_playlist.thumbnail_url != thumbnail_url
+                not force
+                and playlist_row["etag"]
+                and sync_state.get(playlist_id) == state
             ):
-                existing_playlist.title = title
-                existing_playlist.description = description
-                existing_playlist.published_at = published_at
-                existing_playlist.thumbnail_url = thumbnail_url
-                playlist_updated = True
-                print(f"Playlist {playlist["id"]} updated")
-        else:
-            new_playlist = Playlist(
-                id=playlist_id,
-                title=title,
-                description=description,
-                published_at=published_at,
-                updated_at=datetime.now(timezone.utc),
-                thumbnail_url=thumbnail_url,
-            )
-            db.session.add(new_playlist)
-            playlist_updated = True
-            print(f"Playlist {playlist["id"]} created")
+                logger.debug("Playlist %s unchanged, skipping", playlist_id)
+                stats.record_skip(playlist_row["item_count"])
+                continue
+            playlist_rows[playlist_id] = playlist_row
 
-        videos = fetch_videos(playlist_id, service)
-        for video in videos:
-            print(f"Processing video {video["id"]}")
+    with stats.stage("diff"):
+        new_playlists, changed_playlists = diff_rows(
+            playlist_rows.values(), existing_playlists, PLAYLIST_FIELDS
+        )
 
-            if not check_video_availability(video):
-                continue
+    with stats.stage("commit"):
+        now = datetime.now(timezone.utc)
+        stats.rows_changed += bulk_upsert(
+            Playlist,
+            [
+                {
+                    "id": row["id"],
+                    **{field: row[field] for field in PLAYLIST_FIELDS},
+                    "updated_at": now,
+                }
+                for row in new_playlists + changed_playlists
+            ],
+            update_columns=(*PLAYLIST_FIELDS, "updated_at"),
+        )
+        db.session.commit()
+
+    if on_progress:
+        on_progress(stats)
 
-            video_id = video["id"]
-            video_url_id = video["contentDetails"]["videoId"]
-            video_title = video["snippet"]["title"]
-            video_description = video["snippet"].get("description")
-            video_published_at = datetime.fromisoformat(
-                video["snippet"]["publishedAt"].replace("Z", "+00:00")
-            ).replace(tzinfo=None)
-            video_thumbnail_url = (
-                video["snippet"].get("thumbnails", {}).get("default", {}).get("url")
+    pending_videos = []
+    playlists_with_changes = set()
+    fetched_ids = {}
+
+    def flush_videos():
+        with stats.stage("commit"):
+            stats.rows_changed += bulk_upsert(
+                Video, pending_videos, update_columns=(*VIDEO_FIELDS, "updated_at")
             )
-            embed_url = f"https://www.youtube.com/embed/{video_url_id}"
-
-            existing_video = Video.query.get(video_id)
-            if existing_video:
-                if (
-                    existing_video.title != video_title
-                    or existing_video.description != video_description
-                    or existing_video.published_at != video_published_at
-                    or existing_video.thumbnail_url != video_thumbnail_url
-                    or existing_video.video_url_id != video_url_id
-                    or existing_video.embed_url != embed_url
-                ):
-                    existing_video.title = video_title
-                    existing_video.description = video_description
-                    existing_video.published_at = video_published_at
-                    existing_video.thumbnail_url = video_thumbnail_url
-                    existing_video.video_url_id = video_url_id
-                    existing_video.embed_url = embed_url
-                    existing_video.updated_at = datetime.now(timezone.utc)
-                    playlist_updated = True
-                    print(f"Video {video["id"]} updated")
-            else:
-                new_video = Video(
-                    id=video_id,
-                    playlist_id=playlist_id,
-                    video_url_id=video_url_id,
-                    title=video_title,
-                    description=video_description,
-                    published_at=video_published_at,
-                    thumbnail_url=video_thumbnail_url,
-                    embed_url=embed_url,
-                    created_at=datetime.now(timezone.utc),
-                    updated_at=datetime.now(timezone.utc),
-                )
-                db.session.add(new_video)
-                playlist_updated = True
-                print(f"Video {video["id"]} created")
+            index_videos(pending_videos)
+            pending_videos.clear()
+            db.session.commit()
+            db.session.expunge_all()
+
+    with closing(
+        iter_video_pages_concurrently(
+            list(playlist_rows), service, credentials, max_workers
+        )
+    ) as pages:
+        while True:
+            with stats.stage("fetch"):
+                playlist_id, page = next(pages, (None, None))
+            if playlist_id is None:
+                break
+
+            if page is None:
+                # All pages of the playlist are in, so its sync state can be saved.
+                playlist_row = playlist_rows.pop(playlist_id)
+                with stats.stage("commit"):
+                    removed = remove_missing_videos(
+                        playlist_id,
+                        fetched_ids.pop(playlist_id, set()),
+                        datetime.now(timezone.utc),
+                    )
+                if removed:
+                    logger.debug(
+                        "Marked %d videos of playlist %s removed", removed, playlist_id
+                    )
+                    stats.rows_changed += removed
+                    playlists_with_changes.add(playlist_id)
+                values = {
+                    field: playlist_row[field]
+                    for field in PLAYLIST_SYNC_STATE_FIELDS
+                }
+                if playlist_id in playlists_with_changes:
+                    values["updated_at"] = datetime.now(timezone.utc)
+                with stats.stage("commit"):
+                    db.session.execute(
+                        update(Playlist)
+                        .where(Playlist.id == playlist_id)
+                        .values(values)
+                    )
+                flush_videos()
+                stats.playlists_fetched += 1
+                logger.debug("Playlist %s synced", playlist_id)
+                if on_progress:
+                    on_progress(stats)
+                continue
 
-        if playlist_updated and existing_playlist:
-            existing_playlist.updated_at = datetime.now(timezone.utc)
+            stats.record_api_call(PLAYLIST_ITEMS_LIST_COST)
+            stats.videos_fetched += len(page)
+            with stats.stage("transform"):
+                video_rows = [
+                    video_to_row(video, playlist_id)
+                    for video in page
+                    if check_video_availability(video)
+                ]
+            fetched_ids.setdefault(playlist_id, set()).update(
+                row["id"] for row in video_rows
+            )
+            if not video_rows:
+                continue
 
-    db.session.commit()
-    logger.info("YouTube playlists and videos synchronized successfully.")
+            with stats.stage("diff"):
+                existing_videos = load_existing_rows(
+                    Video, VIDEO_FIELDS, Video.id.in_([row["id"] for row in video_rows])
+                )
+                new_videos, changed_videos = diff_rows(
+                    video_rows, existing_videos, VIDEO_FIELDS
+                )
+            if new_videos or changed_videos:
+                playlists_with_changes.add(playlist_id)
+                now = datetime.now(timezone.utc)
+                for row in new_videos + changed_videos:
+                    row["created_at"] = now
+                    row["updated_at"] = now
+                pending_videos.extend(new_videos + changed_videos)
+                if len(pending_videos) >= chunk_size:
+                    flush_videos()
@@ -0,0 +1,118 @@
+"""
+Keyset (cursor) pagination for library listings.
+
+Instead of ``OFFSET``, each page continues after the sort key of the last row
+of the previous page, so with an index on the sort columns every page costs
+one index seek however deep the reader scrolls. The key is handed to clients
+as an opaque, URL-safe cursor.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import tuple_
+
+from project.database import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded for the requested sort columns."""
+
+
+@dataclass
+class KeysetPage:
+    """One page of rows and the cursor of the page after it, if any."""
+
+    items: list
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(values):
+    """
+    Encodes the sort key of a row as an opaque cursor.
+
+    Args:
+        values (Iterable): The row's values for the sort columns.
+
+    Returns:
+        str: The cursor.
+    """
+    key = [
+        value.isoformat() if isinstance(value, datetime) else value for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decodes a cursor made by `encode_cursor` back into a sort key.
+
+    Args:
+        cursor (str): The cursor.
+        columns (Sequence): The sort columns the cursor was made for.
+
+    Returns:
+        list: The sort key, with datetimes restored.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or has the wrong shape.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(key, list) or len(key) != len(columns):
+            raise InvalidCursor(cursor)
+        return [
+            datetime.fromisoformat(value)
+            if column.type.python_type is datetime
+            else value
+            for column, value in zip(columns, key)
+        ]
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def paginate(
+    stmt, columns, cursor=None, per_page=DEFAULT_PAGE_SIZE, descending=False
+):
+    """
+    Returns one page of an ORM select, in order of ``columns``.
+
+    ``columns`` must end with a unique column so that the order is total, and
+    should match an index whose leading columns cover any equality filters on
+    ``stmt``.
+
+    Args:
+        stmt (Select): The select to page through, without an ORDER BY.
+        columns (Sequence): The sort columns.
+        cursor (str, optional): The cursor of the page to return. Defaults to
+            the first page.
+        per_page (int): The maximum number of rows on the page.
+        descending (bool): Sort in descending order of every column instead.
+
+    Returns:
+        KeysetPage: The rows on the page.
+
+    Raises:
+        InvalidCursor: If ``cursor`` cannot be decoded.
+    """
+    if cursor:
+        key, after = tuple_(*columns), tuple_(*decode_cursor(cursor, columns))
+        stmt = stmt.where(key < after if descending else key > after)
+    order_by = [column.desc() for column in columns] if descending else columns
+    rows = db.session.scalars(stmt.order_by(*order_by).limit(per_page + 1)).all()
+
+    page = KeysetPage(items=rows[:per_page])
+    if len(rows) > per_page:
+        last = page.items[-1]
+        page.next_cursor = encode_cursor(
+            getattr(last, column.key) for column in columns
+        )
+    return page
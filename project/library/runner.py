@@ -0,0 +1,143 @@
+"""
+Runs the YouTube sync on a background thread and tracks its progress.
+
+Each job claims its `SyncRun` row before its thread starts, so only one sync
+runs at a time across every process and the ``sync-yt-subs`` command. Jobs are
+kept in memory, so their progress is visible to the process that started them
+until it restarts. When a sync finishes, the process's library catalog is
+rebuilt from the new data.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from project.library.catalog import refresh_catalog
+from project.library.jobs import (
+    SyncAlreadyRunning,
+    claim_sync_run,
+    sync_playlists_and_videos,
+)
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept around so their final progress can still be read.
+MAX_FINISHED_JOBS = 20
+
+
+@dataclass
+class SyncJob:
+    """The state and progress of one background sync."""
+
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    playlists_total: int = 0
+    playlists_processed: int = 0
+    rows_changed: int = 0
+    error: Optional[str] = None
+    # The job's `SyncRun` row.
+    run_id: Optional[int] = None
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def update(self, stats):
+        """Copies progress counters from a `SyncStats`."""
+        self.playlists_total = stats.playlists_total
+        self.playlists_processed = stats.playlists_processed
+        self.rows_changed = stats.rows_changed
+
+    def as_dict(self):
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "status": self.status,
+            "playlists_total": self.playlists_total,
+            "playlists_processed": self.playlists_processed,
+            "rows_changed": self.rows_changed,
+            "elapsed_seconds": round(end - self.started_at, 3)
+            if self.started_at
+            else 0,
+            "error": self.error,
+        }
+
+
+_lock = threading.Lock()
+_jobs = {}
+
+
+def get_job(job_id):
+    """Returns the job with the given ID, or None if it is unknown."""
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def get_latest_job():
+    """Returns the most recently started job, or None if none has run."""
+    with _lock:
+        return next(reversed(_jobs.values()), None)
+
+
+def get_job_for_run(run_id):
+    """Returns the job of a `SyncRun`, or None if this process did not start it."""
+    with _lock:
+        return next((job for job in _jobs.values() if job.run_id == run_id), None)
+
+
+def start_sync(app, **sync_kwargs):
+    """
+    Starts `sync_playlists_and_videos` on a background thread.
+
+    Args:
+        app (Flask): The application whose context the sync runs in.
+        **sync_kwargs: Passed through to `sync_playlists_and_videos`.
+
+    Returns:
+        SyncJob: The queued job.
+
+    Raises:
+        SyncAlreadyRunning: If a sync started by any process has not finished.
+    """
+    with app.app_context():
+        job = SyncJob(run_id=claim_sync_run())
+
+    with _lock:
+        _jobs[job.id] = job
+        finished = [job_id for job_id, j in _jobs.items() if not j.active]
+        for job_id in finished[:-MAX_FINISHED_JOBS]:
+            del _jobs[job_id]
+
+    thread = threading.Thread(
+        target=_run,
+        args=(app, job, sync_kwargs),
+        name=f"youtube-sync-{job.id}",
+        daemon=True,
+    )
+    thread.start()
+    return job
+
+
+def _run(app, job, sync_kwargs):
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        with app.app_context():
+            stats = sync_playlists_and_videos(
+                on_progress=job.update, run_id=job.run_id, **sync_kwargs
+            )
+            refresh_catalog()
+        job.update(stats)
+        job.status = "finished"
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception("Background YouTube sync %s failed", job.id)
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        job.finished_at = time.time()
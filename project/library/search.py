@@ -0,0 +1,216 @@
+"""
+Full-text search over video titles and descriptions.
+
+SQLite keeps the index in a ``video_fts`` FTS5 table, written by
+`index_videos` whenever the sync writes videos. Each FTS row's rowid is a hash
+of the video ID, so a changed video can be replaced with a rowid lookup instead
+of a scan. Postgres keeps a ``search_vector`` column on ``video`` generated from
+the title and description, with a GIN index, so it never needs writing.
+
+Both are created alongside the ``video`` table by ``db.create_all`` and by the
+migration that added them.
+"""
+
+import hashlib
+import re
+
+from sqlalchemy import (
+    DDL,
+    bindparam,
+    column,
+    event,
+    func,
+    literal_column,
+    select,
+    table,
+)
+
+from project.database import db
+from project.models import Video
+
+SEARCH_LANGUAGE = "english"
+# Relative weight of a match in the title over one in the description.
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+video_fts = table(
+    "video_fts",
+    column("rowid"),
+    column("video_id"),
+    column("title"),
+    column("description"),
+    # FTS5's hidden column named after the table, used for MATCH and ranking.
+    column("video_fts"),
+)
+
+SQLITE_CREATE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS video_fts USING fts5("
+    "video_id UNINDEXED, title, description, tokenize='porter unicode61')"
+)
+SQLITE_DROP_FTS = "DROP TABLE IF EXISTS video_fts"
+POSTGRES_ADD_SEARCH_VECTOR = (
+    "ALTER TABLE video ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(description, '')), 'B')"
+    ") STORED"
+)
+POSTGRES_CREATE_SEARCH_INDEX = (
+    "CREATE INDEX IF NOT EXISTS ix_video_search_vector "
+    "ON video USING GIN (search_vector)"
+)
+
+event.listen(
+    Video.__table__, "after_create", DDL(SQLITE_CREATE_FTS).execute_if(dialect="sqlite")
+)
+event.listen(
+    Video.__table__, "after_drop", DDL(SQLITE_DROP_FTS).execute_if(dialect="sqlite")
+)
+for statement in (POSTGRES_ADD_SEARCH_VECTOR, POSTGRES_CREATE_SEARCH_INDEX):
+    event.listen(
+        Video.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql")
+    )
+
+
+def search_rowid(video_id):
+    """Returns the stable FTS rowid of a video, a signed 64-bit hash of its ID."""
+    digest = hashlib.blake2b(video_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def index_videos(rows):
+    """
+    Writes new and changed videos to the search index.
+
+    Only SQLite needs this; on Postgres the search vector is a generated
+    column. Call it in the same transaction as the write to ``video``.
+
+    Args:
+        rows (list[dict]): Video column values, each with ``id``, ``title`` and
+            ``description``.
+    """
+    if not rows or db.session.get_bind().dialect.name != "sqlite":
+        return
+
+    params = [
+        {
+            "rowid": search_rowid(row["id"]),
+            "video_id": row["id"],
+            "title": row["title"],
+            "description": row["description"] or "",
+        }
+        for row in rows
+    ]
+    db.session.execute(
+        video_fts.delete().where(video_fts.c.rowid == bindparam("rowid")),
+        params,
+    )
+    db.session.execute(video_fts.insert(), params)
+
+
+def unindex_videos(video_ids):
+    """
+    Removes videos from the search index.
+
+    Only SQLite needs this. Call it in the same transaction as the change that
+    removes the videos.
+
+    Args:
+        video_ids (Iterable[str]): The IDs of the videos to remove.
+    """
+    if db.session.get_bind().dialect.name != "sqlite":
+        return
+    params = [{"rowid": search_rowid(video_id)} for video_id in video_ids]
+    if params:
+        db.session.execute(
+            video_fts.delete().where(video_fts.c.rowid == bindparam("rowid")),
+            params,
+        )
+
+
+def rebuild_search_index():
+    """Rebuilds the SQLite search index from the ``video`` table."""
+    if db.session.get_bind().dialect.name != "sqlite":
+        return
+    db.session.execute(video_fts.delete())
+    rows = db.session.execute(
+        select(Video.id, Video.title, Video.description).where(
+            Video.removed_at.is_(None)
+        )
+    )
+    index_videos([row._asdict() for row in rows])
+
+
+def fts5_query(text):
+    """
+    Turns free text into an FTS5 query that matches every word.
+
+    Each word is quoted, so punctuation in the input cannot break the query
+    syntax, and the last word matches as a prefix.
+
+    Returns:
+        str | None: The query, or None if the text has no words.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_videos(text, page=1, per_page=20):
+    """
+    Returns videos matching ``text``, best matches first.
+
+    Title matches rank above description matches. Removed videos are not in
+    the SQLite index and are filtered out on Postgres. On SQLite the page is ranked
+    and cut inside the FTS5 table before it is joined to ``video``, so only the
+    videos on the page are read from it.
+
+    Args:
+        text (str): The search terms.
+        page (int): The 1-based page number.
+        per_page (int): The maximum number of videos per page.
+
+    Returns:
+        tuple[list[Video], bool]: The videos on the page, and whether there
+        are more pages.
+    """
+    limit, offset = per_page + 1, (page - 1) * per_page
+
+    if db.session.get_bind().dialect.name == "sqlite":
+        query = fts5_query(text)
+        if query is None:
+            return [], False
+        score = func.bm25(
+            video_fts.c.video_fts, 0.0, TITLE_WEIGHT, DESCRIPTION_WEIGHT
+        ).label("score")
+        ranked = (
+            select(video_fts.c.video_id, score)
+            .where(video_fts.c.video_fts.op("MATCH")(query))
+            .order_by(score, video_fts.c.video_id)
+            .limit(limit)
+            .offset(offset)
+            .subquery()
+        )
+        stmt = (
+            select(Video)
+            .join(ranked, ranked.c.video_id == Video.id)
+            .order_by(ranked.c.score, Video.id)
+        )
+    else:
+        if not text.strip():
+            return [], False
+        search_vector = literal_column("video.search_vector")
+        tsquery = func.websearch_to_tsquery(SEARCH_LANGUAGE, text)
+        stmt = (
+            select(Video)
+            .where(search_vector.op("@@")(tsquery), Video.removed_at.is_(None))
+            .order_by(func.ts_rank_cd(search_vector, tsquery).desc(), Video.id)
+            .limit(limit)
+            .offset(offset)
+        )
+
+    videos = db.session.scalars(stmt).all()
+    return videos[:per_page], len(videos) > per_page
@@ -0,0 +1,106 @@
+"""Per-run statistics and stage timings for the YouTube sync."""
+
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+
+# YouTube Data API quota cost of one playlists.list or playlistItems.list call.
+PLAYLISTS_LIST_COST = 1
+PLAYLIST_ITEMS_LIST_COST = 1
+PLAYLIST_ITEMS_PAGE_SIZE = 50
+
+# Stages timed on the writer thread. "fetch" is time spent waiting on the API.
+SYNC_STAGES = ("fetch", "transform", "diff", "commit")
+
+
+def playlist_items_quota(item_count):
+    """Returns the quota units needed to page through a playlist's items."""
+    pages = -(-(item_count or 0) // PLAYLIST_ITEMS_PAGE_SIZE)
+    return max(pages, 1) * PLAYLIST_ITEMS_LIST_COST
+
+
+@dataclass
+class SyncStats:
+    """Counters and stage timings for one run of `sync_playlists_and_videos`."""
+
+    playlists_total: int = 0
+    playlists_fetched: int = 0
+    playlists_skipped: int = 0
+    videos_fetched: int = 0
+    rows_changed: int = 0
+    api_calls: int = 0
+    quota_used: int = 0
+    quota_saved: int = 0
+    stage_seconds: dict = field(
+        default_factory=lambda: {stage: 0.0 for stage in SYNC_STAGES}
+    )
+    started_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def playlists_processed(self):
+        return self.playlists_fetched + self.playlists_skipped
+
+    @property
+    def elapsed_seconds(self):
+        return time.perf_counter() - self._started
+
+    @contextmanager
+    def stage(self, name):
+        """Adds the time spent inside the block to the named stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] += time.perf_counter() - start
+
+    def record_api_call(self, cost):
+        """Counts one API request and the quota units it used."""
+        self.api_calls += 1
+        self.quota_used += cost
+
+    def record_skip(self, item_count):
+        """Counts a playlist whose videos were not fetched because it was unchanged."""
+        self.playlists_skipped += 1
+        self.quota_saved += playlist_items_quota(item_count)
+
+    def as_dict(self):
+        stats = asdict(self)
+        del stats["_started"]
+        stats["started_at"] = self.started_at.isoformat()
+        stats["elapsed_seconds"] = round(self.elapsed_seconds, 3)
+        stats["stage_seconds"] = {
+            stage: round(seconds, 3) for stage, seconds in self.stage_seconds.items()
+        }
+        return stats
+
+    def run_values(self, status, error=None):
+        """
+        Returns the `SyncRun` columns that record how this run ended.
+
+        Args:
+            status (str): How the run ended, ``"finished"`` or ``"failed"``.
+            error (str, optional): The error that ended a failed run.
+
+        Returns:
+            dict: The values to write to the run's row.
+        """
+        return {
+            "finished_at": datetime.now(timezone.utc),
+            "status": status,
+            "error": error,
+            "playlists_total": self.playlists_total,
+            "playlists_fetched": self.playlists_fetched,
+            "playlists_skipped": self.playlists_skipped,
+            "videos_fetched": self.videos_fetched,
+            "rows_changed": self.rows_changed,
+            "api_calls": self.api_calls,
+            "quota_used": self.quota_used,
+            "quota_saved": self.quota_saved,
+            "total_seconds": self.elapsed_seconds,
+            **{
+                f"{stage}_seconds": seconds
+                for stage, seconds in self.stage_seconds.items()
+            },
+        }
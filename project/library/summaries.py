@@ -0,0 +1,58 @@
+"""
+Sort orders and the version of the library index.
+
+The per-playlist totals the index shows are computed by the catalog (see
+`project.library.catalog`), which is rebuilt whenever the library's version
+changes: the newest ``Playlist.updated_at`` and the number of playlists, which
+the sync bumps whenever it writes a playlist or its videos.
+"""
+
+from sqlalchemy import func, select
+
+from project.database import db
+from project.models import Playlist
+
+# Sort keys accepted by `sort_playlist_summaries`.
+PLAYLIST_SORTS = {
+    "title": lambda summary: summary.title.lower(),
+    "updated": lambda summary: summary.updated_at,
+    "latest": lambda summary: summary.latest_video_at,
+    "videos": lambda summary: summary.video_count,
+    "unwatched": lambda summary: summary.video_count - summary.watched_count,
+}
+DEFAULT_PLAYLIST_SORT = "title"
+
+
+def library_version():
+    """
+    Returns a value that changes whenever the sync changes a playlist.
+
+    Both aggregates are answered from the index on ``playlist.updated_at`` and
+    the primary key, so this is cheap enough to run on every request.
+    """
+    return tuple(
+        db.session.execute(
+            select(func.max(Playlist.updated_at), func.count(Playlist.id))
+        ).one()
+    )
+
+
+def sort_playlist_summaries(rows, sort, descending=False):
+    """
+    Sorts playlist totals by a key of ``PLAYLIST_SORTS``.
+
+    Ties and missing values are ordered by title, with missing values last.
+
+    Args:
+        rows (Iterable): Rows or records with the attributes the sort keys use.
+        sort (str): A key of ``PLAYLIST_SORTS``.
+        descending (bool): Sort in descending order.
+
+    Returns:
+        list: The sorted rows.
+    """
+    key = PLAYLIST_SORTS[sort]
+    by_title = sorted(rows, key=PLAYLIST_SORTS["title"])
+    present = [row for row in by_title if key(row) is not None]
+    missing = [row for row in by_title if key(row) is None]
+    return sorted(present, key=key, reverse=descending) + missing
@@ -0,0 +1,191 @@
+"""
+A local cache of resized YouTube thumbnails.
+
+Thumbnails are fetched from their origin once, downscaled to the size a
+template displays them at, and kept in a size-bounded directory that evicts
+the least recently used files first.
+
+The origin fetcher is the ``THUMBNAIL_FETCHER`` config value, a callable that
+takes a URL and returns the image bytes, so tests can serve images locally.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+
+import requests
+from flask import current_app
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Display sizes used by the library templates, as (width, height).
+THUMBNAIL_SIZES = {
+    "list": (120, 90),
+    "header": (320, 180),
+}
+THUMBNAIL_QUALITY = 85
+DEFAULT_THUMBNAIL_CACHE_MAX_BYTES = 100 * 2**20
+FETCH_TIMEOUT = 5
+# Links carry a hash of the source URL, so responses never go stale.
+THUMBNAIL_MAX_AGE = 365 * 24 * 60 * 60
+# Eviction frees space down to this share of the limit, so it runs rarely.
+EVICTION_TARGET = 0.9
+
+
+class DiskLRUCache:
+    """
+    A directory of files bounded in total size, evicting the least recently
+    used first.
+
+    A hit refreshes the file's modification time, which eviction sorts by. The
+    running total is kept in memory and recounted from disk on every eviction,
+    so processes sharing the directory correct each other's totals.
+
+    Args:
+        directory (str): Where to keep the files. Created if missing.
+        max_bytes (int): The size the directory is kept under.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total = sum(size for _, _, size in self._entries())
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Returns the path of a cached file, or None on a miss."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, data):
+        """
+        Stores ``data`` under ``key`` and evicts old files if over the limit.
+
+        Returns:
+            str: The path of the stored file.
+        """
+        path = self.path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict(keep=key)
+        return path
+
+    def _entries(self):
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_mtime_ns, stat.st_size
+
+    def _evict(self, keep):
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        evicted = 0
+        for path, _, size in entries:
+            if total <= target:
+                break
+            if os.path.basename(path) == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._total = total
+        logger.debug("Evicted %d thumbnails, %d bytes cached", evicted, total)
+
+
+def fetch_thumbnail(url):
+    """Downloads an image from its origin and returns its bytes."""
+    response = requests.get(url, timeout=FETCH_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+def resize_image(data, size):
+    """
+    Downscales an image to fit within ``size`` and encodes it as JPEG.
+
+    Images are never upscaled.
+
+    Args:
+        data (bytes): The encoded source image.
+        size (tuple[int, int]): The maximum width and height.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        image.save(
+            output, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True
+        )
+    return output.getvalue()
+
+
+def thumbnail_version(url):
+    """Returns a short hash of a source URL, for busting cached links."""
+    return hashlib.sha256(url.encode()).hexdigest()[:12]
+
+
+def get_thumbnail_cache():
+    """Returns the current app's thumbnail cache, creating it on first use."""
+    cache = current_app.extensions.get("thumbnail_cache")
+    if cache is None:
+        directory = current_app.config.get("THUMBNAIL_CACHE_DIR") or os.path.join(
+            current_app.instance_path, "thumbnails"
+        )
+        cache = DiskLRUCache(
+            directory,
+            current_app.config.get(
+                "THUMBNAIL_CACHE_MAX_BYTES", DEFAULT_THUMBNAIL_CACHE_MAX_BYTES
+            ),
+        )
+        current_app.extensions["thumbnail_cache"] = cache
+    return cache
+
+
+def get_thumbnail(url, size_name):
+    """
+    Returns the path of a cached, resized copy of a thumbnail.
+
+    Args:
+        url (str): The source image URL.
+        size_name (str): A key of ``THUMBNAIL_SIZES``.
+
+    Returns:
+        str: The path of the cached file.
+
+    Raises:
+        Any exception raised by the fetcher or while decoding the image.
+    """
+    cache = get_thumbnail_cache()
+    key = f"{hashlib.sha256(url.encode()).hexdigest()}-{size_name}.jpg"
+    path = cache.get(key)
+    if path is not None:
+        return path
+
+    fetch = current_app.config.get("THUMBNAIL_FETCHER") or fetch_thumbnail
+    data = resize_image(fetch(url), THUMBNAIL_SIZES[size_name])
+    return cache.put(key, data)
@@ -1,52 +1,522 @@
 # Python
 
-from flask import Blueprint, flash, redirect, render_template, url_for
+import logging
+
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    url_for,
+)
 from flask_login import login_required
+from sqlalchemy import func, select
+
+from project.database import db
+from project.library.catalog import get_catalog
+from project.library.conditional import conditional
+from project.library.jobs import (
+    SyncAlreadyRunning,
+    export_subscriptions_to_json,
+    get_youtube_credentials,
+    sync_subscriptions,
+)
+from project.library.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    InvalidCursor,
+    paginate,
+)
+from project.library.runner import (
+    get_job,
+    get_job_for_run,
+    get_latest_job,
+    start_sync,
+)
+from project.library.search import search_videos
+from project.library.summaries import DEFAULT_PLAYLIST_SORT, PLAYLIST_SORTS
+from project.library.thumbnails import (
+    THUMBNAIL_MAX_AGE,
+    THUMBNAIL_SIZES,
+    get_thumbnail,
+    thumbnail_version,
+)
+from project.library.watched import MAX_WATCHED_IDS, set_watched
+from project.models import Playlist, Subscription, Video
 
-from project.library.jobs import export_subscriptions_to_json, sync_playlists_and_videos
-from project.models import Playlist, Video
+logger = logging.getLogger(__name__)
 
 library_blueprint = Blueprint(
     "library", __name__, template_folder="templates", url_prefix="/lib"
 )
 
+THUMBNAIL_MODELS = {"video": Video, "playlist": Playlist}
+# Keyset sort columns of the subscriptions listing, each matching an index.
+SUBSCRIPTION_SORTS = {
+    "title": (Subscription.title, Subscription.channel_id),
+    "subscribed": (Subscription.subscribed_at, Subscription.channel_id),
+}
+
+
+def catalog_validators():
+    """Returns the validators of the library index."""
+    return get_catalog().version
+
 
 @library_blueprint.route("/", methods=["GET"])
 @login_required
+@conditional(catalog_validators)
 def library_home():
-    """Renders the library.html template."""
-    playlists = Playlist.query.all()
+    """
+    Renders the playlists with their video, watched and latest-video totals.
 
-    return render_template("playlists.html", playlists=playlists)
+    The ``sort`` argument picks a key of ``PLAYLIST_SORTS`` and ``order`` is
+    ``asc`` or ``desc``. Pages are selected with ``page`` and ``per_page``.
+    Responds with JSON when the client asks for it. Reads from the catalog.
+    """
+    sort = request.args.get("sort", DEFAULT_PLAYLIST_SORT)
+    if sort not in PLAYLIST_SORTS:
+        abort(400)
+    descending = request.args.get("order") == "desc"
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = page_size()
+
+    summaries = get_catalog().playlist_summaries(sort, descending)
+    start = (page - 1) * per_page
+    playlists = summaries[start : start + per_page]
+
+    def page_url(number):
+        return url_for(
+            "library.library_home",
+            sort=sort,
+            order="desc" if descending else "asc",
+            page=number,
+            per_page=request.args.get("per_page"),
+        )
+
+    next_url = page_url(page + 1) if start + per_page < len(summaries) else None
+    prev_url = page_url(page - 1) if page > 1 else None
+
+    if wants_json():
+        return jsonify(
+            {
+                "playlists": [
+                    {
+                        "id": playlist.id,
+                        "title": playlist.title,
+                        "thumbnail_url": playlist.thumbnail_url,
+                        "video_count": playlist.video_count,
+                        "watched_count": playlist.watched_count,
+                        "latest_video_at": playlist.latest_video_at.isoformat()
+                        if playlist.latest_video_at
+                        else None,
+                    }
+                    for playlist in playlists
+                ],
+                "total": len(summaries),
+                "next_url": next_url,
+                "prev_url": prev_url,
+            }
+        )
+
+    return render_template(
+        "playlists.html",
+        playlists=playlists,
+        sort=sort,
+        descending=descending,
+        sorts=PLAYLIST_SORTS,
+        next_url=next_url,
+        prev_url=prev_url,
+    )
+
+
+def page_size():
+    """Returns the ``per_page`` query argument, clamped to ``MAX_PAGE_SIZE``."""
+    per_page = request.args.get("per_page", DEFAULT_PAGE_SIZE, type=int)
+    return min(max(per_page, 1), MAX_PAGE_SIZE)
+
+
+def video_to_dict(video):
+    """Returns the JSON representation of a video."""
+    return {
+        "id": video.id,
+        "playlist_id": video.playlist_id,
+        "video_url_id": video.video_url_id,
+        "title": video.title,
+        "description": video.description,
+        "published_at": video.published_at.isoformat(),
+        "thumbnail_url": video.thumbnail_url,
+        "embed_url": video.embed_url,
+        "watched": video.watched,
+    }
+
+
+def playlist_validators(playlist_id):
+    """Returns the validators of a playlist page, or None if it does not exist."""
+    playlist = get_catalog().playlists.get(playlist_id)
+    return None if playlist is None else (playlist.updated_at,)
+
+
+def video_validators(video_id):
+    """Returns the validators of a video page, or None if it does not exist."""
+    video = get_catalog().videos.get(video_id)
+    return None if video is None else (video.updated_at,)
 
 
 @library_blueprint.route("/playlist/<playlist_id>", methods=["GET"])
 @login_required
+@conditional(playlist_validators)
 def view_playlist(playlist_id):
-    """Renders the library.html template."""
-    playlist = Playlist.query.get(playlist_id)
-    videos = Video.query.filter_by(playlist_id=playlist_id).all()
+    """
+    Renders one page of a playlist's videos, oldest first.
 
-    return render_template("playlist.html", playlist=playlist, videos=videos)
+    Pages are keyset-paginated on ``(published_at, id)``: the ``after`` query
+    argument is the cursor returned with the previous page, and ``per_page``
+    sets the page size. Responds with JSON when the client asks for it. Reads
+    from the catalog.
+    """
+    catalog = get_catalog()
+    playlist = catalog.playlists.get(playlist_id)
+    if playlist is None:
+        abort(404)
+    cursor = request.args.get("after")
+    try:
+        page = catalog.playlist_page(playlist_id, cursor=cursor, per_page=page_size())
+    except InvalidCursor:
+        abort(400)
+
+    next_url = None
+    if page.next_cursor:
+        next_url = url_for(
+            "library.view_playlist",
+            playlist_id=playlist_id,
+            after=page.next_cursor,
+            per_page=request.args.get("per_page"),
+        )
+
+    if wants_json():
+        return jsonify(
+            {
+                "playlist": {
+                    "id": playlist.id,
+                    "title": playlist.title,
+                    "description": playlist.description,
+                    "thumbnail_url": playlist.thumbnail_url,
+                    "item_count": playlist.item_count,
+                },
+                "videos": [video_to_dict(video) for video in page.items],
+                "next_cursor": page.next_cursor,
+                "next_url": next_url,
+            }
+        )
+
+    return render_template(
+        "playlist.html",
+        playlist=playlist,
+        videos=page.items,
+        next_url=next_url,
+        is_first_page=not cursor,
+    )
 
 
 @library_blueprint.route("/videos/<video_id>")
 @login_required
+@conditional(video_validators)
 def view_video(video_id):
-    video = Video.query.get(video_id)
+    video = get_catalog().videos.get(video_id)
+    if video is None:
+        abort(404)
 
     return render_template("video.html", video=video)
 
 
+def subscriptions_validators():
+    """Returns the validators of the subscriptions listing."""
+    return tuple(
+        db.session.execute(
+            select(
+                func.max(Subscription.updated_at),
+                func.count(Subscription.channel_id),
+            )
+        ).one()
+    )
+
+
+@library_blueprint.route("/subscriptions", methods=["GET"])
+@login_required
+@conditional(subscriptions_validators)
+def view_subscriptions():
+    """
+    Renders one page of the channels the user is subscribed to.
+
+    The ``sort`` argument picks a key of ``SUBSCRIPTION_SORTS`` and ``order``
+    is ``asc`` or ``desc``. Pages are keyset-paginated: the ``after`` argument
+    is the cursor returned with the previous page, and ``per_page`` sets the
+    page size. Responds with JSON when the client asks for it.
+    """
+    sort = request.args.get("sort", "title")
+    if sort not in SUBSCRIPTION_SORTS:
+        abort(400)
+    descending = request.args.get("order") == "desc"
+    cursor = request.args.get("after")
+    try:
+        page = paginate(
+            select(Subscription),
+            SUBSCRIPTION_SORTS[sort],
+            cursor=cursor,
+            per_page=page_size(),
+            descending=descending,
+        )
+    except InvalidCursor:
+        abort(400)
+
+    next_url = None
+    if page.next_cursor:
+        next_url = url_for(
+            "library.view_subscriptions",
+            sort=sort,
+            order="desc" if descending else "asc",
+            after=page.next_cursor,
+            per_page=request.args.get("per_page"),
+        )
+
+    if wants_json():
+        return jsonify(
+            {
+                "subscriptions": [
+                    {
+                        "channel_id": subscription.channel_id,
+                        "title": subscription.title,
+                        "description": subscription.description,
+                        "thumbnail_url": subscription.thumbnail_url,
+                        "subscribed_at": subscription.subscribed_at.isoformat(),
+                        "total_item_count": subscription.total_item_count,
+                    }
+                    for subscription in page.items
+                ],
+                "next_cursor": page.next_cursor,
+                "next_url": next_url,
+            }
+        )
+
+    return render_template(
+        "subscriptions.html",
+        subscriptions=page.items,
+        sort=sort,
+        descending=descending,
+        sorts=SUBSCRIPTION_SORTS,
+        next_url=next_url,
+        is_first_page=not cursor,
+    )
+
+
+@library_blueprint.route("/search", methods=["GET"])
+@login_required
+def search():
+    """
+    Renders videos whose title or description matches the ``q`` argument.
+
+    Results are ranked by relevance and paginated with the ``page`` and
+    ``per_page`` arguments. Responds with JSON when the client asks for it.
+    """
+    query = request.args.get("q", "").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = page_size()
+    videos, has_more = search_videos(query, page=page, per_page=per_page)
+
+    def page_url(number):
+        return url_for(
+            "library.search",
+            q=query,
+            page=number,
+            per_page=request.args.get("per_page"),
+        )
+
+    next_url = page_url(page + 1) if has_more else None
+    prev_url = page_url(page - 1) if page > 1 else None
+
+    if wants_json():
+        return jsonify(
+            {
+                "query": query,
+                "page": page,
+                "videos": [video_to_dict(video) for video in videos],
+                "next_url": next_url,
+                "prev_url": prev_url,
+            }
+        )
+
+    return render_template(
+        "search.html",
+        query=query,
+        videos=videos,
+        next_url=next_url,
+        prev_url=prev_url,
+    )
+
+
+@library_blueprint.app_template_global()
+def thumbnail_src(kind, item, size="list"):
+    """
+    Returns the proxied URL of a video or playlist thumbnail.
+
+    Args:
+        kind (str): ``"video"`` or ``"playlist"``.
+        item: The video or playlist, or any row with ``id`` and
+            ``thumbnail_url``.
+        size (str): A key of ``THUMBNAIL_SIZES``.
+
+    Returns:
+        str | None: The URL, or None if the item has no thumbnail.
+    """
+    if not item.thumbnail_url:
+        return None
+    return url_for(
+        "library.thumbnail",
+        kind=kind,
+        item_id=item.id,
+        size=size,
+        v=thumbnail_version(item.thumbnail_url),
+    )
+
+
+@library_blueprint.route("/thumbnails/<kind>/<item_id>/<size>", methods=["GET"])
+@login_required
+def thumbnail(kind, item_id, size):
+    """
+    Serves a video or playlist thumbnail resized to a template display size.
+
+    Images come from the local thumbnail cache and are cached by browsers for a
+    year. They sit behind a login, so shared caches may not store them. If the
+    origin cannot be reached, redirects to it instead.
+    """
+    model = THUMBNAIL_MODELS.get(kind)
+    if model is None or size not in THUMBNAIL_SIZES:
+        abort(404)
+    source_url = db.session.scalar(
+        select(model.thumbnail_url).where(model.id == item_id)
+    )
+    if not source_url:
+        abort(404)
+
+    try:
+        path = get_thumbnail(source_url, size)
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("Could not cache thumbnail %s", source_url, exc_info=True)
+        return redirect(source_url)
+
+    response = send_file(path, mimetype="image/jpeg", max_age=THUMBNAIL_MAX_AGE)
+    # send_file marks a response with a max age public.
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
+
+def watched_state():
+    """Returns the ``watched`` flag of a JSON request body, or aborts with 400."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("watched"), bool):
+        abort(400)
+    return data
+
+
+@library_blueprint.route("/videos/watched", methods=["POST"])
+@login_required
+def mark_videos_watched():
+    """
+    Sets the watched state of many videos at once.
+
+    Expects a JSON body ``{"video_ids": [...], "watched": true}`` with at most
+    ``MAX_WATCHED_IDS`` IDs, and returns how many videos changed.
+    """
+    data = watched_state()
+    video_ids = data.get("video_ids")
+    if (
+        not isinstance(video_ids, list)
+        or not all(isinstance(video_id, str) for video_id in video_ids)
+        or len(video_ids) > MAX_WATCHED_IDS
+    ):
+        error = f"video_ids must be a list of at most {MAX_WATCHED_IDS} IDs"
+        return jsonify({"error": error}), 400
+
+    updated = set_watched(data["watched"], video_ids=video_ids)
+    return jsonify(
+        {"watched": data["watched"], "requested": len(video_ids), "updated": updated}
+    )
+
+
+@library_blueprint.route("/playlist/<playlist_id>/watched", methods=["POST"])
+@login_required
+def mark_playlist_watched(playlist_id):
+    """
+    Sets the watched state of every video in a playlist.
+
+    Expects a JSON body ``{"watched": true}`` and returns how many videos
+    changed.
+    """
+    data = watched_state()
+    db.get_or_404(Playlist, playlist_id)
+
+    updated = set_watched(data["watched"], playlist_id=playlist_id)
+    return jsonify(
+        {"watched": data["watched"], "playlist_id": playlist_id, "updated": updated}
+    )
+
+
+def wants_json():
+    """Returns True if the client prefers a JSON response over a redirect."""
+    return request.accept_mimetypes.best == "application/json"
+
+
 @library_blueprint.route("/sync_playlists", methods=["POST"])
 @login_required
 def sync_playlists():
-    """Synchronizes playlists and videos."""
-    sync_playlists_and_videos()
+    """Starts synchronizing playlists and videos in the background."""
+    try:
+        credentials = get_youtube_credentials()
+    except ValueError:
+        if wants_json():
+            return jsonify({"error": "YouTube authorization required"}), 401
+        return redirect(url_for("oauth.authorize"))
+
+    try:
+        job = start_sync(current_app._get_current_object(), credentials=credentials)
+    except SyncAlreadyRunning as e:
+        # The running sync may belong to another process, or the command line.
+        job = get_job_for_run(e.run.id)
+        if wants_json():
+            if job is None:
+                return jsonify({"status": "running", "error": str(e)}), 409
+            return jsonify(job.as_dict()), 409
+        flash(f"{e}.", "info")
+        return redirect(url_for("foyer.utilities"))
 
+    progress_url = url_for("library.sync_progress", job_id=job.id)
+    if wants_json():
+        return jsonify({**job.as_dict(), "progress_url": progress_url}), 202, {
+            "Location": progress_url
+        }
+    flash(f"Sync {job.id} started.", "success")
     return redirect(url_for("foyer.utilities"))
 
 
+@library_blueprint.route("/sync_playlists/<job_id>", methods=["GET"])
+@login_required
+def sync_progress(job_id):
+    """Returns the progress of a background sync as JSON."""
+    job = get_latest_job() if job_id == "latest" else get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown sync job"}), 404
+
+    return jsonify(job.as_dict())
+
+
 @library_blueprint.route("/export_subscriptions", methods=["POST"])
 @login_required
 def export_subscriptions():
@@ -70,3 +540,28 @@ def export_subscriptions():
         flash(f"Error exporting subscriptions: {str(e)}", "error")
 
     return redirect(url_for("foyer.utilities"))
+
+
+@library_blueprint.route("/subscriptions/sync", methods=["POST"])
+@login_required
+def sync_subscriptions_view():
+    """Stores the YouTube channel subscriptions in the database."""
+    try:
+        result = sync_subscriptions()
+        flash(
+            f"Synced {result['fetched']} subscriptions: {result['written']} "
+            f"updated, {result['removed']} removed",
+            "success",
+        )
+    except ValueError as e:
+        if "credentials not found" in str(e).lower():
+            flash(
+                "YouTube authorization required. Please authorize the app first.",
+                "error",
+            )
+            return redirect(url_for("oauth.authorize"))
+        flash(f"Error: {str(e)}", "error")
+    except Exception as e:
+        flash(f"Error syncing subscriptions: {str(e)}", "error")
+
+    return redirect(url_for("foyer.utilities"))
@@ -0,0 +1,78 @@
+"""Set-based updates of the watched state of videos."""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+
+from project.database import db
+from project.library.catalog import apply_watched
+from project.library.summaries import library_version
+from project.models import Playlist, Video
+
+# The most video IDs accepted in one request; whole playlists have their own
+# endpoint.
+MAX_WATCHED_IDS = 5000
+
+
+def set_watched(watched, video_ids=None, playlist_id=None):
+    """
+    Marks videos as watched or unwatched with one UPDATE.
+
+    Only rows whose state actually changes are written. The UPDATE returns the
+    playlists of those rows, and only they get a new ``updated_at``, so the
+    library index and page validators of untouched playlists stay valid. This
+    process's catalog is patched to match.
+
+    Args:
+        watched (bool): The new state.
+        video_ids (Iterable[str], optional): The videos to update.
+        playlist_id (str, optional): Update every video of this playlist.
+            Exactly one of ``video_ids`` and ``playlist_id`` must be given.
+
+    Returns:
+        int: The number of videos whose state changed.
+
+    Raises:
+        ValueError: If neither or both of ``video_ids`` and ``playlist_id``
+            are given.
+    """
+    if (video_ids is None) == (playlist_id is None):
+        raise ValueError("Pass either video_ids or playlist_id")
+
+    if playlist_id is not None:
+        criteria = Video.playlist_id == playlist_id
+    else:
+        video_ids = list(dict.fromkeys(video_ids))
+        if not video_ids:
+            return 0
+        criteria = Video.id.in_(video_ids)
+
+    previous_version = library_version()
+    now = datetime.now(timezone.utc)
+    changed_playlist_ids = db.session.scalars(
+        update(Video)
+        .where(criteria, Video.watched.is_not(watched))
+        .values(watched=watched, updated_at=now)
+        .returning(Video.playlist_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    changed = len(changed_playlist_ids)
+
+    if changed:
+        db.session.execute(
+            update(Playlist)
+            .where(Playlist.id.in_(set(changed_playlist_ids)))
+            .values(updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+
+    if changed:
+        apply_watched(
+            previous_version,
+            watched,
+            now,
+            video_ids=video_ids,
+            playlist_id=playlist_id,
+        )
+    return changed
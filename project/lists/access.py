@@ -0,0 +1,55 @@
+"""
+Access checks for custom lists.
+
+A user can access a list they own or one shared with them through
+``list_shares``. Each check is one query answered from the primary keys of
+``custom_list`` and ``list_shares``, and its result is remembered on
+``flask.g`` for the rest of the request.
+"""
+
+from flask import g
+from flask_login import current_user
+from sqlalchemy import exists, or_, select
+
+from project.models import CustomList, list_shares, db
+
+
+def is_shared_with(list_id, user_id):
+    """Returns an EXISTS clause that is true if the list is shared with the user."""
+    return exists().where(
+        list_shares.c.list_id == list_id, list_shares.c.user_id == user_id
+    )
+
+
+def can_access_list(list_id, user=None):
+    """
+    Returns whether a user owns a list or has it shared with them.
+
+    Args:
+        list_id (int): The list.
+        user (User, optional): The user. Defaults to the current user.
+
+    Returns:
+        bool: True if the user can access the list. False if they cannot, or
+        if the list does not exist.
+    """
+    if user is None:
+        user = current_user
+    if not user.is_authenticated:
+        return False
+
+    cache = g.setdefault("list_access", {})
+    key = (list_id, user.id)
+    if key not in cache:
+        cache[key] = bool(
+            db.session.scalar(
+                select(
+                    or_(
+                        CustomList.owner_id == user.id,
+                        is_shared_with(CustomList.id, user.id),
+                    )
+                ).where(CustomList.id == list_id)
+            )
+        )
+    return cache[key]
+
@@ -0,0 +1,275 @@
+"""
+Benchmarks for custom list writes.
+
+Benchmarks run against a throwaway in-memory SQLite database, see
+`project.library.benchmarks.create_benchmark_app`.
+"""
+
+import time
+
+from sqlalchemy import select, update
+
+from project.library.benchmarks import count_queries, create_benchmark_app
+from project.lists import ordering
+from project.models import CustomList, ListCategory, ListItem, User, db
+
+
+def reorder_items_per_row(list_id, entries):
+    """Reorders items the way the endpoint used to: several queries per item."""
+    for item_data in entries:
+        item = db.session.get(ListItem, item_data["id"])
+        if item and item.category.custom_list_id == list_id:
+            item.ordering = item_data.get("ordering", item.ordering)
+            new_category_id = item_data.get("category_id")
+            if new_category_id:
+                if ListCategory.query.filter_by(
+                    id=new_category_id, custom_list_id=list_id
+                ).first():
+                    item.category_id = new_category_id
+    db.session.commit()
+
+
+def reorder_categories_per_row(list_id, entries):
+    """Reorders categories the way the endpoint used to: one query per category."""
+    for cat_data in entries:
+        category = db.session.get(ListCategory, cat_data["id"])
+        if category and category.custom_list_id == list_id:
+            category.ordering = cat_data.get("ordering", category.ordering)
+    db.session.commit()
+
+
+def add_item_after_max(category_id, name):
+    """Appends an item the way the endpoint used to: a MAX query, then the INSERT."""
+    max_order = (
+        db.session.query(db.func.max(ListItem.ordering))
+        .filter_by(category_id=category_id)
+        .scalar()
+        or 0
+    )
+    db.session.add(ListItem(name=name, category_id=category_id, ordering=max_order + 1))
+    db.session.commit()
+    return 1
+
+
+def add_item_with_gap(category_id, name):
+    """Appends an item one gap past the last, computed inside the INSERT."""
+    db.session.add(
+        ListItem(
+            name=name,
+            category_id=category_id,
+            ordering=ordering.next_ordering(ListItem, category_id),
+        )
+    )
+    db.session.commit()
+    return 1
+
+
+def move_item_renumbering(list_id, category_id, item_id, previous_id, next_id):
+    """
+    Moves an item the way the list page used to: by renumbering its category.
+
+    Returns:
+        int: The number of items written.
+    """
+    item_ids = db.session.scalars(
+        select(ListItem.id)
+        .where(ListItem.category_id == category_id)
+        .order_by(ListItem.ordering, ListItem.id)
+    ).all()
+    item_ids.remove(item_id)
+    item_ids.insert(item_ids.index(next_id) if next_id else len(item_ids), item_id)
+    updates = [
+        {"id": i, "ordering": position + 1} for position, i in enumerate(item_ids)
+    ]
+    db.session.execute(update(ListItem), updates)
+    db.session.commit()
+    return len(updates)
+
+
+def move_item_with_gap(list_id, category_id, item_id, previous_id, next_id):
+    """Moves an item to the midpoint of its neighbours, see `ordering.move_item`."""
+    return len(
+        ordering.move_item(list_id, item_id, category_id, previous_id, next_id)
+    )
+
+
+def create_benchmark_list(items=200, categories=10):
+    """
+    Creates a user and a list with ``items`` spread over ``categories``.
+
+    Returns:
+        tuple[int, list[int], list[int]]: The list ID, its category IDs and
+        its item IDs.
+    """
+    user = User(username="benchmark", email="benchmark@example.com")
+    custom_list = CustomList(title="Benchmark", owner=user)
+    db.session.add(custom_list)
+    category_objects = [
+        ListCategory(name=f"Category {i}", ordering=i, custom_list=custom_list)
+        for i in range(categories)
+    ]
+    item_objects = [
+        ListItem(
+            name=f"Item {i}",
+            ordering=i // categories,
+            category=category_objects[i % categories],
+        )
+        for i in range(items)
+    ]
+    db.session.add_all(category_objects + item_objects)
+    db.session.commit()
+    return (
+        custom_list.id,
+        [category.id for category in category_objects],
+        [item.id for item in item_objects],
+    )
+
+
+def benchmark_reorder(items=200, categories=10):
+    """
+    Compares per-row and set-based reordering of a list.
+
+    Each strategy reverses the order of every item while moving it to the next
+    category, then reverses the order of every category, as one drag-and-drop
+    request each.
+
+    Args:
+        items (int): The number of items in the list.
+        categories (int): The number of categories in the list.
+
+    Returns:
+        dict: For each strategy (``"per_row"`` and ``"set_based"``), a mapping
+        of ``"items"`` and ``"categories"`` to ``{"seconds", "queries"}``.
+    """
+    strategies = {
+        "per_row": (reorder_items_per_row, reorder_categories_per_row),
+        "set_based": (ordering.reorder_items, ordering.reorder_categories),
+    }
+    results = {}
+    app = create_benchmark_app()
+    with app.app_context():
+        for name, (items_writer, categories_writer) in strategies.items():
+            db.drop_all()
+            db.create_all()
+            list_id, category_ids, item_ids = create_benchmark_list(items, categories)
+            item_entries = [
+                {
+                    "id": item_id,
+                    "ordering": items - position,
+                    "category_id": category_ids[(position + 1) % categories],
+                }
+                for position, item_id in enumerate(item_ids)
+            ]
+            category_entries = [
+                {"id": category_id, "ordering": categories - position}
+                for position, category_id in enumerate(category_ids)
+            ]
+            db.session.remove()
+
+            results[name] = {}
+            for pass_name, writer, entries in (
+                ("items", items_writer, item_entries),
+                ("categories", categories_writer, category_entries),
+            ):
+                with count_queries(db.engine) as queries:
+                    start = time.perf_counter()
+                    writer(list_id, entries)
+                    seconds = time.perf_counter() - start
+                db.session.remove()
+                results[name][pass_name] = {"seconds": seconds, "queries": queries[0]}
+        db.drop_all()
+
+    return results
+
+
+def benchmark_ordering(items=10000, operations=100):
+    """
+    Compares dense and gap-based ordering on one large category.
+
+    Each strategy appends ``operations`` items, then drags the last item to the
+    top ``operations`` times. The gap-based strategy then drops the last item
+    into the same slot near the top ``operations`` times, which uses up the
+    room there every ten moves or so and forces a rebalance of the category.
+    Rebalancing runs inline here rather than on a background thread.
+
+    Args:
+        items (int): The number of items in the category.
+        operations (int): The appends and moves measured per pass.
+
+    Returns:
+        dict: For each strategy (``"dense"`` and ``"gap"``), a mapping of the
+        pass (``"insert"``, ``"move"``, and ``"crowded_move"`` for ``"gap"``) to
+        ``{"seconds", "queries", "rows"}`` per operation, and for
+        ``"crowded_move"`` the number of ``"rebalances"``.
+    """
+    strategies = {
+        "dense": (add_item_after_max, move_item_renumbering),
+        "gap": (add_item_with_gap, move_item_with_gap),
+    }
+    results = {}
+    app = create_benchmark_app()
+    app.config["LIST_REBALANCE_IN_BACKGROUND"] = False
+    with app.app_context():
+        for name, (add_item, move_item) in strategies.items():
+            db.drop_all()
+            db.create_all()
+            list_id, (category_id,), _ = create_benchmark_list(items, 1)
+            if name == "gap":
+                ordering.rebalance(ListItem, category_id)
+                db.session.commit()
+            item_ids = db.session.scalars(
+                select(ListItem.id)
+                .where(ListItem.category_id == category_id)
+                .order_by(ListItem.ordering, ListItem.id)
+            ).all()
+            db.session.remove()
+
+            def append(index):
+                return add_item(category_id, f"New item {index}")
+
+            def move_to_top(_):
+                item_id = item_ids.pop()
+                rows = move_item(list_id, category_id, item_id, None, item_ids[0])
+                item_ids.insert(0, item_id)
+                return rows
+
+            def move_to_second(_):
+                item_id = item_ids.pop()
+                rows = move_item(
+                    list_id, category_id, item_id, item_ids[0], item_ids[1]
+                )
+                item_ids.insert(1, item_id)
+                return rows
+
+            passes = [("insert", append), ("move", move_to_top)]
+            if name == "gap":
+                passes.append(("crowded_move", move_to_second))
+
+            results[name] = {}
+            for pass_name, operation in passes:
+                rows = []
+                with count_queries(db.engine) as queries:
+                    start = time.perf_counter()
+                    for index in range(operations):
+                        rows.append(operation(index))
+                        db.session.remove()
+                    seconds = time.perf_counter() - start
+                if pass_name == "insert":
+                    item_ids = db.session.scalars(
+                        select(ListItem.id)
+                        .where(ListItem.category_id == category_id)
+                        .order_by(ListItem.ordering, ListItem.id)
+                    ).all()
+                    db.session.remove()
+                results[name][pass_name] = {
+                    "seconds": seconds / operations,
+                    "queries": queries[0] / operations,
+                    "rows": sum(rows) / operations,
+                }
+                if pass_name == "crowded_move":
+                    results[name][pass_name]["rebalances"] = sum(
+                        1 for count in rows if count > 1
+                    )
+        db.drop_all()
+
+    return results
@@ -0,0 +1,260 @@
+"""
+A per-list feed of changes, streamed to open list pages over Server-Sent Events.
+
+The list endpoints publish a small event after each committed change, and every
+page viewing that list applies it in place instead of reloading. Events fan out
+through a broker kept in ``app.extensions``. The default `InProcessBroker` only
+reaches clients connected to the same process. The ``LIST_EVENT_BROKER`` config
+value, a callable returning an object with the same ``publish``, ``subscribe``
+and ``latest_event_id`` methods, can replace it with one backed by a shared
+message bus.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIST_EVENT_HISTORY = 100
+DEFAULT_LIST_EVENT_QUEUE_SIZE = 100
+DEFAULT_LIST_EVENT_KEEPALIVE_SECONDS = 15
+DEFAULT_LIST_EVENT_STREAM_SECONDS = 300
+# How long a browser waits before reconnecting a closed stream.
+RECONNECT_MILLISECONDS = 3000
+
+
+class Subscription:
+    """
+    A client's queue of events for one list.
+
+    Args:
+        broker (InProcessBroker): The broker delivering to this subscription.
+        channel (int): The list ID.
+        queue_size (int): The most events held for a slow client.
+    """
+
+    def __init__(self, broker, channel, queue_size):
+        self.broker = broker
+        self.channel = channel
+        self.events = queue.Queue(maxsize=queue_size)
+        # Set when events were missed and the client must reload the list.
+        self.lagged = False
+
+    def deliver(self, event):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.lagged = True
+
+    def get(self, timeout):
+        """Returns the next event, or None if none arrives within ``timeout``."""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InProcessBroker:
+    """
+    Fans events out to the subscriptions of the current process.
+
+    Each list numbers its events from 1 and keeps the most recent ones, so a
+    client reconnecting with the ID of the last event it saw is sent what it
+    missed. A client that fell further behind than the history, or whose queue
+    filled up, is told to reload instead.
+
+    Args:
+        history (int): The events kept per list for reconnecting clients.
+        queue_size (int): The events held per client before it is dropped.
+    """
+
+    def __init__(
+        self,
+        history=DEFAULT_LIST_EVENT_HISTORY,
+        queue_size=DEFAULT_LIST_EVENT_QUEUE_SIZE,
+    ):
+        self.history = history
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._sequences = {}
+        self._histories = {}
+
+    def publish(self, channel, event_type, data):
+        """
+        Sends an event to every subscription of a list.
+
+        Args:
+            channel (int): The list ID.
+            event_type (str): The event name, such as ``"item_added"``.
+            data (dict): The JSON-serializable event payload.
+
+        Returns:
+            dict: The event, with its ``id``, ``type`` and ``data``.
+        """
+        with self._lock:
+            sequence = self._sequences.get(channel, 0) + 1
+            self._sequences[channel] = sequence
+            event = {"id": sequence, "type": event_type, "data": data}
+            self._histories.setdefault(channel, deque(maxlen=self.history)).append(
+                event
+            )
+            for subscription in self._subscriptions.get(channel, ()):
+                subscription.deliver(event)
+        return event
+
+    def subscribe(self, channel, last_event_id=None):
+        """
+        Starts receiving a list's events.
+
+        Args:
+            channel (int): The list ID.
+            last_event_id (int, optional): The last event the client saw. The
+                events after it are queued straight away.
+
+        Returns:
+            Subscription: The client's queue. Close it when done.
+        """
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+            if last_event_id is not None:
+                history = self._histories.get(channel, ())
+                latest = self._sequences.get(channel, 0)
+                oldest = history[0]["id"] if history else latest + 1
+                # Events were evicted, or the numbering restarted with the process.
+                if last_event_id < oldest - 1 or last_event_id > latest:
+                    subscription.lagged = True
+                else:
+                    for event in history:
+                        if event["id"] > last_event_id:
+                            subscription.deliver(event)
+        return subscription
+
+    def latest_event_id(self, channel):
+        """Returns the ID of a list's newest event, or 0 if it has none."""
+        with self._lock:
+            return self._sequences.get(channel, 0)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+
+def get_list_event_broker():
+    """Returns the current app's list event broker, creating it on first use."""
+    broker = current_app.extensions.get("list_event_broker")
+    if broker is None:
+        factory = current_app.config.get("LIST_EVENT_BROKER") or InProcessBroker
+        broker = current_app.extensions.setdefault("list_event_broker", factory())
+    return broker
+
+
+def publish_list_event(list_id, event_type, data):
+    """
+    Publishes a committed change to the clients viewing a list.
+
+    A failing broker is logged rather than raised, since the change itself has
+    already been saved.
+
+    Args:
+        list_id (int): The list that changed.
+        event_type (str): The event name.
+        data (dict): The JSON-serializable event payload.
+    """
+    try:
+        get_list_event_broker().publish(list_id, event_type, data)
+    except Exception:
+        logger.exception("Could not publish %s for list %s", event_type, list_id)
+
+
+def format_event(event_type, data, event_id=None):
+    """Encodes an event in the Server-Sent Events wire format."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_events(broker, channel, last_event_id, keepalive, duration):
+    """
+    Yields a list's events as a Server-Sent Events stream.
+
+    The subscription is opened when iteration starts and closed when the stream
+    ends or the client disconnects. The stream sends a comment every
+    ``keepalive`` seconds so proxies keep the connection open, and ends after
+    ``duration`` seconds so a worker is never held forever; the browser then
+    reconnects with the ID of the last event it saw. A client that missed
+    events is sent ``reset`` and the stream ends.
+
+    Args:
+        broker (InProcessBroker): The broker to subscribe to.
+        channel (int): The list ID.
+        last_event_id (int, optional): The last event the client saw.
+        keepalive (float): Seconds between keepalive comments.
+        duration (float): Seconds before the stream ends.
+
+    Yields:
+        str: Encoded events and comments.
+    """
+    with broker.subscribe(channel, last_event_id) as subscription:
+        yield f"retry: {RECONNECT_MILLISECONDS}\n\n"
+        deadline = time.monotonic() + duration
+        while True:
+            if subscription.lagged:
+                yield format_event("reset", {})
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            event = subscription.get(timeout=min(keepalive, remaining))
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield format_event(event["type"], event["data"], event["id"])
+
+
+def open_list_stream(list_id, last_event_id=None):
+    """
+    Returns a list's event stream, configured from the current app.
+
+    The stream holds no app or request context, so it can outlive the request.
+
+    Args:
+        list_id (int): The list to follow.
+        last_event_id (int, optional): The last event the client saw.
+
+    Returns:
+        Iterator[str]: The encoded stream, see `stream_events`.
+    """
+    config = current_app.config
+    return stream_events(
+        get_list_event_broker(),
+        list_id,
+        last_event_id,
+        config.get(
+            "LIST_EVENT_KEEPALIVE_SECONDS", DEFAULT_LIST_EVENT_KEEPALIVE_SECONDS
+        ),
+        config.get("LIST_EVENT_STREAM_SECONDS", DEFAULT_LIST_EVENT_STREAM_SECONDS),
+    )
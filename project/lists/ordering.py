@@ -0,0 +1,707 @@
+"""
+Ordering of list items and categories.
+
+Orderings are sparse: new rows are appended ``ORDERING_GAP`` past the last one,
+and a move takes the midpoint between its new neighbours, so inserting or moving
+a row writes only that row. When a move uses up the room between two neighbours,
+the scope (a category's items, or a list's categories) is respaced on a
+background thread. A move that finds no room before that has run respaces the
+scope itself first. A move names its new neighbours, and is rejected if they are
+no longer adjacent, so a move sent from an outdated page never ties with the one
+that changed it. Moves, reorders and rebalances of a list lock its row first, so
+they run one at a time and each sees the orderings the previous one committed.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from flask import current_app
+from sqlalchemy import exists, func, or_, select, tuple_, update
+
+from project.lists.events import publish_list_event
+from project.models import CustomList, ListCategory, ListItem, db
+
+logger = logging.getLogger(__name__)
+
+# The most entries accepted in one reorder request.
+MAX_REORDER_ENTRIES = 1000
+# The distance between neighbours after an append or a rebalance. Each move
+# between the same two neighbours halves it, so about ten fit before a rebalance.
+ORDERING_GAP = 1024
+# The highest position the bulk reorders accept, so orderings fit in 32 bits.
+MAX_REORDER_POSITION = (2**31 - 1) // ORDERING_GAP
+
+# The column each model's orderings are scoped by, and the fields events carry.
+_SCOPES = {
+    ListItem: (ListItem.category_id, ("id", "ordering", "category_id", "completed")),
+    ListCategory: (ListCategory.custom_list_id, ("id", "ordering")),
+}
+# Scopes with a background rebalance queued or running, as (model, scope ID).
+_pending_rebalances = set()
+_pending_lock = threading.Lock()
+
+
+class ReorderResult(NamedTuple):
+    """The outcome of a bulk reorder."""
+
+    # The event fields of each row written.
+    updated: list
+    # The submitted IDs that are not in the list, sorted.
+    skipped: list
+
+
+def _to_int(value, field):
+    """Converts an integer or a string of digits, as sent by the list page."""
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    if type(value) is not int:
+        raise ValueError(f"{field} must be an integer")
+    return value
+
+
+def _to_optional_int(value, field):
+    """Like `_to_int`, but a missing or empty value is None."""
+    return None if value in (None, "") else _to_int(value, field)
+
+
+@contextmanager
+def _locked_list(list_id):
+    """
+    Holds a lock on a list's row while its orderings are read and written.
+
+    Postgres locks the row with ``SELECT ... FOR UPDATE``. SQLite ignores that
+    clause, so a no-op UPDATE of the row takes the database's write lock
+    instead. Either way a second writer waits here until the first commits,
+    and then reads what it wrote. The block commits; if it raises, the
+    transaction is rolled back, which releases the lock.
+
+    Args:
+        list_id (int): The list whose items or categories are about to change.
+    """
+    if db.session.get_bind().dialect.name == "sqlite":
+        db.session.execute(
+            update(CustomList)
+            .where(CustomList.id == list_id)
+            .values(id=CustomList.id)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        db.session.execute(
+            select(CustomList.id).where(CustomList.id == list_id).with_for_update()
+        )
+    try:
+        yield
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _position_ordering(position, taken):
+    """
+    Returns the ordering of a position sent to a bulk reorder.
+
+    Args:
+        position (int): The submitted position.
+        taken (set): The orderings of the scope's other rows, including those
+            already assigned, which is updated.
+
+    Raises:
+        ValueError: If the position is out of range or taken.
+    """
+    if not 0 <= position <= MAX_REORDER_POSITION:
+        raise ValueError(f"ordering must be between 0 and {MAX_REORDER_POSITION}")
+    ordering = position * ORDERING_GAP
+    if ordering in taken:
+        raise ValueError(f"Ordering {position} is already taken")
+    taken.add(ordering)
+    return ordering
+
+
+def _parse_changes(entries, fields):
+    """
+    Validates a reorder payload.
+
+    Args:
+        entries (list): The submitted entries, each a dict with an integer
+            ``id`` and optional integer ``fields``. Integers may be sent as
+            strings.
+        fields (tuple[str]): The optional fields an entry may set.
+
+    Returns:
+        dict[int, dict]: The fields each entry sets, keyed by ID. Fields that
+        are missing or null are left out. Later entries for the same ID win.
+
+    Raises:
+        ValueError: If the payload is malformed or too large.
+    """
+    if not isinstance(entries, list):
+        raise ValueError("Expected a list of entries")
+    if len(entries) > MAX_REORDER_ENTRIES:
+        raise ValueError(f"At most {MAX_REORDER_ENTRIES} entries can be reordered")
+
+    changes = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise ValueError("Every entry must be an object")
+        values = {}
+        for field in fields:
+            if entry.get(field) not in (None, ""):
+                values[field] = _to_int(entry[field], field)
+        changes[_to_int(entry.get("id"), "id")] = values
+    return changes
+
+
+def reorder_items(list_id, entries):
+    """
+    Applies new orderings and category moves to the items of a list.
+
+    Submitted orderings are positions, stored ``ORDERING_GAP`` apart so that
+    later moves between them find room. A position may not be one that
+    another item of the category holds, whether it was sent or not, so a
+    payload may reorder part of a category only around the rows it leaves
+    alone. The list's categories and all their items are loaded with one
+    query, so items outside the list are skipped (and reported) and moves to
+    categories outside it are ignored. The items that actually change are
+    then written with a single executemany UPDATE.
+
+    Args:
+        list_id (int): The list the items belong to.
+        entries (list[dict]): ``{"id", "ordering", "category_id"}`` for each
+            item. ``ordering`` and ``category_id`` are optional.
+
+    Returns:
+        ReorderResult: The ``{"id", "ordering", "category_id"}`` of each item
+        updated, and the IDs skipped.
+
+    Raises:
+        ValueError: If ``entries`` is malformed or an item is sent to a
+            position that is taken.
+    """
+    changes = _parse_changes(entries, ("ordering", "category_id"))
+    if not changes:
+        return ReorderResult([], [])
+
+    with _locked_list(list_id):
+        # Every category of the list, joined to the items it holds.
+        rows = db.session.execute(
+            select(ListCategory.id, ListItem.id, ListItem.ordering)
+            .outerjoin(ListItem, ListItem.category_id == ListCategory.id)
+            .where(ListCategory.custom_list_id == list_id)
+        ).all()
+        updates = _item_updates(rows, changes)
+        if updates:
+            db.session.execute(update(ListItem), updates)
+        db.session.commit()
+    found_ids = {item_id for _, item_id, _ in rows}
+    return ReorderResult(updates, sorted(set(changes) - found_ids))
+
+
+def _item_updates(rows, changes):
+    """
+    Returns the rows `reorder_items` writes.
+
+    Args:
+        rows (list[tuple]): ``(category_id, item_id, ordering)`` of every item
+            of the list, with an item ID of None for an empty category.
+        changes (dict[int, dict]): The parsed payload.
+
+    Raises:
+        ValueError: If an item is sent to a position that is taken.
+    """
+    category_ids = {category_id for category_id, _, _ in rows}
+
+    # The submitted items with their new categories, and the orderings that
+    # stay where they are.
+    submitted = []
+    taken = {category_id: set() for category_id in category_ids}
+    for category_id, item_id, ordering in rows:
+        if item_id is None:
+            continue
+        values = changes.get(item_id, {})
+        new_category_id = values.get("category_id", category_id)
+        if new_category_id not in category_ids:
+            new_category_id = category_id
+        if "ordering" not in values:
+            taken[new_category_id].add(ordering)
+        if item_id in changes:
+            submitted.append((item_id, ordering, category_id, new_category_id))
+
+    updates = []
+    for item_id, ordering, category_id, new_category_id in submitted:
+        new_ordering = ordering
+        if "ordering" in changes[item_id]:
+            new_ordering = _position_ordering(
+                changes[item_id]["ordering"], taken[new_category_id]
+            )
+        if (new_ordering, new_category_id) != (ordering, category_id):
+            updates.append(
+                {
+                    "id": item_id,
+                    "ordering": new_ordering,
+                    "category_id": new_category_id,
+                }
+            )
+    return updates
+
+
+def reorder_categories(list_id, entries):
+    """
+    Applies new orderings to the categories of a list.
+
+    Submitted orderings are positions, stored ``ORDERING_GAP`` apart. A
+    position may not be one that another category of the list holds, whether
+    it was sent or not. The list's categories are loaded with one query, and
+    the ones that actually change are written with a single executemany
+    UPDATE. Categories outside the list are skipped and reported.
+
+    Args:
+        list_id (int): The list the categories belong to.
+        entries (list[dict]): ``{"id", "ordering"}`` for each category.
+
+    Returns:
+        ReorderResult: The ``{"id", "ordering"}`` of each category updated,
+        and the IDs skipped.
+
+    Raises:
+        ValueError: If ``entries`` is malformed or a category is sent to a
+            position that is taken.
+    """
+    changes = _parse_changes(entries, ("ordering",))
+    if not changes:
+        return ReorderResult([], [])
+
+    with _locked_list(list_id):
+        rows = db.session.execute(
+            select(ListCategory.id, ListCategory.ordering).where(
+                ListCategory.custom_list_id == list_id
+            )
+        ).all()
+        taken = {
+            ordering
+            for category_id, ordering in rows
+            if "ordering" not in changes.get(category_id, {})
+        }
+        updates = []
+        for category_id, ordering in rows:
+            if "ordering" not in changes.get(category_id, {}):
+                continue
+            new_ordering = _position_ordering(changes[category_id]["ordering"], taken)
+            if new_ordering != ordering:
+                updates.append({"id": category_id, "ordering": new_ordering})
+        if updates:
+            db.session.execute(update(ListCategory), updates)
+        db.session.commit()
+    found_ids = {category_id for category_id, _ in rows}
+    return ReorderResult(updates, sorted(set(changes) - found_ids))
+
+
+def next_ordering(model, scope_id):
+    """
+    Returns the ordering for a row appended to a scope, as a SQL subquery.
+
+    Assigned to ``ordering`` on a new row, the subquery is evaluated inside its
+    INSERT, so appending needs no separate ``MAX`` query.
+
+    Args:
+        model (type): `ListItem` or `ListCategory`.
+        scope_id (int): The category ID for items, the list ID for categories.
+    """
+    scope_column, _ = _SCOPES[model]
+    return (
+        select(func.coalesce(func.max(model.ordering), 0) + ORDERING_GAP)
+        .where(scope_column == scope_id)
+        .scalar_subquery()
+    )
+
+
+def ordering_between(previous, following):
+    """
+    Returns an ordering that sorts between two neighbours.
+
+    Args:
+        previous (int): The ordering of the row before, or None at the start.
+        following (int): The ordering of the row after, or None at the end.
+
+    Returns:
+        int: The new ordering, or None if no integer lies between them.
+    """
+    if previous is None and following is None:
+        return ORDERING_GAP
+    if previous is None:
+        return following - ORDERING_GAP
+    if following is None:
+        return previous + ORDERING_GAP
+    if following - previous < 2:
+        return None
+    return (previous + following) // 2
+
+
+def rebalance(model, scope_id):
+    """
+    Respaces the orderings of a scope ``ORDERING_GAP`` apart, keeping their order.
+
+    The new orderings are computed and written by one UPDATE, so rows moved
+    concurrently are never overwritten with stale positions. The caller holds the
+    list's lock and commits.
+
+    Args:
+        model (type): `ListItem` or `ListCategory`.
+        scope_id (int): The category ID for items, the list ID for categories.
+
+    Returns:
+        list[dict]: The event fields of every row in the scope.
+    """
+    scope_column, fields = _SCOPES[model]
+    ranked = (
+        select(
+            model.id,
+            (
+                func.row_number().over(order_by=(model.ordering, model.id))
+                * ORDERING_GAP
+            ).label("ordering"),
+        )
+        .where(scope_column == scope_id)
+        .subquery()
+    )
+    db.session.execute(
+        update(model)
+        .where(model.id == ranked.c.id, model.ordering != ranked.c.ordering)
+        .values(ordering=ranked.c.ordering)
+        .execution_options(synchronize_session=False)
+    )
+    rows = db.session.execute(
+        select(*(getattr(model, field) for field in fields)).where(
+            scope_column == scope_id
+        )
+    ).all()
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def rebalance_in_background(list_id, model, scope_id):
+    """
+    Rebalances a scope on a background thread and publishes its new orderings.
+
+    Does nothing if the scope already has a rebalance queued, or if the
+    ``LIST_REBALANCE_IN_BACKGROUND`` config value is false, in which case the
+    next move that runs out of room rebalances instead.
+
+    Args:
+        list_id (int): The list the scope belongs to.
+        model (type): `ListItem` or `ListCategory`.
+        scope_id (int): The category ID for items, the list ID for categories.
+    """
+    if not current_app.config.get("LIST_REBALANCE_IN_BACKGROUND", True):
+        return
+    key = (model, scope_id)
+    with _pending_lock:
+        if key in _pending_rebalances:
+            return
+        _pending_rebalances.add(key)
+
+    thread = threading.Thread(
+        target=_run_rebalance,
+        args=(current_app._get_current_object(), list_id, key),
+        name=f"rebalance-{model.__tablename__}-{scope_id}",
+        daemon=True,
+    )
+    thread.start()
+
+
+def _run_rebalance(app, list_id, key):
+    model, scope_id = key
+    try:
+        with app.app_context():
+            with _locked_list(list_id):
+                rows = rebalance(model, scope_id)
+                db.session.commit()
+            _publish_orderings(list_id, model, rows)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Rebalancing %s %s failed", model.__tablename__, scope_id)
+    finally:
+        with _pending_lock:
+            _pending_rebalances.discard(key)
+
+
+def _publish_orderings(list_id, model, rows):
+    if model is ListItem:
+        publish_list_event(list_id, "items_reordered", {"items": rows})
+    else:
+        publish_list_event(list_id, "categories_reordered", {"categories": rows})
+
+
+def _neighbours(orderings, previous_id, next_id):
+    """
+    Returns the ``(ordering, id)`` keys of two neighbours, each None if absent.
+
+    Args:
+        orderings (dict[int, int]): The ordering of every candidate neighbour.
+        previous_id (int): The row before, or None.
+        next_id (int): The row after, or None.
+
+    Raises:
+        ValueError: If a neighbour is not a candidate.
+    """
+    for neighbour_id in (previous_id, next_id):
+        if neighbour_id is not None and neighbour_id not in orderings:
+            raise ValueError(f"Unknown neighbour {neighbour_id}")
+    return tuple(
+        None if neighbour_id is None else (orderings[neighbour_id], neighbour_id)
+        for neighbour_id in (previous_id, next_id)
+    )
+
+
+def _gap(model, scope_id, sublist, moved_id, previous, following):
+    """
+    Checks that two neighbours are adjacent and returns the room between them.
+
+    The neighbours are adjacent when no other row of the sublist sorts strictly
+    between them. With only one of them, it must be the first or the last row,
+    and with neither the sublist must be empty. A client that sent neighbours
+    from an outdated page, such as after another user's move, fails this check
+    rather than tying with that move; the caller holds the list's lock, so no
+    other move can land in the slot between this check and the write.
+
+    The room is bounded by the nearest rows of the whole scope, so a row of
+    another sublist (a category's completed items, for active ones) never
+    gets the same ordering. One query checks adjacency and reads the bound.
+
+    Args:
+        model (type): `ListItem` or `ListCategory`.
+        scope_id (int): The category ID for items, the list ID for categories.
+        sublist (list): The conditions selecting the rows of the scope shown
+            together with the moved one.
+        moved_id (int): The row being moved, which is ignored.
+        previous (tuple[int, int]): ``(ordering, id)`` of the row before, or
+            None.
+        following (tuple[int, int]): ``(ordering, id)`` of the row after, or
+            None.
+
+    Returns:
+        tuple[int, int]: The orderings of the nearest rows before and after
+        the slot, each None at an end of the scope.
+
+    Raises:
+        ValueError: If the neighbours are out of order or not adjacent.
+    """
+    if previous is not None and following is not None and previous >= following:
+        raise ValueError("The neighbours are out of order")
+    scope_column, _ = _SCOPES[model]
+    key = tuple_(model.ordering, model.id)
+    others = [scope_column == scope_id, model.id != moved_id]
+    after_previous = [] if previous is None else [key > tuple_(*previous)]
+    before_following = [] if following is None else [key < tuple_(*following)]
+
+    if previous is not None:
+        bound = select(func.min(model.ordering)).where(*others, *after_previous)
+    else:
+        bound = select(func.max(model.ordering)).where(*others, *before_following)
+    crowded, bound = db.session.execute(
+        select(
+            exists().where(*others, *sublist, *after_previous, *before_following),
+            bound.scalar_subquery(),
+        )
+    ).one()
+    if crowded:
+        raise ValueError("The neighbours are not adjacent")
+    if previous is not None:
+        return previous[0], bound
+    return bound, None if following is None else following[0]
+
+
+def _place(model, scope_id, sublist, moved_id, previous, following):
+    """
+    Picks an ordering between two adjacent neighbours, rebalancing first if
+    there is no room between them (including when their orderings tie).
+
+    Takes the arguments of `_gap`.
+
+    Returns:
+        tuple[int, list[dict], bool]: The new ordering; the event fields of the
+        scope's rows if it had to be rebalanced, else an empty list; and
+        whether the move uses up the room next to it, so the scope should be
+        rebalanced once it is committed.
+
+    Raises:
+        ValueError: If the neighbours are not adjacent.
+    """
+    lower, upper = _gap(model, scope_id, sublist, moved_id, previous, following)
+    new_ordering = ordering_between(lower, upper)
+    rebalanced = []
+    if new_ordering is None:
+        rebalanced = rebalance(model, scope_id)
+        orderings = {row["id"]: row["ordering"] for row in rebalanced}
+        previous, following = (
+            None if neighbour is None else (orderings[neighbour[1]], neighbour[1])
+            for neighbour in (previous, following)
+        )
+        lower, upper = _gap(model, scope_id, sublist, moved_id, previous, following)
+        new_ordering = ordering_between(lower, upper)
+    # The next move next to this one would find no room.
+    exhausted = (lower is not None and new_ordering - lower < 2) or (
+        upper is not None and upper - new_ordering < 2
+    )
+    return new_ordering, rebalanced, exhausted
+
+
+def move_item(
+    list_id, item_id, category_id, previous_id=None, next_id=None, completed=None
+):
+    """
+    Moves an item between two neighbours, in its category or another one.
+
+    A category shows its active and completed items as separate lists, and
+    the neighbours must be adjacent in the one the item is dropped into.
+    Dropping an item into the other one changes its completed state. Once the
+    list is locked, the item, its neighbours and the target category are
+    checked against it with one query and the neighbours' adjacency with a
+    second, and only the moved item is written unless the category had to be
+    rebalanced first.
+
+    Args:
+        list_id (int): The list the item belongs to.
+        item_id (int): The item to move.
+        category_id (int): The category to move it to.
+        previous_id (int, optional): The item it goes after, if any.
+        next_id (int, optional): The item it goes before, if any.
+        completed (bool, optional): Whether it is dropped among the completed
+            items. Defaults to its current state.
+
+    Returns:
+        list[dict]: The ``{"id", "ordering", "category_id", "completed"}`` of
+        each item updated.
+
+    Raises:
+        ValueError: If an ID is malformed or outside the list, or the
+            neighbours are not adjacent.
+    """
+    item_id = _to_int(item_id, "id")
+    category_id = _to_int(category_id, "category_id")
+    previous_id = _to_optional_int(previous_id, "previous_id")
+    next_id = _to_optional_int(next_id, "next_id")
+    if completed is not None and not isinstance(completed, bool):
+        raise ValueError("completed must be a boolean")
+    neighbour_ids = [i for i in (previous_id, next_id) if i is not None]
+    if item_id in neighbour_ids:
+        raise ValueError("An item cannot be its own neighbour")
+
+    with _locked_list(list_id):
+        # The target category with the neighbours in it, and the item wherever it is.
+        rows = db.session.execute(
+            select(ListCategory.id, ListItem.id, ListItem.ordering, ListItem.completed)
+            .outerjoin(
+                ListItem,
+                (ListItem.category_id == ListCategory.id)
+                & ListItem.id.in_([item_id, *neighbour_ids]),
+            )
+            .where(
+                ListCategory.custom_list_id == list_id,
+                or_(ListCategory.id == category_id, ListItem.id == item_id),
+            )
+        ).all()
+        if not any(row_category_id == category_id for row_category_id, *_ in rows):
+            raise ValueError(f"Unknown category {category_id}")
+        item_completed = next(
+            (
+                row_completed
+                for _, row_item_id, _, row_completed in rows
+                if row_item_id == item_id
+            ),
+            None,
+        )
+        if item_completed is None:
+            raise ValueError(f"Unknown item {item_id}")
+        if completed is None:
+            completed = item_completed
+        previous, following = _neighbours(
+            {
+                row_item_id: ordering
+                for row_category_id, row_item_id, ordering, row_completed in rows
+                if row_category_id == category_id
+                and row_item_id not in (None, item_id)
+                and row_completed == completed
+            },
+            previous_id,
+            next_id,
+        )
+
+        new_ordering, rebalanced, exhausted = _place(
+            ListItem,
+            category_id,
+            [ListItem.completed == completed],
+            item_id,
+            previous,
+            following,
+        )
+        db.session.execute(
+            update(ListItem)
+            .where(ListItem.id == item_id)
+            .values(ordering=new_ordering, category_id=category_id, completed=completed)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    if exhausted:
+        rebalance_in_background(list_id, ListItem, category_id)
+    moved = {
+        "id": item_id,
+        "ordering": new_ordering,
+        "category_id": category_id,
+        "completed": completed,
+    }
+    return [row for row in rebalanced if row["id"] != item_id] + [moved]
+
+
+def move_category(list_id, category_id, previous_id=None, next_id=None):
+    """
+    Moves a category between two adjacent neighbours in its list.
+
+    Args:
+        list_id (int): The list the category belongs to.
+        category_id (int): The category to move.
+        previous_id (int, optional): The category it goes after, if any.
+        next_id (int, optional): The category it goes before, if any.
+
+    Returns:
+        list[dict]: The ``{"id", "ordering"}`` of each category updated.
+
+    Raises:
+        ValueError: If an ID is malformed or outside the list, or the
+            neighbours are not adjacent.
+    """
+    category_id = _to_int(category_id, "id")
+    previous_id = _to_optional_int(previous_id, "previous_id")
+    next_id = _to_optional_int(next_id, "next_id")
+    neighbour_ids = [i for i in (previous_id, next_id) if i is not None]
+    if category_id in neighbour_ids:
+        raise ValueError("A category cannot be its own neighbour")
+
+    with _locked_list(list_id):
+        rows = db.session.execute(
+            select(ListCategory.id, ListCategory.ordering).where(
+                ListCategory.custom_list_id == list_id,
+                ListCategory.id.in_([category_id, *neighbour_ids]),
+            )
+        ).all()
+        if not any(row_id == category_id for row_id, _ in rows):
+            raise ValueError(f"Unknown category {category_id}")
+        previous, following = _neighbours(
+            {row_id: ordering for row_id, ordering in rows if row_id != category_id},
+            previous_id,
+            next_id,
+        )
+
+        new_ordering, rebalanced, exhausted = _place(
+            ListCategory, list_id, [], category_id, previous, following
+        )
+        db.session.execute(
+            update(ListCategory)
+            .where(ListCategory.id == category_id)
+            .values(ordering=new_ordering)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    if exhausted:
+        rebalance_in_background(list_id, ListCategory, list_id)
+    moved = {"id": category_id, "ordering": new_ordering}
+    return [row for row in rebalanced if row["id"] != category_id] + [moved]
@@ -0,0 +1,59 @@
+"""Loads a custom list's categories and items for rendering in two queries."""
+
+from dataclasses import dataclass, field
+
+from sqlalchemy import select
+
+from project.models import ListCategory, ListItem, db
+
+
+@dataclass
+class CategoryView:
+    """A category of a list with its items, split by completion and ordered."""
+
+    id: int
+    name: str
+    ordering: int
+    active_items: list = field(default_factory=list)
+    completed_items: list = field(default_factory=list)
+
+
+def load_list_tree(list_id):
+    """
+    Loads every category of a list and its items.
+
+    Categories are loaded with one query and all of their items with a second,
+    both in ``(ordering, id)`` order, so the number of queries does not grow
+    with the number of categories.
+
+    Args:
+        list_id (int): The list to load.
+
+    Returns:
+        list[CategoryView]: The list's categories in order, each holding its
+        active and completed ``ListItem`` objects in order.
+    """
+    categories = {
+        category.id: CategoryView(category.id, category.name, category.ordering)
+        for category in db.session.execute(
+            select(ListCategory.id, ListCategory.name, ListCategory.ordering)
+            .where(ListCategory.custom_list_id == list_id)
+            .order_by(ListCategory.ordering, ListCategory.id)
+        )
+    }
+    if not categories:
+        return []
+
+    items = db.session.scalars(
+        select(ListItem)
+        .join(ListCategory, ListItem.category_id == ListCategory.id)
+        .where(ListCategory.custom_list_id == list_id)
+        .order_by(ListItem.ordering, ListItem.id)
+    )
+    for item in items:
+        category = categories[item.category_id]
+        if item.completed:
+            category.completed_items.append(item)
+        else:
+            category.active_items.append(item)
+    return list(categories.values())
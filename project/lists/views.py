@@ -1,9 +1,27 @@
 # myapp/lists/routes.py
-from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
 from flask_login import current_user, login_required
-from sqlalchemy import and_
-
+from sqlalchemy import and_, select
+
+from project.lists import ordering
+from project.lists.access import can_access_list, is_shared_with
+from project.lists.events import (
+    get_list_event_broker,
+    open_list_stream,
+    publish_list_event,
+)
 from project.lists.forms import CategoryForm, ItemForm, ListForm
+from project.lists.tree import load_list_tree
 from project.models import CustomList, ListCategory, ListItem, User, db
 
 lists_blueprint = Blueprint("lists", __name__, template_folder="templates")
@@ -71,7 +89,7 @@ def share_list(list_id):
         flash("You can't share a list with yourself.", "danger")
         return redirect(url_for("lists.view_list", list_id=list_id))
 
-    if user_to_share_with in custom_list.shared_with:
+    if db.session.scalar(select(is_shared_with(list_id, user_to_share_with.id))):
         flash(f"List is already shared with {email}.", "info")
         return redirect(url_for("lists.view_list", list_id=list_id))
 
@@ -87,10 +105,7 @@ def view_list(list_id):
     """View a specific list."""
     custom_list = CustomList.query.get_or_404(list_id)
     # Check if user has access to this list
-    if (
-        custom_list.owner_id != current_user.id
-        and current_user not in custom_list.shared_with
-    ):
+    if not can_access_list(list_id):
         flash("You don't have access to this list.", "danger")
         return redirect(url_for("lists.list_lists"))
 
@@ -99,27 +114,37 @@ def view_list(list_id):
 
     # Handle adding a new category.
     if cat_form.validate_on_submit():
-        # Get the highest ordering value
-        max_order = (
-            db.session.query(db.func.max(ListCategory.ordering))
-            .filter_by(custom_list_id=list_id)
-            .scalar()
-            or 0
-        )
-
+        # Append it after the last category.
         new_category = ListCategory(
-            name=cat_form.name.data, custom_list=custom_list, ordering=max_order + 1
+            name=cat_form.name.data,
+            custom_list=custom_list,
+            ordering=ordering.next_ordering(ListCategory, list_id),
         )
         db.session.add(new_category)
         db.session.commit()
+        publish_list_event(
+            list_id,
+            "category_added",
+            {
+                "id": new_category.id,
+                "name": new_category.name,
+                "ordering": new_category.ordering,
+            },
+        )
         flash("Category added successfully.", "success")
         return redirect(url_for("lists.view_list", list_id=list_id))
 
+    # The page is current up to this event, and the stream resumes after it.
+    # Read it before the tree, so a change committed in between is replayed
+    # rather than lost; one already in the tree is harmless to apply again.
+    last_event_id = get_list_event_broker().latest_event_id(list_id)
     return render_template(
         "list_view.html",
         custom_list=custom_list,
+        categories=load_list_tree(list_id),
         cat_form=cat_form,
         item_form=item_form,
+        last_event_id=last_event_id,
     )
 
 
@@ -127,12 +152,8 @@ def view_list(list_id):
 @login_required
 def add_item(list_id):
     """Add an item to a list."""
-    custom_list = CustomList.query.get_or_404(list_id)
     # Check if user has access to this list
-    if (
-        custom_list.owner_id != current_user.id
-        and current_user not in custom_list.shared_with
-    ):
+    if not can_access_list(list_id):
         flash("You don't have access to this list.", "danger")
         return redirect(url_for("lists.list_lists"))
 
@@ -147,23 +168,29 @@ def add_item(list_id):
                 id=category_id, custom_list_id=list_id
             ).first_or_404()
 
-            # Set ordering to one more than the current maximum in the category.
-            max_order = (
-                db.session.query(db.func.max(ListItem.ordering))
-                .filter_by(category_id=category.id)
-                .scalar()
-                or 0
-            )
-
+            # Append it after the last item in the category.
             new_item = ListItem(
                 name=form.name.data,
                 quantity=form.quantity.data,
                 notes=form.notes.data,
                 category=category,
-                ordering=max_order + 1,
+                ordering=ordering.next_ordering(ListItem, category.id),
             )
             db.session.add(new_item)
             db.session.commit()
+            publish_list_event(
+                list_id,
+                "item_added",
+                {
+                    "id": new_item.id,
+                    "category_id": category.id,
+                    "name": new_item.name,
+                    "quantity": new_item.quantity,
+                    "notes": new_item.notes,
+                    "completed": new_item.completed,
+                    "ordering": new_item.ordering,
+                },
+            )
             flash("Item added successfully.", "success")
         except (ValueError, TypeError):
             flash(f"Invalid category ID: {request.form.get('category_id')}", "danger")
@@ -183,16 +210,22 @@ def add_item(list_id):
 @login_required
 def toggle_item(list_id, item_id):
     """Toggle an item's completed status."""
-    item = ListItem.query.get_or_404(item_id)
     # Check if user has access to this list
-    if (
-        item.category.custom_list.owner_id != current_user.id
-        and current_user not in item.category.custom_list.shared_with
-    ):
+    if not can_access_list(list_id):
         return jsonify({"success": False, "error": "Access denied"}), 403
+    item = db.first_or_404(
+        select(ListItem)
+        .join(ListCategory, ListItem.category_id == ListCategory.id)
+        .where(ListItem.id == item_id, ListCategory.custom_list_id == list_id)
+    )
     # Flip the completion flag.
     item.completed = not item.completed
     db.session.commit()
+    publish_list_event(
+        list_id,
+        "item_toggled",
+        {"id": item.id, "category_id": item.category_id, "completed": item.completed},
+    )
     return jsonify({"success": True, "completed": item.completed})
 
 
@@ -200,49 +233,103 @@ def toggle_item(list_id, item_id):
 @login_required
 def reorder_items(list_id):
     """Reorder items in a list."""
-    custom_list = CustomList.query.get_or_404(list_id)
     # Check if user has access to this list
-    if (
-        custom_list.owner_id != current_user.id
-        and current_user not in custom_list.shared_with
-    ):
+    if not can_access_list(list_id):
         return jsonify({"success": False, "error": "Access denied"}), 403
     # Expect a JSON payload: { "items": [ { "id": 1, "ordering": 1, "category_id": 2 }, ... ] }
-    data = request.get_json()
-    for item_data in data.get("items", []):
-        item = ListItem.query.get(item_data["id"])
-        if item and item.category.custom_list_id == list_id:  # Extra security check
-            item.ordering = item_data.get("ordering", item.ordering)
-            new_category_id = item_data.get("category_id")
-            if new_category_id:
-                # Verify the new category belongs to this list
-                if ListCategory.query.filter_by(
-                    id=new_category_id, custom_list_id=list_id
-                ).first():
-                    item.category_id = new_category_id
-    db.session.commit()
-    return jsonify({"success": True})
+    data = request.get_json(silent=True) or {}
+    try:
+        result = ordering.reorder_items(list_id, data.get("items", []))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    if result.updated:
+        publish_list_event(list_id, "items_reordered", {"items": result.updated})
+    return jsonify(
+        {"success": True, "updated": len(result.updated), "skipped": result.skipped}
+    )
 
 
 @lists_blueprint.route("/lists/<int:list_id>/reorder_categories", methods=["POST"])
 @login_required
 def reorder_categories(list_id):
     """Reorder categories in a list."""
-    custom_list = CustomList.query.get_or_404(list_id)
     # Check if user has access to this list
-    if (
-        custom_list.owner_id != current_user.id
-        and current_user not in custom_list.shared_with
-    ):
+    if not can_access_list(list_id):
         return jsonify({"success": False, "error": "Access denied"}), 403
     # Expect a JSON payload: { "categories": [ { "id": 1, "ordering": 1 }, ... ] }
-    data = request.get_json()
-    for cat_data in data.get("categories", []):
-        category = ListCategory.query.get(cat_data["id"])
-        if category and category.custom_list_id == list_id:  # Extra security check
-            category.ordering = cat_data.get("ordering", category.ordering)
-    db.session.commit()
-    return jsonify({"success": True})
+    data = request.get_json(silent=True) or {}
+    try:
+        result = ordering.reorder_categories(list_id, data.get("categories", []))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    if result.updated:
+        publish_list_event(
+            list_id, "categories_reordered", {"categories": result.updated}
+        )
+    return jsonify(
+        {"success": True, "updated": len(result.updated), "skipped": result.skipped}
+    )
+
+
+@lists_blueprint.route("/lists/<int:list_id>/move_item", methods=["POST"])
+@login_required
+def move_item(list_id):
+    """Move one item between two neighbours."""
+    if not can_access_list(list_id):
+        return jsonify({"success": False, "error": "Access denied"}), 403
+    # Expect a JSON payload:
+    # { "id": 1, "category_id": 2, "previous_id": 3, "next_id": 4, "completed": false }
+    data = request.get_json(silent=True) or {}
+    try:
+        updated = ordering.move_item(
+            list_id,
+            data.get("id"),
+            data.get("category_id"),
+            data.get("previous_id"),
+            data.get("next_id"),
+            data.get("completed"),
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    publish_list_event(list_id, "items_reordered", {"items": updated})
+    return jsonify({"success": True, "items": updated})
+
+
+@lists_blueprint.route("/lists/<int:list_id>/move_category", methods=["POST"])
+@login_required
+def move_category(list_id):
+    """Move one category between two neighbours."""
+    if not can_access_list(list_id):
+        return jsonify({"success": False, "error": "Access denied"}), 403
+    # Expect a JSON payload: { "id": 1, "previous_id": 2, "next_id": 3 }
+    data = request.get_json(silent=True) or {}
+    try:
+        updated = ordering.move_category(
+            list_id, data.get("id"), data.get("previous_id"), data.get("next_id")
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    publish_list_event(list_id, "categories_reordered", {"categories": updated})
+    return jsonify({"success": True, "categories": updated})
+
+
+@lists_blueprint.route("/lists/<int:list_id>/events")
+@login_required
+def list_events(list_id):
+    """Stream a list's changes as Server-Sent Events."""
+    if not can_access_list(list_id):
+        abort(403)
+    # A reconnecting browser sends the last event it saw; a fresh page passes
+    # the event it was rendered at.
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("after")
+    last_event_id = int(last_event_id) if str(last_event_id).isdigit() else None
+    # Release the database connection before the long-lived response.
+    db.session.remove()
+    return Response(
+        open_list_stream(list_id, last_event_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @lists_blueprint.route("/lists/<int:list_id>/debug")
@@ -251,10 +338,7 @@ def debug_list(list_id):
     """Debug view to see list data."""
     custom_list = CustomList.query.get_or_404(list_id)
     # Check if user has access to this list
-    if (
-        custom_list.owner_id != current_user.id
-        and current_user not in custom_list.shared_with
-    ):
+    if not can_access_list(list_id):
         flash("You don't have access to this list.", "danger")
         return redirect(url_for("lists.list_lists"))
 
@@ -9,17 +9,32 @@ import boto3
 import requests
 from botocore.exceptions import ClientError
 from flask_login import UserMixin
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Table, Text
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    String,
+    Table,
+    Text,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from project.database import db
 
+# The primary key answers access checks for a list and user, see
+# `project.lists.access`; the user_id index serves a user's shared lists.
 list_shares = Table(
     "list_shares",
     db.metadata,
-    Column("list_id", Integer, ForeignKey("custom_list.id")),
-    Column("user_id", Integer, ForeignKey("user.id")),
+    Column("list_id", Integer, ForeignKey("custom_list.id"), primary_key=True),
+    Column("user_id", Integer, ForeignKey("user.id"), primary_key=True, index=True),
+    PrimaryKeyConstraint("list_id", "user_id", name="list_shares_pkey"),
 )
 
 
@@ -84,6 +99,12 @@ class ListCategory(db.Model):
         "ListItem", back_populates="category", lazy="dynamic"
     )
 
+    __table_args__ = (
+        # Serves loading a list's categories in order, see
+        # `project.lists.tree.load_list_tree`.
+        Index("ix_list_category_list_ordering", "custom_list_id", "ordering"),
+    )
+
 
 class ListItem(db.Model):
     __tablename__ = "list_item"
@@ -100,6 +121,11 @@ class ListItem(db.Model):
         "ListCategory", back_populates="items"
     )
 
+    __table_args__ = (
+        # Serves loading the items of a list's categories in order.
+        Index("ix_list_item_category_ordering", "category_id", "ordering"),
+    )
+
 
 class Gift(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -174,6 +200,10 @@ class Playlist(db.Model):
     published_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
     updated_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
     thumbnail_url: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # ETag and item count reported by the API at the last sync, used to skip
+    # fetching the videos of playlists that have not changed.
+    etag: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    item_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         default=lambda: datetime.now(timezone.utc)
     )
@@ -193,6 +223,8 @@ class Video(db.Model):
     thumbnail_url: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     embed_url: Mapped[str] = mapped_column(String(255), nullable=False)
     watched: Mapped[bool] = mapped_column(default=False)
+    # Set by the sync when the video is no longer in its playlist on YouTube.
+    removed_at: Mapped[Optional[datetime]] = mapped_column(nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(
         default=lambda: datetime.now(timezone.utc)
     )
@@ -202,3 +234,90 @@ class Video(db.Model):
     )
 
     playlist: Mapped["Playlist"] = relationship("Playlist", back_populates="videos")
+
+    __table_args__ = (
+        # Serves keyset pagination of a playlist's current videos in
+        # (published_at, id) order, see `project.library.pagination`.
+        Index(
+            "ix_video_playlist_published",
+            "playlist_id",
+            "published_at",
+            "id",
+            sqlite_where=text("removed_at IS NULL"),
+            postgresql_where=text("removed_at IS NULL"),
+        ),
+    )
+
+
+class Subscription(db.Model):
+    """A YouTube channel the authenticated user is subscribed to."""
+
+    channel_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    thumbnail_url: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    subscribed_at: Mapped[datetime] = mapped_column(nullable=False)
+    total_item_count: Mapped[int] = mapped_column(Integer, default=0)
+    # ETag reported by the API at the last sync, used to skip unchanged rows.
+    etag: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+    __table_args__ = (
+        # Serve keyset pagination of the subscriptions listing in each of its
+        # sort orders, see `project.library.pagination`.
+        Index("ix_subscription_title", "title", "channel_id"),
+        Index("ix_subscription_subscribed_at", "subscribed_at", "channel_id"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<Subscription {self.channel_id}>"
+
+
+class SyncRun(db.Model):
+    """
+    Telemetry recorded for one run of the YouTube playlist sync.
+
+    A run is saved as ``running`` when it starts, and at most one row can have
+    that status, so two syncs never write the same playlists at once.
+    """
+
+    __tablename__ = "sync_run"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    started_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
+    # None while the run is in progress.
+    finished_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    # "running", then "finished" or "failed", or "abandoned" if the process
+    # running it died.
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    playlists_total: Mapped[int] = mapped_column(Integer, default=0)
+    playlists_fetched: Mapped[int] = mapped_column(Integer, default=0)
+    playlists_skipped: Mapped[int] = mapped_column(Integer, default=0)
+    videos_fetched: Mapped[int] = mapped_column(Integer, default=0)
+    rows_changed: Mapped[int] = mapped_column(Integer, default=0)
+    api_calls: Mapped[int] = mapped_column(Integer, default=0)
+    quota_used: Mapped[int] = mapped_column(Integer, default=0)
+    quota_saved: Mapped[int] = mapped_column(Integer, default=0)
+    fetch_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    transform_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    diff_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    commit_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    total_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+
+    __table_args__ = (
+        # Only one run can be running; see `project.library.jobs.claim_sync_run`.
+        Index(
+            "ix_sync_run_running",
+            "status",
+            unique=True,
+            sqlite_where=text("status = 'running'"),
+            postgresql_where=text("status = 'running'"),
+        ),
+    )
+
+    def __repr__(self) -> str:
+        return f"<SyncRun {self.id} {self.status}>"
@@ -3,13 +3,11 @@ This module handles OAuth 2.0 authentication
 """
 
 # -*- coding: utf-8 -*-
-import json
 import os
 
 import flask
 import google.oauth2.credentials
 import google_auth_oauthlib.flow
-import googleapiclient.discovery
 import requests
 from flask import Blueprint
 from flask_login import login_required
@@ -73,11 +71,9 @@ def test_api_request():
     if credentials.expired:
         return flask.redirect("authorize")
 
-    youtube_service = googleapiclient.discovery.build(
-        GOOGLE_CLIENT_API_SERVICE_NAME,
-        GOOGLE_CLIENT_API_SERVICE_VERSION,
-        credentials=credentials,
-    )
+    from project.library.jobs import build_youtube_service
+
+    youtube_service = build_youtube_service(credentials)
     print_channel_details(youtube_service)
     playlists = fetch_playlists_details(youtube_service)
 
@@ -126,6 +122,8 @@ def fetch_playlists_details(youtube_service):
     Returns:
         A list of playlist details.
     """
+    from project.library.jobs import fetch_playlists_by_id, load_saved_playlist_ids
+
     playlists = []
 
     playlist_request = youtube_service.playlists().list(
@@ -136,15 +134,10 @@ def fetch_playlists_details(youtube_service):
     playlist_response = playlist_request.execute()
     playlists.extend(playlist_response.get("items", []))
 
-    with open("project/data/jsonfiles/youtube-ids.json", "r", encoding="utf-8") as f:
-        playlist_ids = json.load(f)
-
-    for playlist_id in playlist_ids:
-        request = youtube_service.playlists().list(
-            part="snippet,contentDetails", id=playlist_id
-        )
-        response = request.execute()
-        playlists.extend(response.get("items", []))
+    saved_playlists, _ = fetch_playlists_by_id(
+        youtube_service, load_saved_playlist_ids()
+    )
+    playlists.extend(saved_playlists)
 
     return playlists
 
@@ -241,7 +234,7 @@ def oauth2callback():
     flask.session["credentials"] = creds_dict
 
     # Also save to token file for CLI commands
-    save_credentials_to_file(creds_dict)
+    save_credentials_to_file(credentials)
 
     return flask.redirect(flask.url_for("oauth.test_api_request"))
 
@@ -0,0 +1,138 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from project import create_app
+from project.database import db
+from project.library.benchmarks import count_queries, synthetic_video_rows
+from project.library.catalog import get_catalog
+from project.models import CustomList, ListCategory, ListItem, Playlist, User, Video
+
+TEST_CONFIG = {
+    "TESTING": True,
+    "SQLALCHEMY_DATABASE_URI": "sqlite://",
+    "SECRET_KEY": "test",
+    # Talisman redirects plain HTTP requests to HTTPS.
+    "PREFERRED_URL_SCHEME": "https",
+    # Tests rebalance inline so their results do not depend on thread timing.
+    "LIST_REBALANCE_IN_BACKGROUND": False,
+}
+
+
+@pytest.fixture
+def database_uri():
+    """The database the app uses. Override it for a test that needs another."""
+    return TEST_CONFIG["SQLALCHEMY_DATABASE_URI"]
+
+
+@pytest.fixture
+def app(database_uri):
+    app = create_app({**TEST_CONFIG, "SQLALCHEMY_DATABASE_URI": database_uri})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def make_user(username):
+        user = User(username=username, email=f"{username}@example.com")
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+    return make_user
+
+
+@pytest.fixture
+def owner(make_user, login):
+    """A logged-in user to own lists."""
+    user_id = make_user("owner")
+    login(user_id)
+    return user_id
+
+
+@pytest.fixture
+def make_list(app):
+    def make_list(owner_id, items=4, categories=2, title="Groceries"):
+        """
+        Creates a list whose items are dealt round-robin into its categories.
+
+        Returns:
+            tuple: The list ID, the category IDs and the item IDs.
+        """
+        custom_list = CustomList(title=title, owner_id=owner_id)
+        category_objects = [
+            ListCategory(name=f"Category {i}", ordering=i, custom_list=custom_list)
+            for i in range(categories)
+        ]
+        item_objects = [
+            ListItem(
+                name=f"Item {i}",
+                ordering=i // categories,
+                category=category_objects[i % categories],
+            )
+            for i in range(items)
+        ]
+        db.session.add_all([custom_list, *category_objects, *item_objects])
+        db.session.commit()
+        return (
+            custom_list.id,
+            [category.id for category in category_objects],
+            [item.id for item in item_objects],
+        )
+
+    return make_list
+
+
+@pytest.fixture
+def login(client):
+    def login(user_id, as_client=None):
+        with (as_client or client).session_transaction() as session:
+            session["_user_id"] = str(user_id)
+            session["_fresh"] = True
+
+    return login
+
+
+@pytest.fixture
+def library(app):
+    """
+    Two playlists of 20 videos each, the last two of each removed.
+
+    Returns:
+        Catalog: The catalog built from them.
+    """
+    for playlist_id in ("PL1", "PL2"):
+        db.session.add(
+            Playlist(
+                id=playlist_id,
+                title=f"Playlist {playlist_id}",
+                published_at=datetime(2020, 1, 1),
+                updated_at=datetime(2020, 1, 1),
+            )
+        )
+        rows = synthetic_video_rows(playlist_id, 20)
+        for row in rows[-2:]:
+            row["removed_at"] = datetime(2021, 1, 1)
+        db.session.execute(insert(Video), rows)
+    db.session.commit()
+    return get_catalog()
+
+
+@pytest.fixture
+def queries(app):
+    """Counts the statements sent to the database while a block runs."""
+
+    def queries():
+        return count_queries(db.engine)
+
+    return queries
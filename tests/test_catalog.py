@@ -0,0 +1,62 @@
+from project.library import catalog as catalog_module
+from project.library.catalog import build_catalog, get_catalog
+from project.library.watched import set_watched
+
+
+def assert_matches_database(catalog):
+    rebuilt = build_catalog()
+    assert catalog.version == rebuilt.version
+    assert catalog.playlists == rebuilt.playlists
+    assert dict(catalog.videos) == dict(rebuilt.videos)
+    assert catalog.playlist_videos == rebuilt.playlist_videos
+    assert catalog.removed_video_ids == rebuilt.removed_video_ids
+    for sort, descending in catalog._sorted:
+        assert catalog.playlist_summaries(sort, descending) == (
+            rebuilt.playlist_summaries(sort, descending)
+        )
+
+
+def test_watching_videos_patches_the_catalog(library):
+    set_watched(True, video_ids=["PL1-item000003", "PL1-item000019", "missing"])
+
+    catalog = get_catalog()
+    assert catalog is not library
+    assert catalog.playlists["PL1"].watched_count == 1
+    assert catalog.videos["PL1-item000019"].watched
+    assert_matches_database(catalog)
+
+
+def test_watching_a_playlist_includes_its_removed_videos(library):
+    set_watched(True, playlist_id="PL2")
+
+    catalog = get_catalog()
+    assert catalog.playlists["PL2"].watched_count == 18
+    assert catalog.videos["PL2-item000018"].watched
+    assert catalog.playlists["PL1"] is library.playlists["PL1"]
+    assert_matches_database(catalog)
+
+    set_watched(False, playlist_id="PL2")
+    assert_matches_database(get_catalog())
+
+
+def test_watched_updates_share_the_unchanged_records(library):
+    set_watched(True, video_ids=["PL1-item000000"])
+
+    catalog = get_catalog()
+    assert catalog.videos.base is library.videos.base
+    assert list(catalog.videos.overlay) == ["PL1-item000000"]
+    assert catalog.playlist_videos["PL2"] is library.playlist_videos["PL2"]
+
+
+def test_a_large_overlay_is_folded_into_a_new_base(library, monkeypatch):
+    monkeypatch.setattr(catalog_module, "VIDEO_OVERLAY_RATIO", 0.05)
+
+    set_watched(True, video_ids=["PL1-item000000", "PL1-item000001"])
+    assert get_catalog().videos.base is library.videos.base
+
+    set_watched(True, video_ids=["PL1-item000002", "PL1-item000003"])
+    catalog = get_catalog()
+    assert catalog.videos.base is not library.videos.base
+    assert catalog.videos.overlay == {}
+    assert len(catalog.videos) == 40
+    assert_matches_database(catalog)
@@ -0,0 +1,98 @@
+import pytest
+
+from project.library import views
+
+JSON = {"Accept": "application/json"}
+
+
+@pytest.fixture
+def viewer(library, make_user, login):
+    login(make_user("viewer"))
+
+
+def revalidate(client, url, response, **headers):
+    """Requests ``url`` again with the ETag of an earlier ``response``."""
+    return client.get(
+        url, headers={"If-None-Match": response.headers["ETag"], **headers}
+    )
+
+
+def test_a_repeat_visit_is_not_modified(client, viewer):
+    first = client.get("/lib/playlist/PL1")
+
+    assert first.status_code == 200
+    assert first.headers["ETag"].startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert "Accept" in first.headers["Vary"]
+
+    second = revalidate(client, "/lib/playlist/PL1", first)
+
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_a_not_modified_page_is_not_rendered(client, viewer, monkeypatch):
+    first = client.get("/lib/playlist/PL1")
+
+    def render_template(*args, **kwargs):
+        raise AssertionError("rendered")
+
+    monkeypatch.setattr(views, "render_template", render_template)
+
+    assert revalidate(client, "/lib/playlist/PL1", first).status_code == 304
+
+
+def test_if_modified_since_is_used_without_an_etag(client, viewer):
+    first = client.get("/lib/playlist/PL1")
+    last_modified = first.headers["Last-Modified"]
+
+    response = client.get(
+        "/lib/playlist/PL1", headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+
+    response = client.get(
+        "/lib/playlist/PL1",
+        headers={"If-Modified-Since": "Mon, 01 Jan 2018 00:00:00 GMT"},
+    )
+    assert response.status_code == 200
+
+
+def test_json_and_html_have_their_own_etags(client, viewer):
+    html = client.get("/lib/playlist/PL1")
+    json = client.get("/lib/playlist/PL1", headers=JSON)
+
+    assert html.headers["ETag"] != json.headers["ETag"]
+    assert revalidate(client, "/lib/playlist/PL1", html, **JSON).status_code == 200
+
+
+def test_a_watched_change_only_invalidates_its_playlist(client, viewer):
+    first = {
+        url: client.get(url)
+        for url in (
+            "/lib/",
+            "/lib/playlist/PL1",
+            "/lib/playlist/PL2",
+            "/lib/videos/PL1-item000000",
+        )
+    }
+
+    response = client.post("/lib/playlist/PL1/watched", json={"watched": True})
+    assert response.status_code == 200
+
+    statuses = {
+        url: revalidate(client, url, response).status_code
+        for url, response in first.items()
+    }
+    assert statuses == {
+        "/lib/": 200,
+        "/lib/playlist/PL1": 200,
+        "/lib/playlist/PL2": 304,
+        "/lib/videos/PL1-item000000": 200,
+    }
+
+    # Marking them again changes nothing, so nothing is invalidated.
+    second = client.get("/lib/playlist/PL1")
+    client.post("/lib/playlist/PL1/watched", json={"watched": True})
+    assert revalidate(client, "/lib/playlist/PL1", second).status_code == 304
@@ -0,0 +1,136 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from project.database import db
+from project.library.catalog import PLAYLIST_VIDEO_ORDER, build_catalog, refresh_catalog
+from project.library.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+)
+from project.models import Video
+
+JSON = {"Accept": "application/json"}
+
+
+@pytest.fixture
+def playlist_videos(library):
+    """The current videos of PL1 in page order, with three sharing a date."""
+    db.session.execute(
+        update(Video)
+        .where(Video.id.in_(["PL1-item000004", "PL1-item000005", "PL1-item000006"]))
+        .values(published_at=datetime(2019, 6, 1))
+    )
+    db.session.commit()
+    refresh_catalog()
+    return db.session.scalars(
+        current_videos().order_by(*PLAYLIST_VIDEO_ORDER).with_only_columns(Video.id)
+    ).all()
+
+
+def current_videos():
+    return select(Video).where(Video.playlist_id == "PL1", Video.removed_at.is_(None))
+
+
+def walk(fetch_page):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = fetch_page(cursor)
+        ids.extend(video.id for video in page.items)
+        pages += 1
+        if page.next_cursor is None:
+            return ids, pages
+        cursor = page.next_cursor
+
+
+def test_paging_visits_every_row_once_in_order(playlist_videos):
+    ids, pages = walk(
+        lambda cursor: paginate(
+            current_videos(), PLAYLIST_VIDEO_ORDER, cursor=cursor, per_page=5
+        )
+    )
+
+    assert ids == playlist_videos
+    assert pages == 4
+
+
+def test_paging_in_descending_order(playlist_videos):
+    ids, _ = walk(
+        lambda cursor: paginate(
+            current_videos(),
+            PLAYLIST_VIDEO_ORDER,
+            cursor=cursor,
+            per_page=4,
+            descending=True,
+        )
+    )
+
+    assert ids == playlist_videos[::-1]
+
+
+def test_the_last_full_page_has_no_next_cursor(playlist_videos):
+    page = paginate(current_videos(), PLAYLIST_VIDEO_ORDER, per_page=18)
+
+    assert len(page.items) == 18
+    assert page.next_cursor is None
+
+
+def test_catalog_pages_accept_database_cursors(playlist_videos):
+    catalog = build_catalog()
+    first = paginate(current_videos(), PLAYLIST_VIDEO_ORDER, per_page=5)
+
+    page = catalog.playlist_page("PL1", cursor=first.next_cursor, per_page=5)
+
+    assert [video.id for video in page.items] == playlist_videos[5:10]
+    assert page.next_cursor == paginate(
+        current_videos(), PLAYLIST_VIDEO_ORDER, cursor=first.next_cursor, per_page=5
+    ).next_cursor
+    assert walk(lambda cursor: catalog.playlist_page("PL1", cursor, 5))[0] == (
+        playlist_videos
+    )
+
+
+def test_cursors_round_trip_datetimes():
+    key = [datetime(2024, 2, 3, 4, 5, 6, 789), "PL1-item000001"]
+
+    assert decode_cursor(encode_cursor(key), PLAYLIST_VIDEO_ORDER) == key
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        encode_cursor(["only one value"]),
+        encode_cursor(["not a date", "PL1-item000001"]),
+        "e30",
+    ],
+)
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, PLAYLIST_VIDEO_ORDER)
+
+
+def test_the_playlist_page_links_to_the_next_page(
+    client, make_user, login, playlist_videos
+):
+    login(make_user("viewer"))
+    ids, url = [], "/lib/playlist/PL1?per_page=7"
+    while url:
+        data = client.get(url, headers=JSON).json
+        ids.extend(video["id"] for video in data["videos"])
+        url = data["next_url"]
+
+    assert ids == playlist_videos
+
+
+def test_the_playlist_page_rejects_a_malformed_cursor(
+    client, make_user, login, library
+):
+    login(make_user("viewer"))
+
+    response = client.get("/lib/playlist/PL1?after=garbage")
+
+    assert response.status_code == 400
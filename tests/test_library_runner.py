@@ -0,0 +1,138 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from project.database import db
+from project.library import runner, views
+from project.library.catalog import get_catalog
+from project.library.fakes import FakeYouTubeService
+from project.library.jobs import (
+    SYNC_RUN_TIMEOUT,
+    SyncAlreadyRunning,
+    sync_playlists_and_videos,
+)
+from project.library.runner import get_latest_job, start_sync
+from project.models import SyncRun
+
+
+@pytest.fixture(autouse=True)
+def jobs(monkeypatch):
+    monkeypatch.setattr(runner, "_jobs", {})
+
+
+def wait(job, timeout=10):
+    for thread in threading.enumerate():
+        if thread.name == f"youtube-sync-{job.id}":
+            thread.join(timeout)
+    assert not job.active
+
+
+def sync(app, service):
+    return start_sync(app, youtube_service=service, saved_playlist_ids=[])
+
+
+def test_a_sync_runs_in_the_background_and_refreshes_the_catalog(app):
+    get_catalog()
+
+    job = sync(app, FakeYouTubeService(playlists=3, videos=30))
+    wait(job)
+
+    assert job.status == "finished"
+    assert (job.playlists_total, job.playlists_processed) == (3, 3)
+    assert job.rows_changed == 33
+    assert job.error is None
+    assert len(get_catalog().videos) == 30
+    assert get_latest_job() is job
+    run = db.session.get(SyncRun, job.run_id)
+    assert (run.status, run.rows_changed) == ("finished", 33)
+    assert run.finished_at is not None
+
+    # Nothing changed on YouTube, so the next sync writes nothing.
+    job = sync(app, FakeYouTubeService(playlists=3, videos=30))
+    wait(job)
+    assert (job.status, job.rows_changed) == ("finished", 0)
+
+
+def test_only_one_sync_runs_at_a_time(app):
+    job = sync(app, FakeYouTubeService(playlists=2, videos=4, latency=0.05))
+
+    with pytest.raises(SyncAlreadyRunning) as raised:
+        sync(app, FakeYouTubeService())
+    assert raised.value.run.id == job.run_id
+    # The command line sync is refused too.
+    with pytest.raises(SyncAlreadyRunning):
+        sync_playlists_and_videos(
+            youtube_service=FakeYouTubeService(), saved_playlist_ids=[]
+        )
+
+    wait(job)
+    wait(sync(app, FakeYouTubeService(playlists=2, videos=4)))
+    assert db.session.scalars(select(SyncRun.status)).all() == [
+        "finished",
+        "finished",
+    ]
+
+
+def running_elsewhere(started_at):
+    """Saves a run as if another process were running it."""
+    run = SyncRun(started_at=started_at, status="running")
+    db.session.add(run)
+    db.session.commit()
+    return run.id
+
+
+def test_a_sync_running_in_another_process_blocks_both_paths(
+    app, client, make_user, login, monkeypatch
+):
+    running_elsewhere(datetime.now(timezone.utc))
+    login(make_user("viewer"))
+    monkeypatch.setattr(views, "get_youtube_credentials", lambda: object())
+
+    response = client.post(
+        "/lib/sync_playlists", headers={"Accept": "application/json"}
+    )
+    assert response.status_code == 409
+    assert response.json["status"] == "running"
+
+    result = app.test_cli_runner().invoke(args=["sync-yt-subs"])
+    assert "is already running" in result.output
+    assert get_latest_job() is None
+
+
+def test_a_run_left_running_too_long_is_abandoned(app):
+    stale_id = running_elsewhere(
+        datetime.now(timezone.utc) - SYNC_RUN_TIMEOUT - timedelta(minutes=1)
+    )
+
+    wait(sync(app, FakeYouTubeService(playlists=1, videos=2)))
+
+    assert db.session.get(SyncRun, stale_id).status == "abandoned"
+
+
+def test_a_failed_sync_records_its_error(app):
+    class BrokenService(FakeYouTubeService):
+        def playlists(self):
+            raise RuntimeError("quota exceeded")
+
+    job = sync(app, BrokenService())
+    wait(job)
+
+    assert job.status == "failed"
+    assert job.error == "quota exceeded"
+    assert db.session.get(SyncRun, job.run_id).status == "failed"
+    assert job.as_dict()["elapsed_seconds"] >= 0
+
+
+def test_progress_is_served_as_json(app, client, make_user, login):
+    login(make_user("viewer"))
+    job = sync(app, FakeYouTubeService(playlists=1, videos=2))
+    wait(job)
+
+    for job_id in (job.id, "latest"):
+        response = client.get(f"/lib/sync_playlists/{job_id}")
+        assert response.json["id"] == job.id
+        assert response.json["status"] == "finished"
+
+    assert client.get("/lib/sync_playlists/unknown").status_code == 404
@@ -0,0 +1,100 @@
+import pytest
+
+from project.lists import views
+from project.lists.events import InProcessBroker, get_list_event_broker, stream_events
+
+
+def drain(subscription):
+    events = []
+    while (event := subscription.get(timeout=0)) is not None:
+        events.append(event["id"])
+    return events
+
+
+def test_a_reconnecting_client_is_sent_the_events_it_missed():
+    broker = InProcessBroker()
+    for i in range(3):
+        broker.publish(1, "item_added", {"id": i})
+    broker.publish(2, "item_added", {"id": 99})
+
+    with broker.subscribe(1, last_event_id=1) as subscription:
+        assert drain(subscription) == [2, 3]
+        broker.publish(1, "item_toggled", {"id": 0})
+        assert drain(subscription) == [4]
+        assert not subscription.lagged
+    assert broker.latest_event_id(1) == 4
+
+
+@pytest.mark.parametrize("last_event_id", [0, 7])
+def test_a_client_outside_the_history_is_lagged(last_event_id):
+    broker = InProcessBroker(history=2)
+    for i in range(4):
+        broker.publish(1, "item_added", {"id": i})
+
+    # Event 1 was evicted, and event 7 was numbered by an earlier process.
+    with broker.subscribe(1, last_event_id=last_event_id) as subscription:
+        assert subscription.lagged
+
+
+def test_a_client_that_falls_behind_is_reset():
+    broker = InProcessBroker(queue_size=2)
+    stream = stream_events(broker, 1, None, keepalive=0.01, duration=1)
+    assert next(stream).startswith("retry:")
+    assert next(stream) == ": keepalive\n\n"
+
+    for i in range(3):
+        broker.publish(1, "item_added", {"id": i})
+
+    assert next(stream) == "event: reset\ndata: {}\n\n"
+    assert list(stream) == []
+    assert broker._subscriptions == {}
+
+
+def test_the_stream_replays_events_after_the_rendered_one(
+    app, client, owner, make_list
+):
+    app.config.update(
+        LIST_EVENT_KEEPALIVE_SECONDS=0.01, LIST_EVENT_STREAM_SECONDS=0.05
+    )
+    list_id, _, item_ids = make_list(owner)
+    client.post(
+        f"/lists/{list_id}/reorder_items",
+        json={"items": [{"id": item_ids[0], "ordering": 5}]},
+    )
+
+    response = client.get(f"/lists/{list_id}/events?after=0")
+
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    body = response.get_data(as_text=True)
+    assert "id: 1\nevent: items_reordered\n" in body
+    assert f'"id":{item_ids[0]},"ordering":5' in body
+
+
+def test_the_stream_requires_access_to_the_list(
+    client, owner, make_list, make_user, login
+):
+    list_id, _, _ = make_list(owner)
+    login(make_user("stranger"))
+
+    response = client.get(f"/lists/{list_id}/events")
+
+    assert response.status_code == 403
+
+
+def test_a_change_made_while_the_page_renders_is_replayed(
+    client, owner, make_list, monkeypatch
+):
+    list_id, _, _ = make_list(owner)
+    load_list_tree = views.load_list_tree
+
+    def load_list_tree_during_a_change(list_id):
+        get_list_event_broker().publish(list_id, "item_added", {"id": 1})
+        return load_list_tree(list_id)
+
+    monkeypatch.setattr(views, "load_list_tree", load_list_tree_during_a_change)
+
+    response = client.get(f"/lists/{list_id}")
+
+    # The page resumes from before the change, so the stream replays it.
+    assert f"/lists/{list_id}/events?after=0" in response.get_data(as_text=True)
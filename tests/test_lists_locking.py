@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+from sqlalchemy import select
+
+from project.database import db
+from project.lists import ordering
+from project.lists.ordering import ORDERING_GAP
+from project.models import ListItem
+
+
+@pytest.fixture
+def database_uri(tmp_path):
+    """A database file, so each thread gets its own connection and locks."""
+    return f"sqlite:///{tmp_path / 'lists.db'}"
+
+
+def test_concurrent_moves_into_one_slot_run_one_at_a_time(
+    app, client, owner, make_list, login, monkeypatch
+):
+    list_id, (category_id, _), (a, d, b, _, c, _) = make_list(owner, items=6)
+    ordering.rebalance(ListItem, category_id)
+    db.session.commit()
+
+    # The first move stops between reading its gap and writing into it.
+    first_has_read, first_may_write = threading.Event(), threading.Event()
+    ordering_between = ordering.ordering_between
+
+    def pausing_ordering_between(previous, following):
+        if threading.current_thread().name == "first":
+            first_has_read.set()
+            first_may_write.wait(5)
+        return ordering_between(previous, following)
+
+    monkeypatch.setattr(ordering, "ordering_between", pausing_ordering_between)
+
+    second_client = app.test_client()
+    login(owner, as_client=second_client)
+    responses = {}
+
+    def drag(name, test_client, item_id):
+        responses[name] = test_client.post(
+            f"/lists/{list_id}/move_item",
+            json={
+                "id": item_id,
+                "category_id": category_id,
+                "previous_id": a,
+                "next_id": b,
+            },
+        )
+
+    first = threading.Thread(target=drag, args=("first", client, c), name="first")
+    second = threading.Thread(
+        target=drag, args=("second", second_client, d), name="second"
+    )
+    first.start()
+    assert first_has_read.wait(5)
+    second.start()
+
+    # The second move waits for the first one's lock rather than reading a and
+    # b as adjacent and writing the same midpoint.
+    second.join(0.3)
+    assert second.is_alive()
+    first_may_write.set()
+    first.join(5)
+    second.join(5)
+
+    assert responses["first"].json["items"][0]["ordering"] == ORDERING_GAP * 3 // 2
+    assert responses["second"].status_code == 400
+    assert responses["second"].json["error"] == "The neighbours are not adjacent"
+    db.session.expire_all()
+    assert db.session.scalars(
+        select(ListItem.id)
+        .where(ListItem.category_id == category_id)
+        .order_by(ListItem.ordering)
+    ).all() == [a, c, b]
@@ -0,0 +1,234 @@
+import pytest
+from sqlalchemy import select, update
+
+from project.database import db
+from project.lists import ordering
+from project.lists.ordering import ORDERING_GAP
+from project.models import ListCategory, ListItem
+
+
+@pytest.fixture
+def spaced_list(owner, make_list):
+    """A list of two categories holding items 0, 2, 4 and 1, 3, 5, spaced out."""
+    list_id, category_ids, item_ids = make_list(owner, items=6)
+    for category_id in category_ids:
+        ordering.rebalance(ListItem, category_id)
+    ordering.rebalance(ListCategory, list_id)
+    db.session.commit()
+    return list_id, category_ids, item_ids
+
+
+def category_items(category_id, completed=False):
+    """Returns the ``(id, ordering)`` of a category's items, in order."""
+    rows = db.session.execute(
+        select(ListItem.id, ListItem.ordering)
+        .where(ListItem.category_id == category_id, ListItem.completed == completed)
+        .order_by(ListItem.ordering, ListItem.id)
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def move(client, list_id, item_id, category_id, previous_id, next_id, **payload):
+    return client.post(
+        f"/lists/{list_id}/move_item",
+        json={
+            "id": item_id,
+            "category_id": category_id,
+            "previous_id": previous_id,
+            "next_id": next_id,
+            **payload,
+        },
+    )
+
+
+def test_a_move_writes_one_row_at_the_midpoint(client, spaced_list, queries):
+    list_id, (category_id, _), (a, _, b, _, c, _) = spaced_list
+
+    with queries() as count:
+        response = move(client, list_id, c, category_id, a, b)
+
+    assert response.json == {
+        "success": True,
+        "items": [
+            {
+                "id": c,
+                "ordering": ORDERING_GAP * 3 // 2,
+                "category_id": category_id,
+                "completed": False,
+            }
+        ],
+    }
+    # The user, the access check, the list's lock, the rows, the gap and the
+    # UPDATE.
+    assert count[0] == 6
+    assert [item_id for item_id, _ in category_items(category_id)] == [a, c, b]
+
+
+def test_moves_from_an_outdated_page_are_rejected(client, spaced_list):
+    list_id, (category_id, _), (a, _, b, _, c, _) = spaced_list
+    assert move(client, list_id, c, category_id, None, a).status_code == 200
+
+    # A second user, whose page still shows a, b, c, drags b to the top.
+    response = move(client, list_id, b, category_id, None, a)
+
+    assert response.status_code == 400
+    assert response.json == {
+        "success": False,
+        "error": "The neighbours are not adjacent",
+    }
+    items = category_items(category_id)
+    assert [item_id for item_id, _ in items] == [c, a, b]
+    assert len({item_ordering for _, item_ordering in items}) == 3
+
+
+@pytest.mark.parametrize(
+    "neighbours",
+    [
+        # Not next to each other.
+        lambda a, b, c: (a, c),
+        # Not in order.
+        lambda a, b, c: (b, a),
+        # Only a previous one that is not last.
+        lambda a, b, c: (a, None),
+        # Only a next one that is not first.
+        lambda a, b, c: (None, c),
+        # Neither, but the category is not empty.
+        lambda a, b, c: (None, None),
+    ],
+)
+def test_neighbours_must_be_adjacent(client, spaced_list, neighbours):
+    list_id, (category_id, _), (a, d, b, _, c, _) = spaced_list
+    before = category_items(category_id)
+
+    response = move(client, list_id, d, category_id, *neighbours(a, b, c))
+
+    assert response.status_code == 400
+    assert category_items(category_id) == before
+
+
+def test_dropping_into_the_completed_list_completes_the_item(client, spaced_list):
+    list_id, (category_id, _), (a, _, b, _, c, _) = spaced_list
+    db.session.execute(
+        update(ListItem).where(ListItem.id == b).values(completed=True)
+    )
+    db.session.commit()
+
+    # Active a, c around completed b; c is dropped just below the completed b.
+    response = move(client, list_id, c, category_id, b, None, completed=True)
+    assert response.status_code == 200
+    assert category_items(category_id, completed=True) == [
+        (b, 2 * ORDERING_GAP),
+        (c, 3 * ORDERING_GAP),
+    ]
+
+    # Dropping a back between them skips over neither sublist's rows.
+    response = move(client, list_id, a, category_id, b, c, completed=True)
+    assert response.status_code == 200
+    assert [item_id for item_id, _ in category_items(category_id, True)] == [b, a, c]
+
+
+def test_active_neighbours_bound_the_gap_by_every_item(client, spaced_list):
+    list_id, (category_id, _), (a, d, b, _, c, _) = spaced_list
+    db.session.execute(
+        update(ListItem).where(ListItem.id == b).values(completed=True)
+    )
+    db.session.commit()
+
+    # a and c are adjacent among the active items, with the completed b between.
+    response = move(client, list_id, d, category_id, a, c)
+
+    assert response.status_code == 200
+    assert response.json["items"][0]["ordering"] == ORDERING_GAP * 3 // 2
+    assert [item_id for item_id, _ in category_items(category_id)] == [a, d, c]
+
+
+def test_neighbours_in_the_other_sublist_are_unknown(client, spaced_list):
+    list_id, (category_id, _), (a, _, b, _, c, _) = spaced_list
+
+    response = move(client, list_id, c, category_id, a, b, completed=True)
+
+    assert response.status_code == 400
+
+
+def test_tied_neighbours_are_respaced_first(client, spaced_list):
+    list_id, (category_id, _), (a, _, b, _, c, _) = spaced_list
+    db.session.execute(
+        update(ListItem).where(ListItem.id.in_([a, b])).values(ordering=5)
+    )
+    db.session.commit()
+
+    response = move(client, list_id, c, category_id, a, b)
+
+    assert response.status_code == 200
+    items = category_items(category_id)
+    assert [item_id for item_id, _ in items] == [a, c, b]
+    assert len({item_ordering for _, item_ordering in items}) == 3
+    # The respaced rows are sent along with the move.
+    assert {item["id"] for item in response.json["items"]} == {a, b, c}
+
+
+def test_crowded_moves_rebalance_and_keep_the_order(client, spaced_list):
+    list_id, (category_id, _), (a, *_) = spaced_list
+
+    # Dropping items between a and its successor halves the room every time.
+    for _ in range(12):
+        last_id = category_items(category_id)[-1][0]
+        successor = category_items(category_id)[1][0]
+        assert move(client, list_id, last_id, category_id, a, successor).json[
+            "success"
+        ]
+
+    items = category_items(category_id)
+    assert len({item_ordering for _, item_ordering in items}) == len(items)
+    assert sorted(items, key=lambda row: row[1]) == items
+
+
+def test_moving_to_another_category_and_an_empty_one(
+    client, owner, make_list, spaced_list
+):
+    list_id, (category_id, other_category_id), (a, d, *_) = spaced_list
+    empty_category = ListCategory(name="Empty", custom_list_id=list_id, ordering=0)
+    db.session.add(empty_category)
+    db.session.commit()
+
+    response = move(client, list_id, a, other_category_id, None, d)
+    assert response.json["items"][0]["ordering"] == 0
+    assert category_items(other_category_id)[0] == (a, 0)
+
+    response = move(client, list_id, d, empty_category.id, None, None)
+    assert response.json["items"][0]["ordering"] == ORDERING_GAP
+
+    _, _, (foreign_item, *_) = make_list(owner, title="Other")
+    response = move(client, list_id, foreign_item, category_id, None, None)
+    assert response.status_code == 400
+
+
+def test_categories_move_between_adjacent_neighbours(client, owner, make_list):
+    list_id, (first, second, third), _ = make_list(owner, items=0, categories=3)
+    ordering.rebalance(ListCategory, list_id)
+    db.session.commit()
+    url = f"/lists/{list_id}/move_category"
+
+    response = client.post(url, json={"id": third, "previous_id": first})
+    assert response.status_code == 400
+
+    response = client.post(
+        url, json={"id": third, "previous_id": first, "next_id": second}
+    )
+    assert response.json["categories"] == [
+        {"id": third, "ordering": ORDERING_GAP * 3 // 2}
+    ]
+
+
+def test_appends_go_one_gap_past_the_last_row(spaced_list):
+    _, (category_id, _), _ = spaced_list
+
+    item = ListItem(
+        name="New",
+        category_id=category_id,
+        ordering=ordering.next_ordering(ListItem, category_id),
+    )
+    db.session.add(item)
+    db.session.commit()
+
+    assert item.ordering == 4 * ORDERING_GAP
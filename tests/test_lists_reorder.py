@@ -0,0 +1,226 @@
+import pytest
+
+from project.database import db
+from project.lists.ordering import ORDERING_GAP
+from project.models import ListCategory, ListItem
+
+
+def orderings(model, ids):
+    rows = db.session.execute(
+        db.select(model.id, model.ordering).where(model.id.in_(ids))
+    ).all()
+    db.session.expire_all()
+    return dict(rows)
+
+
+@pytest.mark.parametrize("items", [4, 100])
+def test_reorder_items_costs_the_same_queries_at_any_size(
+    client, owner, make_list, queries, items
+):
+    list_id, category_ids, item_ids = make_list(owner, items=items)
+    entries = [
+        {
+            "id": item_id,
+            "ordering": 2 * items - position,
+            "category_id": category_ids[0],
+        }
+        for position, item_id in enumerate(item_ids)
+    ]
+
+    with queries() as count:
+        response = client.post(
+            f"/lists/{list_id}/reorder_items", json={"items": entries}
+        )
+
+    assert response.status_code == 200
+    assert response.json == {"success": True, "updated": items, "skipped": []}
+    # The user, the access check, the list's lock, the items with their
+    # categories, and one executemany UPDATE.
+    assert count[0] == 5
+    assert orderings(ListItem, item_ids)[item_ids[0]] == 2 * items * ORDERING_GAP
+    assert {
+        item.category_id for item in db.session.scalars(db.select(ListItem))
+    } == {category_ids[0]}
+
+
+@pytest.mark.parametrize("categories", [3, 60])
+def test_reorder_categories_costs_the_same_queries_at_any_size(
+    client, owner, make_list, queries, categories
+):
+    list_id, category_ids, _ = make_list(owner, items=0, categories=categories)
+    entries = [
+        {"id": category_id, "ordering": 2 * categories - position}
+        for position, category_id in enumerate(category_ids)
+    ]
+
+    with queries() as count:
+        response = client.post(
+            f"/lists/{list_id}/reorder_categories", json={"categories": entries}
+        )
+
+    assert response.status_code == 200
+    assert response.json == {"success": True, "updated": categories, "skipped": []}
+    assert count[0] == 5
+    assert orderings(ListCategory, category_ids)[category_ids[-1]] == (
+        (categories + 1) * ORDERING_GAP
+    )
+
+
+def test_reorder_items_skips_and_reports_ids_outside_the_list(
+    client, owner, make_list
+):
+    list_id, category_ids, item_ids = make_list(owner)
+    _, other_category_ids, other_item_ids = make_list(owner, title="Other")
+    before = orderings(ListItem, other_item_ids)
+
+    response = client.post(
+        f"/lists/{list_id}/reorder_items",
+        json={
+            "items": [
+                {"id": item_ids[0], "ordering": 7},
+                {
+                    "id": item_ids[1],
+                    "ordering": 8,
+                    "category_id": other_category_ids[0],
+                },
+                {"id": other_item_ids[0], "ordering": 9},
+                {"id": 999, "ordering": 10},
+            ]
+        },
+    )
+
+    assert response.json == {
+        "success": True,
+        "updated": 2,
+        "skipped": sorted([other_item_ids[0], 999]),
+    }
+    assert orderings(ListItem, other_item_ids) == before
+    # A move to another list's category is ignored; the new ordering is kept.
+    moved = db.session.get(ListItem, item_ids[1])
+    assert (moved.category_id, moved.ordering) == (category_ids[1], 8 * ORDERING_GAP)
+
+
+def test_reorder_categories_skips_and_reports_ids_outside_the_list(
+    client, owner, make_list
+):
+    list_id, category_ids, _ = make_list(owner)
+    _, other_category_ids, _ = make_list(owner, title="Other")
+
+    response = client.post(
+        f"/lists/{list_id}/reorder_categories",
+        json={
+            "categories": [
+                {"id": category_ids[0], "ordering": 5},
+                {"id": other_category_ids[0], "ordering": 6},
+            ]
+        },
+    )
+
+    assert response.json == {
+        "success": True,
+        "updated": 1,
+        "skipped": [other_category_ids[0]],
+    }
+    assert orderings(ListCategory, other_category_ids)[other_category_ids[0]] == 0
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"items": "not a list"},
+        {"items": [1, 2]},
+        {"items": [{"id": "abc", "ordering": 1}]},
+        {"items": [{"id": 1, "ordering": 1.5}]},
+        {"items": [{"id": i, "ordering": i} for i in range(1001)]},
+        {"items": [{"id": 1, "ordering": -1}]},
+        {"items": [{"id": 1, "ordering": 2**21}]},
+    ],
+)
+def test_reorder_items_rejects_bad_input(client, owner, make_list, payload):
+    list_id, _, item_ids = make_list(owner)
+    before = orderings(ListItem, item_ids)
+
+    response = client.post(f"/lists/{list_id}/reorder_items", json=payload)
+
+    assert response.status_code == 400
+    assert response.json["success"] is False
+    assert orderings(ListItem, item_ids) == before
+
+
+def test_reorder_rejects_two_rows_at_one_position(client, owner, make_list):
+    list_id, category_ids, item_ids = make_list(owner)
+    before = orderings(ListItem, item_ids)
+
+    # Items 0 and 1 start in different categories, so only the move clashes.
+    response = client.post(
+        f"/lists/{list_id}/reorder_items",
+        json={
+            "items": [
+                {"id": item_ids[0], "ordering": 3},
+                {"id": item_ids[1], "ordering": 3, "category_id": category_ids[0]},
+            ]
+        },
+    )
+    assert response.status_code == 400
+    assert orderings(ListItem, item_ids) == before
+
+    response = client.post(
+        f"/lists/{list_id}/reorder_categories",
+        json={
+            "categories": [
+                {"id": category_ids[0], "ordering": 1},
+                {"id": category_ids[1], "ordering": 1},
+            ]
+        },
+    )
+    assert response.status_code == 400
+
+
+def test_reorder_categories_rejects_bad_input(client, owner, make_list):
+    list_id, _, _ = make_list(owner)
+
+    response = client.post(
+        f"/lists/{list_id}/reorder_categories",
+        json={"categories": [{"id": True, "ordering": 1}]},
+    )
+
+    assert response.status_code == 400
+
+
+def test_reorder_requires_access_to_the_list(
+    client, owner, make_list, make_user, login
+):
+    list_id, _, item_ids = make_list(owner)
+    login(make_user("stranger"))
+
+    response = client.post(
+        f"/lists/{list_id}/reorder_items",
+        json={"items": [{"id": item_ids[0], "ordering": 5}]},
+    )
+
+    assert response.status_code == 403
+    assert orderings(ListItem, item_ids)[item_ids[0]] == 0
+
+
+def test_reorder_rejects_a_position_held_by_a_row_not_sent(client, owner, make_list):
+    list_id, category_ids, item_ids = make_list(owner)
+    url = f"/lists/{list_id}/reorder_items"
+    client.post(url, json={"items": [{"id": item_ids[2], "ordering": 3}]})
+    before = orderings(ListItem, item_ids)
+
+    # Item 2 shares item 0's category and holds position 3.
+    response = client.post(url, json={"items": [{"id": item_ids[0], "ordering": 3}]})
+    assert response.status_code == 400
+    assert response.json["error"] == "Ordering 3 is already taken"
+    assert orderings(ListItem, item_ids) == before
+
+    # Item 1 is in the other category, where position 3 is free.
+    response = client.post(url, json={"items": [{"id": item_ids[1], "ordering": 3}]})
+    assert response.json["updated"] == 1
+
+    url = f"/lists/{list_id}/reorder_categories"
+    client.post(url, json={"categories": [{"id": category_ids[1], "ordering": 2}]})
+    response = client.post(
+        url, json={"categories": [{"id": category_ids[0], "ordering": 2}]}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,95 @@
+import io
+from datetime import datetime
+
+import pytest
+from PIL import Image
+
+from project.database import db
+from project.library.thumbnails import THUMBNAIL_MAX_AGE, THUMBNAIL_SIZES, resize_image
+from project.models import Playlist
+
+SOURCE_URL = "https://i.ytimg.com/vi/abc/maxresdefault.jpg"
+
+
+def encode_image(size, image_format="PNG"):
+    output = io.BytesIO()
+    Image.new("RGB", size, "red").save(output, image_format)
+    return output.getvalue()
+
+
+@pytest.fixture
+def fetches(app, tmp_path):
+    urls = []
+
+    def fetch(url):
+        urls.append(url)
+        return encode_image((1280, 720))
+
+    app.config["THUMBNAIL_FETCHER"] = fetch
+    app.config["THUMBNAIL_CACHE_DIR"] = str(tmp_path)
+    return urls
+
+
+@pytest.fixture
+def playlist(app):
+    db.session.add(
+        Playlist(
+            id="PL1",
+            title="Playlist",
+            published_at=datetime(2024, 1, 1),
+            updated_at=datetime(2024, 1, 1),
+            thumbnail_url=SOURCE_URL,
+        )
+    )
+    db.session.commit()
+    return "PL1"
+
+
+def test_resize_image_downscales_to_fit_as_jpeg():
+    data = resize_image(encode_image((1280, 720)), THUMBNAIL_SIZES["list"])
+
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.format == "JPEG"
+        assert image.size == (120, 68)
+
+
+def test_resize_image_never_upscales():
+    data = resize_image(encode_image((60, 40)), THUMBNAIL_SIZES["header"])
+
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.size == (60, 40)
+
+
+def test_thumbnail_is_fetched_once_and_served_resized(
+    client, make_user, login, fetches, playlist
+):
+    login(make_user("viewer"))
+
+    first = client.get(f"/lib/thumbnails/playlist/{playlist}/header")
+    second = client.get(f"/lib/thumbnails/playlist/{playlist}/header")
+
+    assert first.status_code == second.status_code == 200
+    assert fetches == [SOURCE_URL]
+    assert first.cache_control.immutable
+    assert first.cache_control.private
+    assert not first.cache_control.public
+    assert first.cache_control.max_age == THUMBNAIL_MAX_AGE
+    with Image.open(io.BytesIO(second.data)) as image:
+        assert image.size == (320, 180)
+
+
+def test_thumbnail_redirects_to_the_origin_when_the_fetch_fails(
+    app, client, make_user, login, tmp_path, playlist
+):
+    def fetch(url):
+        raise OSError("unreachable")
+
+    app.config["THUMBNAIL_FETCHER"] = fetch
+    app.config["THUMBNAIL_CACHE_DIR"] = str(tmp_path)
+    login(make_user("viewer"))
+
+    response = client.get(f"/lib/thumbnails/playlist/{playlist}/list")
+
+    assert response.status_code == 302
+    assert response.headers["Location"] == SOURCE_URL
+